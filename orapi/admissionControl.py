@@ -0,0 +1,243 @@
+import threading
+import time
+
+from werkzeug.exceptions import ServiceUnavailable
+
+from orapi.metrics import REGISTRY
+
+ADMITTED_REQUESTS = REGISTRY.gauge("orapi_admission_active", "Admitted requests of the expensive endpoints that are currently running", ["endpoint", "wiki"])
+QUEUED_REQUESTS = REGISTRY.gauge("orapi_admission_queued", "Requests of the expensive endpoints waiting for a free slot", ["endpoint", "wiki"])
+REJECTED_REQUESTS = REGISTRY.counter("orapi_admission_rejected_total", "Requests of the expensive endpoints rejected with 503", ["endpoint", "wiki", "reason"])
+ADMISSION_WAIT_SECONDS = REGISTRY.histogram("orapi_admission_wait_seconds", "Time requests waited for a free slot", ["endpoint"])
+
+
+class AdmissionLimit(object):
+    """
+    concurrency limit of an endpoint
+    """
+
+    def __init__(self, maxActive:int, maxQueued:int=0, queueTimeout:float=10):
+        """
+
+        Args:
+            maxActive: number of requests that are allowed to run at the same time
+            maxQueued: number of requests that are allowed to wait for a free slot
+            queueTimeout: maximal time in seconds a request waits for a free slot
+        """
+        if maxActive < 1 or maxQueued < 0:
+            raise ValueError("An endpoint needs at least one active slot and a non negative queue size")
+        self.maxActive = maxActive
+        self.maxQueued = maxQueued
+        self.queueTimeout = queueTimeout
+
+    def __repr__(self):
+        return f"AdmissionLimit({self.maxActive}/{self.maxQueued})"
+
+    @classmethod
+    def parse(cls, spec:str, queueTimeout:float=10) -> tuple:
+        """
+        parses a limit given as ENDPOINT[:WIKI]=ACTIVE[/QUEUED] e.g. "upload:orfixed=1/2"
+
+        Returns:
+            (endpoint, wikiId or None, AdmissionLimit)
+        """
+        try:
+            key, value = spec.split("=", 1)
+            endpoint, _sep, wikiId = key.strip().partition(":")
+            maxActive, _sep, maxQueued = value.strip().partition("/")
+            limit = cls(int(maxActive), int(maxQueued) if maxQueued else 0, queueTimeout=queueTimeout)
+        except ValueError as e:
+            raise ValueError(f"Invalid admission limit '{spec}' expected ENDPOINT[:WIKI]=ACTIVE[/QUEUED]: {e}")
+        return endpoint, wikiId if wikiId else None, limit
+
+
+class AdmissionSlot(object):
+    """
+    slot of an admitted request. The slot is held until it is released which is either at the end of the request
+    or, if the work of the request continues in a generator, when the generator is finished
+    """
+
+    def __init__(self, admission:'Admission'):
+        self.admission = admission
+        self.acquired = time.monotonic()
+        self.isHandedOver = False
+        self._released = False
+        self._lock = threading.Lock()
+
+    def release(self):
+        """
+        release the slot. Releasing a slot more than once has no effect
+        """
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+        self.admission.release(self)
+
+    @property
+    def isReleased(self) -> bool:
+        return self._released
+
+    def guard(self, generator):
+        """
+        hand the slot over to the given generator. The slot is released when the generator is exhausted, fails or is closed
+
+        Returns:
+            generator yielding the items of the given generator
+        """
+        self.isHandedOver = True
+        def guarded():
+            try:
+                yield from generator
+            finally:
+                self.release()
+        return guarded()
+
+
+class Admission(object):
+    """
+    active and queued requests of an endpoint for a wiki
+    """
+
+    def __init__(self, endpoint:str, wikiId:str, limit:AdmissionLimit):
+        self.endpoint = endpoint
+        self.wikiId = wikiId
+        self.limit = limit
+        self.active = 0
+        self.queued = 0
+        # smoothed time a slot is held, used to estimate the Retry-After of rejected requests
+        self.meanHoldTime = None
+        self._condition = threading.Condition()
+
+    def acquire(self) -> AdmissionSlot:
+        """
+        acquire a slot. If all slots are in use the request waits in the queue until a slot is free
+
+        Raises:
+            ServiceUnavailable: if the queue is full or no slot got free within the queue timeout
+        """
+        start = time.monotonic()
+        with self._condition:
+            if self.active >= self.limit.maxActive:
+                if self.queued >= self.limit.maxQueued:
+                    self.reject("queueFull")
+                self.queued += 1
+                QUEUED_REQUESTS.inc(endpoint=self.endpoint, wiki=self.wikiId)
+                try:
+                    isFree = self._condition.wait_for(lambda: self.active < self.limit.maxActive, timeout=self.limit.queueTimeout)
+                finally:
+                    self.queued -= 1
+                    QUEUED_REQUESTS.dec(endpoint=self.endpoint, wiki=self.wikiId)
+                if not isFree:
+                    self.reject("timeout")
+            self.active += 1
+        ADMITTED_REQUESTS.inc(endpoint=self.endpoint, wiki=self.wikiId)
+        ADMISSION_WAIT_SECONDS.observe(time.monotonic() - start, endpoint=self.endpoint)
+        return AdmissionSlot(self)
+
+    def release(self, slot:AdmissionSlot):
+        holdTime = time.monotonic() - slot.acquired
+        with self._condition:
+            self.active -= 1
+            self.meanHoldTime = holdTime if self.meanHoldTime is None else 0.8 * self.meanHoldTime + 0.2 * holdTime
+            self._condition.notify()
+        ADMITTED_REQUESTS.dec(endpoint=self.endpoint, wiki=self.wikiId)
+
+    def reject(self, reason:str):
+        REJECTED_REQUESTS.inc(endpoint=self.endpoint, wiki=self.wikiId, reason=reason)
+        raise ServiceUnavailable(description=f"Too many concurrent {self.endpoint} requests for {self.wikiId}. Please retry later.",
+                                 retry_after=self.getRetryAfter())
+
+    def getRetryAfter(self) -> int:
+        """
+        Returns the estimated seconds until the queue has room again
+        """
+        if self.meanHoldTime is None:
+            estimate = self.limit.queueTimeout
+        else:
+            estimate = self.meanHoldTime * (self.queued + 1) / self.limit.maxActive
+        return max(1, round(estimate))
+
+    def getStatus(self) -> dict:
+        with self._condition:
+            return {"active": self.active, "queued": self.queued, "maxActive": self.limit.maxActive, "maxQueued": self.limit.maxQueued}
+
+
+class AdmissionControl(object):
+    """
+    Bounds the number of concurrently running requests of expensive endpoints per wiki.
+    A request either runs, waits in a short queue for a free slot or is rejected with 503 and Retry-After.
+    """
+
+    DEFAULT_LIMITS = {
+        "series": AdmissionLimit(maxActive=8, maxQueued=16),
+        "upload": AdmissionLimit(maxActive=2, maxQueued=4),
+        "publish": AdmissionLimit(maxActive=2, maxQueued=4),
+    }
+
+    def __init__(self, limits:dict=None, wikiLimits:dict=None):
+        """
+
+        Args:
+            limits: AdmissionLimit per endpoint. Endpoints without limit are not bounded
+            wikiLimits: AdmissionLimit per (endpoint, wikiId) overriding the limit of the endpoint for the wiki
+        """
+        self.limits = dict(self.DEFAULT_LIMITS) if limits is None else dict(limits)
+        self.wikiLimits = dict(wikiLimits) if wikiLimits else {}
+        self.admissions = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def fromSpecs(cls, specs:list, queueTimeout:float=10) -> 'AdmissionControl':
+        """
+        Returns AdmissionControl with the default limits overridden by the given limit specs
+        (see AdmissionLimit.parse)
+        """
+        limits = {endpoint: AdmissionLimit(limit.maxActive, limit.maxQueued, queueTimeout) for endpoint, limit in cls.DEFAULT_LIMITS.items()}
+        wikiLimits = {}
+        for spec in specs if specs else []:
+            endpoint, wikiId, limit = AdmissionLimit.parse(spec, queueTimeout=queueTimeout)
+            if wikiId is None:
+                limits[endpoint] = limit
+            else:
+                wikiLimits[(endpoint, wikiId)] = limit
+        return cls(limits=limits, wikiLimits=wikiLimits)
+
+    def getLimit(self, endpoint:str, wikiId:str) -> AdmissionLimit:
+        limit = self.wikiLimits.get((endpoint, wikiId))
+        if limit is None:
+            limit = self.limits.get(endpoint)
+        return limit
+
+    def acquire(self, endpoint:str, wikiId:str) -> AdmissionSlot:
+        """
+        acquire a slot for a request of the given endpoint working on the given wiki
+
+        Args:
+            endpoint: name of the endpoint
+            wikiId: id of the wiki the request works on
+
+        Returns:
+            AdmissionSlot that must be released at the end of the request. None if the endpoint is not bounded
+
+        Raises:
+            ServiceUnavailable: if the request is rejected
+        """
+        key = (endpoint, str(wikiId))
+        with self._lock:
+            admission = self.admissions.get(key)
+            if admission is None:
+                limit = self.getLimit(endpoint, wikiId)
+                if limit is None:
+                    return None
+                admission = Admission(endpoint, str(wikiId), limit)
+                self.admissions[key] = admission
+        return admission.acquire()
+
+    def getStatus(self) -> list:
+        """
+        Returns the active and queued requests per endpoint and wiki
+        """
+        with self._lock:
+            admissions = list(self.admissions.values())
+        return [{"endpoint": admission.endpoint, "wiki": admission.wikiId, **admission.getStatus()} for admission in admissions]
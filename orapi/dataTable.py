@@ -0,0 +1,273 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable
+
+from fb4.widgets import LodTable
+from markupsafe import Markup
+
+
+class DataTableQuery:
+    """
+    Server-side processing request of a DataTable (paging, sorting and filtering)
+    see https://datatables.net/manual/server-side
+    """
+
+    def __init__(self, draw:int=0, start:int=0, length:int=-1, search:str=None, order:list=None, columns:list=None, columnSearch:dict=None):
+        """
+
+        Args:
+            draw: draw counter of the client. Returned unchanged to the client
+            start: index of the first record of the requested page
+            length: number of records of the requested page. -1 for all records
+            search: global search value. Records are kept if any column contains the value
+            order: list of (column, isAscending) tuples
+            columns: keys of the requested columns
+            columnSearch: column specific search values
+        """
+        self.draw=draw
+        self.start=max(start, 0)
+        self.length=length
+        self.search=search.lower() if search else None
+        self.order=order if order else []
+        self.columns=columns if columns else []
+        self.columnSearch={column:value.lower() for column, value in columnSearch.items() if value} if columnSearch else {}
+
+    @classmethod
+    def fromRequestArgs(cls, args) -> 'DataTableQuery':
+        """
+        Creates the query from the request args send by DataTables
+
+        Args:
+            args: request args e.g. flask request.values
+
+        Returns:
+            DataTableQuery
+        """
+        def toInt(value, default:int) -> int:
+            try:
+                return int(value)
+            except (TypeError, ValueError):
+                return default
+        columns=[]
+        columnSearch={}
+        i=0
+        while f"columns[{i}][data]" in args:
+            column=args.get(f"columns[{i}][data]")
+            columns.append(column)
+            columnSearch[column]=args.get(f"columns[{i}][search][value]", "")
+            i+=1
+        order=[]
+        i=0
+        while f"order[{i}][column]" in args:
+            columnIndex=toInt(args.get(f"order[{i}][column]"), -1)
+            if 0 <= columnIndex < len(columns):
+                order.append((columns[columnIndex], args.get(f"order[{i}][dir]", "asc") != "desc"))
+            i+=1
+        query=DataTableQuery(draw=toInt(args.get("draw"), 0),
+                             start=toInt(args.get("start"), 0),
+                             length=toInt(args.get("length"), -1),
+                             search=args.get("search[value]", None),
+                             order=order,
+                             columns=columns,
+                             columnSearch=columnSearch)
+        return query
+
+    def matches(self, record:dict) -> bool:
+        """
+        Checks if the given record matches the global and column specific search values
+        """
+        for column, value in self.columnSearch.items():
+            if value not in self.toSearchString(record.get(column)):
+                return False
+        if self.search:
+            columns=self.columns if self.columns else record.keys()
+            return any(self.search in self.toSearchString(record.get(column)) for column in columns)
+        return True
+
+    @staticmethod
+    def toSearchString(value) -> str:
+        return "" if value is None else str(value).lower()
+
+    @staticmethod
+    def sortKey(value):
+        """
+        sort key that allows to sort columns with mixed value types. Numbers are sorted before strings and empty values
+        are sorted last
+        """
+        if value is None or value == "":
+            return 2, ""
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return 0, value
+        return 1, str(value).lower()
+
+    def apply(self, lod:list, valueMap:dict=None) -> dict:
+        """
+        Applies the query to the given lod
+        Args:
+            lod: list of records to filter, sort and page
+            valueMap: map of lod keys to convert functions. Only applied to the records of the requested page
+
+        Returns:
+            dict DataTables server-side response
+        """
+        if lod is None:
+            lod=[]
+        records=[record for record in lod if self.matches(record)]
+        # stable sort → apply the orderings in reverse
+        for column, isAscending in reversed(self.order):
+            records.sort(key=lambda record: self.sortKey(record.get(column)), reverse=not isAscending)
+        if self.length is None or self.length < 0:
+            page=records[self.start:]
+        else:
+            page=records[self.start:self.start+self.length]
+        data=[]
+        for record in page:
+            row=dict(record)
+            if valueMap:
+                for key, function in valueMap.items():
+                    if key in row:
+                        row[key]=function(row[key])
+            data.append({key:self.toJsonValue(value) for key, value in row.items()})
+        response={
+            "draw": self.draw,
+            "recordsTotal": len(lod),
+            "recordsFiltered": len(records),
+            "data": data
+        }
+        return response
+
+    @staticmethod
+    def toJsonValue(value):
+        """
+        converts the given value to a json compatible value. Widgets and dates are rendered as strings
+        """
+        if value is None:
+            return ""
+        if isinstance(value, (str, int, float, bool)):
+            return value
+        return str(value)
+
+
+class ServerSideLodTable(LodTable):
+    """
+    LodTable that only renders the table header and loads the rows page by page from the given data url
+    """
+
+    def __init__(self, headers:dict, dataUrl:str, name=None, indent="", pageLength:int=50):
+        """
+
+        Args:
+            headers: mapping from the dict keys to the corresponding headers
+            dataUrl: url of the DataTables server-side data source
+            name: name of the table str or Markup that is placed above the table
+            pageLength: number of rows per page
+        """
+        super(ServerSideLodTable, self).__init__(lod=[], headers=headers, name=name, indent=indent, isDatatable=True)
+        self.dataUrl=dataUrl
+        self.pageLength=pageLength
+
+    def render(self):
+        """renders the table header and the DataTable configuration"""
+        if not self.headers:
+            return ""
+        if isinstance(self.name, Markup):
+            name=self.name
+        else:
+            name=Markup(f"<h2>{self.name}</h2>")
+        headers = "\n".join([f'<th scope="col">{col}</th>' for col in self.headers.values()])
+        columns = ", ".join([f'{{"data": "{key}"}}' for key in self.headers.keys()])
+        table = f"""<table id="{self.id}" class="table table-bordered table-hover">
+                      <thead class="thead-light">
+                        <tr>
+                          {headers}
+                        </tr>
+                      </thead>
+                    </table>
+                    <script type="text/javascript">
+                    $('#{self.id}').DataTable({{
+                        serverSide: true,
+                        processing: true,
+                        pageLength: {self.pageLength},
+                        lengthMenu: [[10, 50, 100, 500, 1000, -1 ], [10, 50, 100, 500, 1000, "all"]],
+                        ajax: "{self.dataUrl}",
+                        columns: [{columns}]
+                    }});
+                    </script>"""
+        return name + Markup(table)
+
+
+class LodCache:
+    """
+    Thread safe LRU cache with time to live for lods
+    """
+
+    def __init__(self, maxSize:int=32, ttl:float=600):
+        """
+
+        Args:
+            maxSize: maximum number of cached entries
+            ttl: time to live of an entry in seconds
+        """
+        self.maxSize=maxSize
+        self.ttl=ttl
+        self._entries=OrderedDict()
+        self._lock=threading.Lock()
+        # locks of the keys that are being loaded
+        self._loadLocks={}
+
+    def get(self, key):
+        """
+        Returns the cached value for the given key or None if the key is not cached or expired
+        """
+        with self._lock:
+            entry=self._entries.get(key)
+            if entry is None:
+                return None
+            timestamp, value = entry
+            if time.monotonic()-timestamp > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        """
+        caches the given value under the given key
+        """
+        with self._lock:
+            self._entries[key]=(time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxSize:
+                self._entries.popitem(last=False)
+
+    def getOrLoad(self, key, load:Callable):
+        """
+        Returns the cached value for the given key. If the key is not cached the value is loaded with the given
+        function and cached. Concurrent requests of the same missing key wait for the first one instead of loading
+        the value again
+
+        Args:
+            key: key of the value
+            load: function without arguments returning the value
+        """
+        value=self.get(key)
+        if value is not None:
+            return value
+        with self._lock:
+            loadLock=self._loadLocks.setdefault(key, threading.Lock())
+        try:
+            with loadLock:
+                value=self.get(key)
+                if value is None:
+                    value=load()
+                    self.put(key, value)
+                return value
+        finally:
+            with self._lock:
+                if self._loadLocks.get(key) is loadLock and not loadLock.locked():
+                    del self._loadLocks[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
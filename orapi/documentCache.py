@@ -0,0 +1,191 @@
+import hashlib
+import io
+import json
+import os
+import tempfile
+from zipfile import ZipFile, ZIP_DEFLATED
+
+import pandas as pd
+from lodstorage.csv import CSV
+from spreadsheet.spreadsheet import SpreadSheet, SpreadSheetType, CSVSpreadSheet
+
+
+class ChunkBuffer(io.RawIOBase):
+    """
+    Unseekable write only stream that collects the written bytes until they are drained
+    """
+
+    def __init__(self):
+        super(ChunkBuffer, self).__init__()
+        self.chunks = []
+        self.position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def drain(self) -> bytes:
+        """
+        Returns the bytes written since the last drain
+        """
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+class DocumentCache:
+    """
+    Cache of generated spreadsheet documents.
+    Documents are stored in the cache directory under the hash of the lods and the format they were generated from
+    """
+
+    CHUNK_SIZE = 64 * 1024
+    TMP_PREFIX = "tmp-"
+
+    def __init__(self, cacheDir:str, maxDocuments:int=256):
+        """
+
+        Args:
+            cacheDir: directory the documents are stored in
+            maxDocuments: maximum number of cached documents. If exceeded the least recently generated documents are removed
+        """
+        self.cacheDir = cacheDir
+        self.maxDocuments = maxDocuments
+        os.makedirs(self.cacheDir, exist_ok=True)
+
+    @staticmethod
+    def getKey(lods:dict, spreadSheetType:SpreadSheetType, name:str) -> str:
+        """
+        Returns the content hash of the document for the given lods
+
+        Args:
+            lods: tables of the document
+            spreadSheetType: format of the document
+            name: name of the document
+
+        Returns:
+            str hex digest
+        """
+        content = json.dumps(lods, sort_keys=True, default=str)
+        sha = hashlib.sha256()
+        sha.update(f"{spreadSheetType.name}:{name}:".encode())
+        sha.update(content.encode())
+        return sha.hexdigest()
+
+    def getPath(self, key:str, spreadSheetType:SpreadSheetType) -> str:
+        doc = SpreadSheet.create(spreadSheetType, name=key)
+        return os.path.join(self.cacheDir, doc.filename)
+
+    def get(self, key:str, spreadSheetType:SpreadSheetType) -> str:
+        """
+        Returns the path of the cached document or None if the document is not cached
+        """
+        path = self.getPath(key, spreadSheetType)
+        if os.path.isfile(path):
+            return path
+        return None
+
+    def generate(self, lods:dict, spreadSheetType:SpreadSheetType, name:str, key:str=None):
+        """
+        Generates the document and stores it in the cache.
+        The CSV zip is streamed table by table while it is written. Excel and ODS documents can only be streamed
+        after the writer is closed, they are written to the cache file and then streamed from disk.
+
+        Args:
+            lods: tables of the document
+            spreadSheetType: format of the document
+            name: name of the document
+            key: content hash of the document. If None the key is computed
+
+        Returns:
+            yields the document in chunks
+        """
+        if key is None:
+            key = self.getKey(lods, spreadSheetType, name)
+        path = self.getPath(key, spreadSheetType)
+        # keep the file type as writers check the extension
+        fd, tmpPath = tempfile.mkstemp(dir=self.cacheDir, prefix=self.TMP_PREFIX, suffix=os.path.splitext(path)[1])
+        os.close(fd)
+        try:
+            if spreadSheetType is SpreadSheetType.CSV:
+                with open(tmpPath, "wb") as cacheFile:
+                    for chunk in self.generateCsvZip(lods):
+                        cacheFile.write(chunk)
+                        yield chunk
+            else:
+                doc = SpreadSheet.create(spreadSheetType, name=name)
+                doc.tables = lods
+                self.writeExcelDocument(doc, tmpPath)
+                with open(tmpPath, "rb") as f:
+                    for chunk in iter(lambda: f.read(self.CHUNK_SIZE), b""):
+                        yield chunk
+            os.replace(tmpPath, path)
+            self.evict()
+        finally:
+            if os.path.exists(tmpPath):
+                os.remove(tmpPath)
+
+    def generateCsvZip(self, lods:dict):
+        """
+        generates a zip of csv files (one per table) as it is written
+
+        Returns:
+            yields the zip in chunks
+        """
+        buffer = ChunkBuffer()
+        with ZipFile(buffer, mode="w", compression=ZIP_DEFLATED) as documentZip:
+            for tableName, table in lods.items():
+                documentZip.writestr(tableName + CSVSpreadSheet.TABLE_TYPE, CSV.toCSV(table))
+                yield buffer.drain()
+        yield buffer.drain()
+
+    @staticmethod
+    def writeExcelDocument(doc:SpreadSheet, path:str):
+        """
+        writes the given ExcelDocument/OdsDocument to the given path
+        """
+        with pd.ExcelWriter(path, engine=doc.engine, engine_kwargs=doc.engine_kwargs) as writer:
+            for tableName, tableData in doc.tables.items():
+                df = pd.DataFrame(tableData)
+                df.to_excel(writer, sheet_name=tableName, index=False)
+
+    def toBytesIO(self, lods:dict, spreadSheetType:SpreadSheetType, name:str) -> io.BytesIO:
+        """
+        Returns the document as BytesIO. The document is taken from the cache if available
+        """
+        key = self.getKey(lods, spreadSheetType, name)
+        path = self.get(key, spreadSheetType)
+        buffer = io.BytesIO()
+        if path is None:
+            for chunk in self.generate(lods, spreadSheetType, name, key=key):
+                buffer.write(chunk)
+        else:
+            with open(path, "rb") as f:
+                buffer.write(f.read())
+        buffer.seek(0)
+        buffer.name = SpreadSheet.create(spreadSheetType, name=name).filename
+        return buffer
+
+    def evict(self):
+        """
+        removes the oldest documents if more than maxDocuments are cached
+        """
+        try:
+            entries = [entry for entry in os.scandir(self.cacheDir) if entry.is_file() and not entry.name.startswith(self.TMP_PREFIX)]
+        except FileNotFoundError:
+            return
+        if len(entries) <= self.maxDocuments:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[:len(entries) - self.maxDocuments]:
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
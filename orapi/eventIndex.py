@@ -0,0 +1,215 @@
+import datetime
+import re
+import threading
+import time
+
+from onlinespreadsheet.tablequery import TableQuery
+
+from orapi.metrics import trackWikiRequest
+from orapi.ruleValidation import toYear
+
+
+class EventIndex(object):
+    """
+    In-memory index of the events of a wiki keyed by normalized acronym and by (series, year).
+    The index is loaded with one ask query and refreshed incrementally by querying only the events modified since
+    the last refresh. A full reload from time to time drops deleted and moved pages
+    """
+
+    REFRESH_INTERVAL = 60
+    FULL_REFRESH_INTERVAL = 3600
+    _instances = {}
+    _instancesLock = threading.Lock()
+
+    def __init__(self, wikiId:str, refreshInterval:float=None, fullRefreshInterval:float=None, debug:bool=False):
+        """
+
+        Args:
+            wikiId: id of the wiki
+            refreshInterval: minimal seconds between two incremental refreshes
+            fullRefreshInterval: seconds after which the index is reloaded completely
+            debug: print debug output if true
+        """
+        self.wikiId = wikiId
+        self.refreshInterval = refreshInterval if refreshInterval is not None else self.REFRESH_INTERVAL
+        self.fullRefreshInterval = fullRefreshInterval if fullRefreshInterval is not None else self.FULL_REFRESH_INTERVAL
+        self.debug = debug
+        # pageTitle of the event and its (acronym key, series year key)
+        self.events = {}
+        self.byAcronym = {}
+        self.bySeriesYear = {}
+        self.lastModified = None
+        self.lastRefresh = None
+        self.lastFullRefresh = None
+        self._lock = threading.RLock()
+
+    @classmethod
+    def getInstance(cls, wikiId:str) -> 'EventIndex':
+        """
+        Returns the EventIndex of the given wiki shared by all validations of the process
+        """
+        with cls._instancesLock:
+            index = cls._instances.get(wikiId)
+            if index is None:
+                index = cls(wikiId)
+                cls._instances[wikiId] = index
+            return index
+
+    @staticmethod
+    def normalizeAcronym(acronym) -> str:
+        """
+        Returns the acronym in lower case without whitespace and punctuation e.g. "3dui2020" for "3DUI 2020"
+        """
+        if acronym is None:
+            return None
+        key = re.sub(r"[\W_]+", "", str(acronym).lower())
+        return key if key else None
+
+    @staticmethod
+    def normalizeSeries(series) -> str:
+        if isinstance(series, list):
+            series = series[0] if series else None
+        if series is None:
+            return None
+        key = " ".join(str(series).replace("_", " ").split()).lower()
+        return key if key else None
+
+    @classmethod
+    def getKeys(cls, record:dict) -> tuple:
+        """
+        Returns:
+            (acronym key, (series key, year) or None) of the given event record
+        """
+        acronymKey = cls.normalizeAcronym(record.get("acronym"))
+        seriesKey = cls.normalizeSeries(record.get("inEventSeries"))
+        year = record.get("year")
+        try:
+            year = toYear(year) if year is not None else None
+        except (ValueError, TypeError):
+            year = None
+        seriesYearKey = (seriesKey, year) if seriesKey is not None and year is not None else None
+        return acronymKey, seriesYearKey
+
+    def getAskQuery(self, since:datetime.datetime=None) -> str:
+        """
+        Returns the ask query of the events modified since the given time. All events if since is None.
+        The modification dates have a resolution of seconds - events modified in the same second as the given time
+        are queried again and replace their previous entries
+        """
+        condition = f"[[Modification date::>={since.strftime('%Y-%m-%dT%H:%M:%S')}]]" if since else ""
+        return """{{#ask: [[Concept:Event]]%s
+        |mainlabel=pageTitle
+        |?Acronym=acronym
+        |?Event in series=inEventSeries
+        |?Has year=year
+        |?Modification date=modificationDate
+        |sort=Modification date
+        |order=asc
+        }}""" % condition
+
+    def queryEvents(self, since:datetime.datetime=None) -> list:
+        tableQuery = TableQuery(debug=self.debug)
+        with trackWikiRequest(self.wikiId, "ask"):
+            tableQuery.fromAskQueries(wikiId=self.wikiId, askQueries=[{"name": "Event index", "ask": self.getAskQuery(since)}])
+        lods = list(tableQuery.tableEditing.lods.values())
+        return lods[0] if lods else []
+
+    def refresh(self, force:bool=False):
+        """
+        refresh the index if the refresh interval elapsed. If the refresh fails a previously loaded index is kept
+
+        Args:
+            force: refresh even if the refresh interval did not elapse
+        """
+        with self._lock:
+            now = time.monotonic()
+            if not force and self.lastRefresh is not None and now - self.lastRefresh < self.refreshInterval:
+                return
+            isFull = self.lastFullRefresh is None or now - self.lastFullRefresh >= self.fullRefreshInterval
+            try:
+                records = self.queryEvents(since=None if isFull else self.lastModified)
+            except Exception:
+                if self.lastRefresh is None:
+                    raise
+                if self.debug:
+                    print(f"Refreshing the event index of {self.wikiId} failed - keeping the loaded index")
+                return
+            if isFull:
+                self.events = {}
+                self.byAcronym = {}
+                self.bySeriesYear = {}
+                self.lastModified = None
+                self.lastFullRefresh = now
+            self.update(records)
+            self.lastRefresh = now
+
+    def update(self, records:list):
+        """
+        add the given event records to the index replacing the previous keys of the events
+        """
+        with self._lock:
+            for record in records:
+                pageTitle = record.get("pageTitle")
+                if pageTitle is None:
+                    continue
+                self.remove(pageTitle)
+                acronymKey, seriesYearKey = self.getKeys(record)
+                self.events[pageTitle] = (acronymKey, seriesYearKey)
+                if acronymKey is not None:
+                    self.byAcronym.setdefault(acronymKey, set()).add(pageTitle)
+                if seriesYearKey is not None:
+                    self.bySeriesYear.setdefault(seriesYearKey, set()).add(pageTitle)
+                modified = record.get("modificationDate")
+                if isinstance(modified, datetime.datetime) and (self.lastModified is None or modified > self.lastModified):
+                    self.lastModified = modified
+
+    def remove(self, pageTitle:str):
+        with self._lock:
+            keys = self.events.pop(pageTitle, None)
+            if keys is None:
+                return
+            acronymKey, seriesYearKey = keys
+            for index, key in [(self.byAcronym, acronymKey), (self.bySeriesYear, seriesYearKey)]:
+                pageTitles = index.get(key)
+                if pageTitles is not None:
+                    pageTitles.discard(pageTitle)
+                    if not pageTitles:
+                        del index[key]
+
+    def lookup(self, acronymKey:str=None, seriesYearKey:tuple=None) -> set:
+        """
+        Returns the pageTitles of the indexed events with the given acronym key or (series, year) key
+        """
+        with self._lock:
+            pageTitles = set()
+            if acronymKey is not None:
+                pageTitles.update(self.byAcronym.get(acronymKey, ()))
+            if seriesYearKey is not None:
+                pageTitles.update(self.bySeriesYear.get(seriesYearKey, ()))
+            return pageTitles
+
+    def findDuplicates(self, lod:list) -> dict:
+        """
+        find the possible duplicates of the given event records among the indexed events and the other given records.
+        Records with the same pageTitle are the same event
+
+        Returns:
+            dict of the index of each record and the sorted pageTitles of its possible duplicates
+        """
+        keys = [self.getKeys(record) for record in lod]
+        uploadIndex = {}
+        for i, (acronymKey, seriesYearKey) in enumerate(keys):
+            for key in [("acronym", acronymKey), ("seriesYear", seriesYearKey)]:
+                if key[1] is not None:
+                    uploadIndex.setdefault(key, []).append(i)
+        duplicates = {}
+        for i, (acronymKey, seriesYearKey) in enumerate(keys):
+            pageTitle = lod[i].get("pageTitle")
+            pageTitles = self.lookup(acronymKey, seriesYearKey)
+            for key in [("acronym", acronymKey), ("seriesYear", seriesYearKey)]:
+                for j in uploadIndex.get(key, []):
+                    pageTitles.add(lod[j].get("pageTitle"))
+            pageTitles.discard(pageTitle)
+            pageTitles.discard(None)
+            duplicates[i] = sorted(pageTitles)
+        return duplicates
@@ -1,9 +1,21 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING
+from urllib.parse import quote
+
 from corpus.datasources.openresearch import OREvent
 from flask import Blueprint, jsonify, request
-from geograpy.locator import LocationContext, Region, Country, Location, City, Locator
-from lodstorage.sql import SQLDB
 from spreadsheet.tableediting import TableEditing
 
+from orapi.metrics import LOCATION_LOOKUPS, LOCATION_LOOKUP_SECONDS
+
+if TYPE_CHECKING:
+    # geograpy loads nltk, scipy and sklearn → imported on first use
+    from geograpy.locator import LocationContext, Location
+
 
 class LocationServiceBlueprint(object):
     """
@@ -27,7 +39,7 @@ class LocationServiceBlueprint(object):
         self.blueprint = Blueprint(name, __name__, template_folder=self.template_folder, url_prefix="/location")
         self.app = app
         self.appWrap = appWrap
-        self.locationService = LocationService()
+        self.locationService = LocationService.getInstance()
 
         @self.blueprint.route('/<country>', methods=["GET"])
         @self.appWrap.csrf.exempt
@@ -51,10 +63,24 @@ class LocationServiceBlueprint(object):
 
         app.register_blueprint(self.blueprint)
 
+    def notReadyResponse(self):
+        """
+        Returns a 503 response if the location data is not loaded within WAIT_TIMEOUT seconds otherwise None
+        """
+        if self.locationService.waitUntilReady(timeout=LocationService.WAIT_TIMEOUT):
+            return None
+        response = jsonify({"error": "Location data is not available yet", "status": self.locationService.getStatus()})
+        response.status_code = 503
+        response.headers["Retry-After"] = str(LocationService.RETRY_AFTER)
+        return response
+
     def getCountry(self, country:str):
         """
         return country information
         """
+        notReady = self.notReadyResponse()
+        if notReady is not None:
+            return notReady
         location = self.locationService.getCountry(country)
         if request.args.get('reduce', None) is not None:
             location = self.locationService.toOpenResearchFormat(location, "Country")
@@ -64,6 +90,9 @@ class LocationServiceBlueprint(object):
         """
         return region information
         """
+        notReady = self.notReadyResponse()
+        if notReady is not None:
+            return notReady
         location = self.locationService.getRegion(country, region)
         if request.args.get('reduce', None) is not None:
             location = self.locationService.toOpenResearchFormat(location, "Region")
@@ -73,6 +102,9 @@ class LocationServiceBlueprint(object):
         """
         return country information
         """
+        notReady = self.notReadyResponse()
+        if notReady is not None:
+            return notReady
         location = self.locationService.getCity(country, region, city)
         if request.args.get('reduce', None) is not None:
             location = self.locationService.toOpenResearchFormat(location, "City")
@@ -82,6 +114,9 @@ class LocationServiceBlueprint(object):
         """
         enhance the location of the given events
         """
+        notReady = self.notReadyResponse()
+        if notReady is not None:
+            return notReady
         tableEditing = self.getTableEdingFromRequest()
         self.locationService.enhanceLocation(tableEditing)
         return jsonify(tableEditing.lods)
@@ -98,20 +133,222 @@ class LocationService:
     CITY = "city"
     REGION = "region"
     COUNTRY = "country"
+    # seconds a request waits for the location data before it is answered with 503
+    WAIT_TIMEOUT = 2
+    RETRY_AFTER = 5
+    # seconds after a failed warm-up before the next attempt. Doubled after each further failure up to MAX_RETRY_BACKOFF
+    RETRY_BACKOFF = 30
+    MAX_RETRY_BACKOFF = 600
+    # seconds the lookups wait for the location data
+    LOOKUP_TIMEOUT = 600
+    # bytes of the locations database that are memory mapped by each connection. 0 disables memory mapping
+    MMAP_SIZE = 256 * 1024 * 1024
+    # idle connections kept open. The threaded server handles each request in a new thread → connections are pooled
+    POOL_SIZE = 4
+    # fixed statements of the lookups so that each connection prepares them once
+    CITY_QUERY = "SELECT * FROM CityLookup WHERE name = ? AND regionIso = ?"
+    REGION_QUERY = "SELECT * FROM RegionLookup WHERE iso = ?"
+    COUNTRY_QUERY = "SELECT * FROM CountryLookup WHERE iso = ?"
+    LABEL_QUERIES = {
+        "CityLookup": "SELECT label FROM CityLookup WHERE wikidataid == ?",
+        "RegionLookup": "SELECT label FROM RegionLookup WHERE wikidataid == ?",
+        "CountryLookup": "SELECT label FROM CountryLookup WHERE wikidataid == ?",
+    }
+
+    _instance = None
+    _instanceLock = threading.Lock()
+
+    def __init__(self, debug:bool=False, warmUp:bool=True, cacheFile:str=None, mmapSize:int=None):
+        """
 
-    def __init__(self, debug:bool=False):
+        Args:
+            debug: print debug output if true
+            warmUp: If True the location data is loaded directly. Otherwise it is loaded by warmUp() or startWarmUp()
+            cacheFile: locations database used for the lookups. If None the database of geograpy3 is used
+            mmapSize: bytes of the locations database memory mapped by each connection. Defaults to MMAP_SIZE
+        """
         self.debug=debug
+        self.cacheFile = cacheFile
+        self.mmapSize = mmapSize if mmapSize is not None else self.MMAP_SIZE
+        # idle connections of the process and database file in _poolKey
+        self._pool = []
+        self._poolKey = None
+        self._poolLock = threading.Lock()
+        self._locationContext = None
+        self.error = None
+        self._ready = threading.Event()
+        self._warmUpThread = None
+        self._warmUpLock = threading.Lock()
+        self._failures = 0
+        self._retryAt = None
+        if warmUp:
+            self.warmUp()
+
+    @classmethod
+    def getInstance(cls, debug:bool=False) -> 'LocationService':
+        """
+        Returns the shared LocationService. The location data of a new instance is loaded in the background
+        """
+        with cls._instanceLock:
+            if cls._instance is None:
+                cls._instance = LocationService(debug=debug, warmUp=False)
+                cls._instance.startWarmUp()
+            return cls._instance
+
+    def loadLocationContext(self) -> 'LocationContext':
+        """
+        download the locations database if needed and load the LocationContext
+        """
+        from geograpy.locator import LocationContext, Locator
         Locator.getInstance().downloadDB()
-        self.locationContext = LocationContext.fromCache()
+        return LocationContext.fromCache()
 
-    def getSqlDb(self):
+    def warmUp(self):
         """
+        download the locations database if needed and load the LocationContext
+        """
+        try:
+            self._locationContext = self.loadLocationContext()
+            self.error = None
+        except Exception as e:
+            self.error = e
+            raise
+        finally:
+            self._ready.set()
+
+    def startWarmUp(self) -> threading.Thread:
+        """
+        load the location data in a background thread. If the warm-up failed it is started again once the retry
+        backoff elapsed
+
         Returns:
-            geograpy3 locations database
+            the warm-up thread or None if the next attempt is not due yet
         """
-        cacheFile = self.locationContext.cityManager.getCacheFile()
-        db = SQLDB(cacheFile, debug=self.debug, errorDebug=self.debug)
-        return db
+        with self._warmUpLock:
+            if self._warmUpThread is not None:
+                return self._warmUpThread
+            if self._retryAt is not None and time.monotonic() < self._retryAt:
+                return None
+            self._ready.clear()
+            def warmUp():
+                try:
+                    self.warmUp()
+                except Exception as e:
+                    with self._warmUpLock:
+                        self._failures += 1
+                        backoff = min(self.RETRY_BACKOFF * 2 ** (self._failures - 1), self.MAX_RETRY_BACKOFF)
+                        self._retryAt = time.monotonic() + backoff
+                        self._warmUpThread = None
+                    print(f"Loading the location data failed: {e} → retrying in {backoff}s")
+            self._warmUpThread = threading.Thread(target=warmUp, name="LocationServiceWarmUp", daemon=True)
+            self._warmUpThread.start()
+            return self._warmUpThread
+
+    @property
+    def isReady(self) -> bool:
+        return self._ready.is_set() and self.error is None
+
+    def waitUntilReady(self, timeout:float=None) -> bool:
+        """
+        wait until the location data is loaded
+
+        Args:
+            timeout: maximum seconds to wait. If None wait until the warm-up is completed
+
+        Returns:
+            True if the location data is available
+        """
+        if self.getStatus() == "failed":
+            self.startWarmUp()
+        self._ready.wait(timeout)
+        return self.isReady
+
+    def getStatus(self) -> str:
+        """
+        Returns the warm-up status: "ready", "loading" or "failed"
+        """
+        if self.isReady:
+            return "ready"
+        elif self._ready.is_set():
+            return "failed"
+        return "loading"
+
+    @property
+    def locationContext(self) -> 'LocationContext':
+        """
+        the LocationContext. Waits for the warm-up if the location data is still loading
+        """
+        if not self.waitUntilReady(timeout=self.LOOKUP_TIMEOUT):
+            raise RuntimeError(f"Location data is not available ({self.getStatus()}): {self.error}")
+        return self._locationContext
+
+    def getCacheFile(self) -> str:
+        """
+        Returns the file of the locations database
+        """
+        if self.cacheFile is not None:
+            return self.cacheFile
+        return self.locationContext.cityManager.getCacheFile()
+
+    def openConnection(self, cacheFile:str) -> sqlite3.Connection:
+        """
+        Returns a new read-only connection to the given locations database
+        """
+        connection = sqlite3.connect(f"file:{quote(cacheFile)}?mode=ro", uri=True, cached_statements=32, check_same_thread=False)
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA query_only=ON")
+        if self.mmapSize:
+            connection.execute(f"PRAGMA mmap_size={int(self.mmapSize)}")
+        return connection
+
+    @contextmanager
+    def getConnection(self) -> sqlite3.Connection:
+        """
+        read-only connection to the locations database taken from the pool of idle connections.
+        The connections are kept open so that the lookups reuse their prepared statements and loaded schema.
+        Forked worker processes and a changed database file get new connections. At most POOL_SIZE idle
+        connections are kept, further connections are closed after use
+        """
+        cacheFile = self.getCacheFile()
+        key = (os.getpid(), cacheFile)
+        connection = None
+        with self._poolLock:
+            if self._poolKey != key:
+                # connections of the parent process or of another file are not reused
+                self._pool = []
+                self._poolKey = key
+            if self._pool:
+                connection = self._pool.pop()
+        if connection is None:
+            connection = self.openConnection(cacheFile)
+        try:
+            yield connection
+        finally:
+            with self._poolLock:
+                if self._poolKey == key and len(self._pool) < self.POOL_SIZE:
+                    self._pool.append(connection)
+                    connection = None
+            if connection is not None:
+                connection.close()
+
+    def close(self):
+        """
+        close the idle connections of the pool
+        """
+        with self._poolLock:
+            pool = self._pool if self._poolKey is not None and self._poolKey[0] == os.getpid() else []
+            self._pool = []
+            self._poolKey = None
+        for connection in pool:
+            connection.close()
+
+    def query(self, query:str, params:tuple) -> list:
+        """
+        Returns the records of the given query of the locations database as list of dicts
+        """
+        with self.getConnection() as connection:
+            rows = connection.execute(query, params).fetchall()
+        return [dict(row) for row in rows]
 
     def guessLocation(self, name:str):
         pass
@@ -194,13 +431,9 @@ class LocationService:
         Returns:
             dict information about the city
         """
-        query="""SELECT * 
-        FROM CityLookup
-        WHERE name = ?
-        AND regionIso = ?
-        """
-        db = self.getSqlDb()
-        qres = db.query(query, (name, f"{countryIso}-{regionIso}"))
+        with LOCATION_LOOKUP_SECONDS.time(type=self.CITY):
+            qres = self.query(self.CITY_QUERY, (name, f"{countryIso}-{regionIso}"))
+        LOCATION_LOOKUPS.inc(type=self.CITY, result="found" if qres else "notFound")
         if qres:
             return qres[0]
         return None
@@ -215,12 +448,9 @@ class LocationService:
         Returns:
             dict information about the region
         """
-        query="""SELECT * 
-        FROM RegionLookup
-        WHERE iso = ?
-        """
-        db = self.getSqlDb()
-        qres = db.query(query, (f"{countryIso}-{regionIso}",))
+        with LOCATION_LOOKUP_SECONDS.time(type=self.REGION):
+            qres = self.query(self.REGION_QUERY, (f"{countryIso}-{regionIso}",))
+        LOCATION_LOOKUPS.inc(type=self.REGION, result="found" if qres else "notFound")
         if qres:
             return qres[0]
         return None
@@ -234,12 +464,9 @@ class LocationService:
         Returns:
             dict information about the country
         """
-        query="""SELECT * 
-        FROM CountryLookup
-        WHERE iso = ?
-        """
-        db = self.getSqlDb()
-        qres = db.query(query, (countryIso,))
+        with LOCATION_LOOKUP_SECONDS.time(type=self.COUNTRY):
+            qres = self.query(self.COUNTRY_QUERY, (countryIso,))
+        LOCATION_LOOKUPS.inc(type=self.COUNTRY, result="found" if qres else "notFound")
         if qres:
             return qres[0]
         return None
@@ -255,7 +482,10 @@ class LocationService:
         Returns:
             Location
         """
-        foundLocations = self.locationContext.locateLocation(city, region, country)
+        from geograpy.locator import City, Region, Country
+        with LOCATION_LOOKUP_SECONDS.time(type="match"):
+            foundLocations = self.locationContext.locateLocation(city, region, country)
+        LOCATION_LOOKUPS.inc(type="match", result="found" if foundLocations else "notFound")
         if foundLocations:
             #find best match
             rankedLocs=[]
@@ -287,20 +517,15 @@ class LocationService:
         else:
             return None
 
-    def locationAlsoKnownAs(self, location:Location) -> list:
+    def locationAlsoKnownAs(self, location:'Location') -> list:
         """
         Returns all labels of the given location
         """
+        from geograpy.locator import Region, Country
         table = "CityLookup"
         if isinstance(location, Country): table="CountryLookup"
         elif isinstance(location, Region): table="RegionLookup"
-        query = f"""
-        SELECT label
-        FROM { table }
-        WHERE wikidataid == ?
-        """
-        db = self.getSqlDb()
-        queryRes = db.query(query, (location.wikidataid, ))
+        queryRes = self.query(self.LABEL_QUERIES[table], (location.wikidataid, ))
         return [record.get('label') for record in queryRes]
 
 
@@ -343,6 +568,7 @@ class LocationService:
         '''
         if errors is None:
             errors = {}
+        from geograpy.locator import City, Region, Country
         eventCity = event.get(self.CITY)
         eventRegion = event.get(self.REGION)
         eventCountry = event.get(self.COUNTRY)
@@ -376,7 +602,7 @@ class LocationService:
         return event, errors
 
     @staticmethod
-    def getPageTitle(location: Location):
+    def getPageTitle(location: 'Location'):
         '''
         Returns the wiki page title for the given location
         The hierarchy of the location is hereby represented in the page title
@@ -391,6 +617,7 @@ class LocationService:
         Returns:
             wiki pageTitle of the given location as string
         '''
+        from geograpy.locator import City, Region, Country
         pageTitle = None
         if isinstance(location, City):
             countryPart = getattr(location.country, 'iso')
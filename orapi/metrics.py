@@ -0,0 +1,240 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from orapi.requestProfile import measure
+
+
+class Metric(object):
+    """
+    metric with optional labels that is exposed in the prometheus text format
+    """
+    TYPE = "untyped"
+
+    def __init__(self, name:str, documentation:str, labelNames:list=None):
+        """
+
+        Args:
+            name: name of the metric
+            documentation: help text of the metric
+            labelNames: names of the labels the values of the metric are partitioned by
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelNames = tuple(labelNames) if labelNames else tuple()
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def getLabelValues(self, labels:dict) -> tuple:
+        if set(labels.keys()) != set(self.labelNames):
+            raise ValueError(f"{self.name} expects the labels {self.labelNames} but got {tuple(labels.keys())}")
+        return tuple(str(labels[labelName]) for labelName in self.labelNames)
+
+    def getValue(self, **labels):
+        """
+        Returns the current value of the metric for the given labels
+        """
+        with self._lock:
+            return self._values.get(self.getLabelValues(labels), 0)
+
+    @staticmethod
+    def formatLabels(labels:list) -> str:
+        if not labels:
+            return ""
+        escape = lambda value: value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        return "{" + ",".join(f'{name}="{escape(value)}"' for name, value in labels) + "}"
+
+    @staticmethod
+    def formatValue(value) -> str:
+        if value == float("inf"):
+            return "+Inf"
+        return repr(float(value))
+
+    def getSamples(self) -> list:
+        """
+        Returns list of (sample name, list of (label name, label value), value)
+        """
+        with self._lock:
+            values = dict(self._values)
+        if not values and not self.labelNames:
+            values = {tuple(): 0}
+        return [(self.name, list(zip(self.labelNames, labelValues)), value) for labelValues, value in sorted(values.items())]
+
+    def render(self) -> str:
+        """
+        Returns the metric in the prometheus text exposition format
+        """
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.TYPE}"]
+        for sampleName, labels, value in self.getSamples():
+            lines.append(f"{sampleName}{self.formatLabels(labels)} {self.formatValue(value)}")
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    """
+    monotonically increasing value
+    """
+    TYPE = "counter"
+
+    def inc(self, amount:float=1, **labels):
+        if amount < 0:
+            raise ValueError("Counters can only be increased")
+        key = self.getLabelValues(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """
+    value that can go up and down
+    """
+    TYPE = "gauge"
+
+    def inc(self, amount:float=1, **labels):
+        key = self.getLabelValues(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount:float=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value:float, **labels):
+        key = self.getLabelValues(labels)
+        with self._lock:
+            self._values[key] = value
+
+    @contextmanager
+    def trackInProgress(self, **labels):
+        """
+        increase the gauge while the context is active
+        """
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(Metric):
+    """
+    distribution of observed values in cumulative buckets
+    """
+    TYPE = "histogram"
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+    def __init__(self, name:str, documentation:str, labelNames:list=None, buckets:tuple=None):
+        super(Histogram, self).__init__(name, documentation, labelNames)
+        if buckets is None:
+            buckets = self.DEFAULT_BUCKETS
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value:float, **labels):
+        key = self.getLabelValues(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0))
+            counts = list(counts)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        observe the duration of the context in seconds
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def getValue(self, **labels):
+        """
+        Returns (number of observations, sum of the observations) for the given labels
+        """
+        with self._lock:
+            counts, total = self._values.get(self.getLabelValues(labels), ([0] * len(self.buckets), 0))
+        return counts[-1], total
+
+    def getSamples(self) -> list:
+        with self._lock:
+            values = dict(self._values)
+        samples = []
+        for labelValues, (counts, total) in sorted(values.items()):
+            labels = list(zip(self.labelNames, labelValues))
+            for bound, count in zip(self.buckets, counts):
+                samples.append((f"{self.name}_bucket", [*labels, ("le", self.formatValue(bound))], count))
+            samples.append((f"{self.name}_sum", labels, total))
+            samples.append((f"{self.name}_count", labels, counts[-1]))
+        return samples
+
+
+class MetricsRegistry(object):
+    """
+    collection of the metrics of the process
+    """
+
+    def __init__(self):
+        self.metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric:Metric) -> Metric:
+        with self._lock:
+            if metric.name in self.metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name:str, documentation:str, labelNames:list=None) -> Counter:
+        return self.register(Counter(name, documentation, labelNames))
+
+    def gauge(self, name:str, documentation:str, labelNames:list=None) -> Gauge:
+        return self.register(Gauge(name, documentation, labelNames))
+
+    def histogram(self, name:str, documentation:str, labelNames:list=None, buckets:tuple=None) -> Histogram:
+        return self.register(Histogram(name, documentation, labelNames, buckets))
+
+    def render(self) -> str:
+        """
+        Returns all metrics in the prometheus text exposition format
+        """
+        with self._lock:
+            metrics = list(self.metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+WIKI_REQUESTS = REGISTRY.counter("orapi_wiki_requests_total", "Requests to the wiki APIs", ["wiki", "type", "status"])
+WIKI_REQUEST_SECONDS = REGISTRY.histogram("orapi_wiki_request_seconds", "Duration of the requests to the wiki APIs (type pageFetch and pagePush for page markup)", ["wiki", "type"])
+ENHANCER_SECONDS = REGISTRY.histogram("orapi_enhancer_seconds", "Duration of the enhancer callbacks", ["enhancer"])
+VALIDATION_SECONDS = REGISTRY.histogram("orapi_validation_seconds", "Duration of the validations of a table by the validators", ["validator"])
+VALIDATED_RECORDS = REGISTRY.counter("orapi_validated_records_total", "Records validated by the validators", ["validator", "result"])
+CACHED_VALIDATION_RECORDS = REGISTRY.counter("orapi_validation_cached_records_total", "Records whose cached validation result was reused", ["validator"])
+VALIDATION_SERVICE_SECONDS = REGISTRY.histogram("orapi_validation_service_seconds", "Duration of the calls to the validation services", ["service"])
+LOCATION_LOOKUPS = REGISTRY.counter("orapi_location_lookups_total", "Location lookups", ["type", "result"])
+LOCATION_LOOKUP_SECONDS = REGISTRY.histogram("orapi_location_lookup_seconds", "Duration of the location lookups", ["type"])
+UPLOADED_PAGES = REGISTRY.counter("orapi_uploaded_pages_total", "Pages updated by uploads and publishing", ["wiki"])
+UPLOAD_PAGES_PER_SECOND = REGISTRY.gauge("orapi_upload_pages_per_second", "Pages per second of the last completed upload", ["wiki"])
+ACTIVE_SSE_STREAMS = REGISTRY.gauge("orapi_active_sse_streams", "Progress streams that are currently published")
+
+
+@contextmanager
+def trackWikiRequest(wikiId:str, requestType:str):
+    """
+    count the wiki request and observe its duration
+
+    Args:
+        wikiId: id of the requested wiki
+        requestType: type of the request e.g. ask, revisions, pageFetch, pagePush
+    """
+    status = "ok"
+    try:
+        with WIKI_REQUEST_SECONDS.time(wiki=wikiId, type=requestType), measure("wiki", requestType):
+            yield
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        WIKI_REQUESTS.inc(wiki=wikiId, type=requestType, status=status)
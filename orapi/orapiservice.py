@@ -1,10 +1,12 @@
 import copy
-import json
+import hashlib
+import queue
 import re
+import threading
+import time
 from collections.abc import Generator
 from datetime import datetime
 from functools import partial
-from time import sleep
 from typing import cast
 
 import dateutil.parser
@@ -19,8 +21,13 @@ from werkzeug.exceptions import Unauthorized
 from wikibot3rd.wikiuser import WikiUser
 from wikifile.wikiFile import WikiFile
 from wikifile.wikiFileManager import WikiFileManager
+from orapi import VERSION
+from orapi.dataTable import DataTableQuery, ServerSideLodTable, LodCache
 from orapi.locationService import LocationService
-from orapi.utils import WikiUserInfo, PageHistory
+from orapi.requestProfile import measure
+from orapi.metrics import trackWikiRequest, ENHANCER_SECONDS, UPLOADED_PAGES, UPLOAD_PAGES_PER_SECOND
+from orapi.utils import WikiUserInfo, PageHistory, PageRevision
+from orapi.validationService import ValidatorRegistry
 
 
 class WikiTableEditing(TableEditing):
@@ -70,6 +77,7 @@ class OrApi:
         self.optionalEnhancers={
             #**OrMigrateWrapper.getOrMigrateFixers(wikiId)
         }
+        self._wikiUrl=None
 
     def getSeriesQuery(self, seriesAcronym:str) -> dict:
         """
@@ -112,7 +120,8 @@ class OrApi:
         """
         tableQuery=TableQuery(debug=self.debug)
         askQueries=[self.getSeriesQuery(seriesAcronym), self.getEventsOfSeriesQuery(seriesAcronym)]
-        tableQuery.fromAskQueries(wikiId=self.wikiId, askQueries=askQueries)
+        with trackWikiRequest(self.wikiId, "ask"):
+            tableQuery.fromAskQueries(wikiId=self.wikiId, askQueries=askQueries)
         return tableQuery
 
     def getListOfDblpEventSeries(self) -> list:
@@ -133,7 +142,8 @@ class OrApi:
         }}
         """
         tableQuery = TableQuery(debug=self.debug)
-        tableQuery.fromAskQueries(wikiId=self.wikiId, askQueries=[{"name":"List of DBLPEventSeries", "ask":query}])
+        with trackWikiRequest(self.wikiId, "ask"):
+            tableQuery.fromAskQueries(wikiId=self.wikiId, askQueries=[{"name":"List of DBLPEventSeries", "ask":query}])
         return list(tableQuery.tableEditing.lods.values())[0]
 
     def getSeriesTableEditing(self, seriesAcronym:str, enhancers:list=None):
@@ -163,6 +173,34 @@ class OrApi:
         tableEditing.addEnhancer(partial(self.normalizeEntityProperties, reverse=True))
         return tableEditing
 
+    def getSeriesVersion(self, tableEditing:WikiTableEditing, enhancers:list=None) -> (str, datetime):
+        """
+        Computes a cheap version token of the series from the latest revisions of its pages.
+        The enhancers of the tableEditing are not applied.
+
+        Args:
+            tableEditing: not enhanced series table containing the pageTitles of the series and its events
+            enhancers: names of the optional enhancers applied to the series
+
+        Returns:
+            (version token, time of the latest modification or None if no page exists)
+        """
+        pageTitles = [record.get("pageTitle") for lod in tableEditing.lods.values() if isinstance(lod, list) for record in lod if isinstance(record, dict)]
+        with trackWikiRequest(self.wikiId, "revisions"):
+            latestRevisions = PageRevision.getLatestRevisions(pageTitles, self.wikiUrl)
+        sha = hashlib.sha256()
+        sha.update(f"{VERSION}:{self.wikiId}:{sorted(enhancers) if enhancers else []}".encode())
+        lastModified = None
+        for pageTitle in sorted(latestRevisions.keys()):
+            revision = latestRevisions[pageTitle]
+            sha.update(f"|{pageTitle}:{getattr(revision, 'revid', None)}".encode())
+            timestamp = getattr(revision, "timestamp", None)
+            if timestamp:
+                modified = dateutil.parser.parse(timestamp)
+                if lastModified is None or modified > lastModified:
+                    lastModified = modified
+        return sha.hexdigest(), lastModified
+
     def getSeriesTableEnhanceGenerator(self, tableEditing:WikiTableEditing):
         """
 
@@ -174,21 +212,71 @@ class OrApi:
 
         """
         yield "Starting Enhancement Phase<br>"
-        fnLookup={v:k for k,v in self.optionalEnhancers.items()}
         for callback in tableEditing.enhanceCallbacks:
-            fnName=""
-            if callback in fnLookup:
-                fnName=fnLookup.get(callback)
-            elif isinstance(callback, partial):
-                fnName=callback.func.__name__
-            else:
-                fnName=callback.__name__
-            sleep(0.05)  # slow down progress display (also workaround for delayed msg progress display )
+            fnName=self.getEnhancerName(callback)
             yield f"Starting {fnName}"
-            callback(tableEditing)
+            with ENHANCER_SECONDS.time(enhancer=fnName), measure("enhancer", fnName):
+                callback(tableEditing)
             yield "✅<br>"
         yield "Completed Enhancement Phase"
 
+    def getEnhancerName(self, callback) -> str:
+        """
+        Returns the name of the given enhancer callback
+        """
+        fnLookup={v:k for k,v in self.optionalEnhancers.items()}
+        if callback in fnLookup:
+            return fnLookup.get(callback)
+        elif isinstance(callback, partial):
+            return callback.func.__name__
+        else:
+            return getattr(callback, "__name__", str(callback))
+
+    def enhance(self, tableEditing:WikiTableEditing):
+        """
+        applies the enhancers of the given tableEditing
+        """
+        for _progress in self.getSeriesTableEnhanceGenerator(tableEditing):
+            pass
+
+    def getSeriesRecordGenerator(self, tableEditing:WikiTableEditing) -> Generator:
+        """
+        Applies the enhancers of the given series table record by record
+
+        Args:
+            tableEditing: not enhanced series table as returned by getSeriesTableEditing
+
+        Returns:
+            yields (entityType, record, error) as soon as the page of the record is fetched and enhanced.
+            If the enhancement of a record fails or yields no record e.g. because the page has no markup of the
+            entity, the not enhanced record and the error message are yielded
+        """
+        wikiFileManager = WikiFileManager(sourceWikiId=self.wikiId, login=False)
+        callbacks = []
+        for callback in tableEditing.enhanceCallbacks:
+            fnName = self.getEnhancerName(callback)
+            if callback == self.fetchEntityPropertiesFromMarkup:
+                callback = partial(self.fetchEntityPropertiesFromMarkup, wikiFileManager=wikiFileManager)
+            callbacks.append((fnName, callback))
+        for entityType in [OrApi.SERIES_TEMPLATE_NAME, OrApi.EVENT_TEMPLATE_NAME]:
+            for record in tableEditing.lods.get(entityType) or []:
+                recordTable = WikiTableEditing(user=getattr(tableEditing, "user", None))
+                recordTable.lods = {entityType: [copy.deepcopy(record)]}
+                try:
+                    for fnName, callback in callbacks:
+                        with ENHANCER_SECONDS.time(enhancer=fnName), measure("enhancer", fnName):
+                            callback(recordTable)
+                except Exception as e:
+                    yield entityType, record, str(e)
+                    continue
+                # completeProperties adds a blank record if the page had no markup of the entity
+                enhancedRecords = [enhancedRecord for enhancedRecord in recordTable.lods.get(entityType) or [] if enhancedRecord.get("pageTitle") is not None]
+                if not enhancedRecords:
+                    yield entityType, record, f"{record.get('pageTitle')} has no {entityType} markup"
+                    continue
+                for enhancedRecord in enhancedRecords:
+                    yield entityType, enhancedRecord, None
+
     def getTableEditingFromSpreadsheet(self, document, publisher:WikiUserInfo) -> WikiTableEditing:
         """
         converts the given document/file/BytesIO to TableEditing object
@@ -225,7 +313,8 @@ class OrApi:
         Unauthorized if the user is not logged into the wiki or does not have the required rights to edit pages
         """
         if self.authUpdates:
-            wikiUserInfo=WikiUserInfo.fromWiki(self.wikiUrl, headers=headers)
+            with trackWikiRequest(self.wikiId, "userinfo"):
+                wikiUserInfo=WikiUserInfo.fromWiki(self.wikiUrl, headers=headers)
             if not wikiUserInfo.isVerified():
                 raise Unauthorized("To update the wikipages you need to be logged into the wiki and have the necessary rights.")
         if isDryRun:
@@ -235,6 +324,8 @@ class OrApi:
         ts = wikiFileManager.wikiPush.toWiki.site.site
         targetWikiUrl = ts["server"] + ts["scriptpath"]
         locations = set()
+        uploadStart = time.monotonic()
+        uploadedPages = 0
         for entityType, entities in tableEditing.lods.items():
             if isinstance(entities, list):
                 for entity in entities:
@@ -242,49 +333,96 @@ class OrApi:
                     if isinstance(entity, dict):
                         pageTitle = entity.get('pageTitle')
                         entity = {key:value for key, value in entity.items() if key in self.allowedTemplateParams.get(entityType, []) and value is not None}
-                        wikiFile = wikiFileManager.getWikiFileFromWiki(pageTitle)
+                        with trackWikiRequest(self.wikiId, "pageFetch"):
+                            wikiFile = wikiFileManager.getWikiFileFromWiki(pageTitle)
                         yield f"Updating {self.getPageLink(targetWikiUrl, pageTitle, exists=wikiFile.wikiText)} ..."
 
                         wikiFile.updateTemplate(template_name=entityType, args=entity, prettify=True, overwrite=True)
                         if not isDryRun:
-                            wikiFile.pushToWiki(f"Updated through orapi")
+                            with trackWikiRequest(self.wikiId, "pagePush"):
+                                wikiFile.pushToWiki(f"Updated through orapi")
+                            uploadedPages += 1
+                            UPLOADED_PAGES.inc(wiki=self.wikiId)
                         else:
                             yield "Dryrun! (not updated)"
                         yield "✅<br>"
                         for locationType in ["Country", "Region", "State", "City"]:
                             locations.add(entity.get(locationType, None))
+        self.observeUploadRate(uploadedPages, time.monotonic() - uploadStart, self.wikiId)
         if ensureLocationsExits:
             yield from self.ensureLocationExists(locations, isDryRun=isDryRun)
         yield "Completed Upload!"
 
-    def validate(self, tableEditing:WikiTableEditing, validationServices:dict):
+    @staticmethod
+    def observeUploadRate(pages:int, seconds:float, wikiId:str):
+        """
+        sets the upload rate metric of the given wiki
+        """
+        if pages > 0 and seconds > 0:
+            UPLOAD_PAGES_PER_SECOND.set(pages / seconds, wiki=wikiId)
+
+    def validate(self, tableEditing:WikiTableEditing, validationServices=None):
         """
         Args:
-            tableEditing:
+            tableEditing: lods to be validated
+            validationServices(ValidatorRegistry|dict): validators to apply. Dicts map the validator name to a Validator class or the url of a remote validation service. If None the in-process default validators are used
 
         Returns:
-
+            isValid, validation result per entity type, entity name and validator
         """
-        self.normalizeEntityProperties(tableEditing)
         validationResult = {}
         isValid = True
-        for validationService, url in validationServices.items():
-            res = requests.post(url, json=json.dumps(tableEditing.lods))
-            lods = res.json()
-            for entityType, entityRecords in lods.items():
-                if not entityRecords:
-                    continue
-                for entityName, evr in entityRecords.items():
-                    if not entityRecords:
-                        continue
-                    if entityType not in validationResult:
-                        validationResult[entityType]={}
-                    if entityName not in validationResult[entityType]:
-                        validationResult[entityType][entityName]={}
-                    validationResult[entityType][entityName][validationService]=evr
-                    isValid = isValid and evr.get("result", False)
+        for entityType, entityName, validationService, evr in self.validateGenerator(tableEditing, validationServices):
+            validationResult.setdefault(entityType, {}).setdefault(entityName, {})[validationService] = evr
+            isValid = isValid and evr.get("result", False)
         return isValid, validationResult
 
+    def validateGenerator(self, tableEditing:WikiTableEditing, validationServices=None) -> Generator:
+        """
+        Runs the validators in parallel and yields the result of each record as soon as a validator finished it.
+        Closing the generator stops the validators that are still running.
+
+        Args:
+            tableEditing: lods to be validated
+            validationServices(ValidatorRegistry|dict): validators to apply. Dicts map the validator name to a Validator class or the url of a remote validation service. If None the in-process default validators are used
+
+        Returns:
+            yields (entity type, entity name, validator name, {"result", "errors"})
+        """
+        if validationServices is None:
+            validationServices = ValidatorRegistry.getDefault()
+        elif not isinstance(validationServices, ValidatorRegistry):
+            validationServices = ValidatorRegistry(validationServices)
+        self.normalizeEntityProperties(tableEditing)
+        results = queue.Queue()
+        stopped = threading.Event()
+        done = object()
+        def runValidator(validationService:str):
+            try:
+                for entityType, entityName, evr in validationServices.validateRecords(validationService, tableEditing):
+                    if stopped.is_set():
+                        break
+                    results.put((entityType, entityName, validationService, evr))
+            except Exception as e:
+                results.put(e)
+            finally:
+                results.put(done)
+        validators = [name for name, _validator in validationServices.items()]
+        for validationService in validators:
+            threading.Thread(target=runValidator, args=(validationService,), name=f"validator-{validationService}", daemon=True).start()
+        running = len(validators)
+        try:
+            while running > 0:
+                result = results.get()
+                if result is done:
+                    running -= 1
+                elif isinstance(result, Exception):
+                    raise result
+                else:
+                    yield result
+        finally:
+            stopped.set()
+
     def normalizePropsForWiki(self, entity:dict):
         for key, value in entity.items():
             if isinstance(value, datetime):
@@ -312,13 +450,17 @@ class OrApi:
         ts = wikiFileManager.wikiPush.toWiki.site.site
         targetWikiUrl = ts["server"] + ts["scriptpath"]
         locations = set()
+        publishStart = time.monotonic()
+        publishedPages = 0
         for entityType, lod in tableEditing.lods.items():
             for record in lod:
                 entityName = record.get("pageTitle")
-                pageHistory = PageHistory(entityName, targetWikiUrl)
+                with trackWikiRequest(self.targetWikiId, "pageHistory"):
+                    pageHistory = PageHistory(entityName, targetWikiUrl)
                 yield f"Publishing: {self.getPageLink(targetWikiUrl, entityName, exists=pageHistory.exists())} ..."
                 pageCreator = pageHistory.getPageOwner()
-                wikiFile = wikiFileManager.getWikiFileFromWiki(entityName)
+                with trackWikiRequest(self.wikiId, "pageFetch"):
+                    wikiFile = wikiFileManager.getWikiFileFromWiki(entityName)
                 record = wikiFile.extractTemplate(entityType)[0]
                 for locationType in ["Country", "Region", "State", "City"]:
                     locations.add(record.get(locationType, None))
@@ -328,10 +470,14 @@ class OrApi:
                 }
                 wikiFile.updateTemplate(entityType, overwrite=True, args=args, prettify=True)
                 if not isDryRun:
-                    wikiFile.pushToWiki(f"Published changes from {self.wikiId} by {publisher}")
+                    with trackWikiRequest(self.targetWikiId, "pagePush"):
+                        wikiFile.pushToWiki(f"Published changes from {self.wikiId} by {publisher}")
+                    publishedPages += 1
+                    UPLOADED_PAGES.inc(wiki=self.targetWikiId)
                 else:
                     yield "Dryrun! (not updated)"
                 yield "✅<br>"
+        self.observeUploadRate(publishedPages, time.monotonic() - publishStart, self.targetWikiId)
         if ensureLocationsExits:
             yield from self.ensureLocationExists(locations, isDryRun=isDryRun)
         yield "Completed Publish"
@@ -365,11 +511,12 @@ class OrApi:
         ts = wikiFileManager.wikiPush.toWiki.site.site
         targetWikiUrl = ts["server"] + ts["scriptpath"]
         yield f"<br>Ensure location pages exist for published series:<br>"
-        locationService = LocationService()
+        locationService = LocationService.getInstance()
         for location in locations:
             if location is None:
                 continue
-            page = wikiFileManager.wikiPush.toWiki.getPage(location)
+            with trackWikiRequest(self.targetWikiId, "pageFetch"):
+                page = wikiFileManager.wikiPush.toWiki.getPage(location)
             if page.exists:
                 yield f"Already exists: {self.getPageLink(targetWikiUrl, location, page.exists)} ✅<br>"
             else:
@@ -382,7 +529,9 @@ class OrApi:
                     wikiFile = WikiFile(location, wikiFileManager=wikiFileManager, wikiText="")
                     wikiFile.addTemplate("Location", data=locationRecord, prettify=True)
                     if not isDryRun:
-                        wikiFile.pushToWiki(f"Pushed from {self.wikiId}")
+                        with trackWikiRequest(self.targetWikiId, "pagePush"):
+                            wikiFile.pushToWiki(f"Pushed from {self.wikiId}")
+                        UPLOADED_PAGES.inc(wiki=self.targetWikiId)
                     else:
                         yield "Dryrun! (not updated)"
                     yield "✅<br>"
@@ -390,8 +539,20 @@ class OrApi:
 
     @property
     def wikiUrl(self):
-        wikiUser = WikiUser.ofWikiId(self.wikiId)
-        return wikiUser.getWikiUrl()
+        """
+        url of the source wiki. The url is read from the wiki configuration on first access and then memoized
+        see invalidateWikiUrl()
+        """
+        if self._wikiUrl is None:
+            wikiUser = WikiUser.ofWikiId(self.wikiId)
+            self._wikiUrl = wikiUser.getWikiUrl()
+        return self._wikiUrl
+
+    def invalidateWikiUrl(self):
+        """
+        Forget the memoized wiki url so that it is read again from the wiki configuration on next access
+        """
+        self._wikiUrl=None
 
     def addPageHistoryProperties(self, tableEditing:WikiTableEditing):
         """
@@ -412,25 +573,28 @@ class OrApi:
                     if tableEditing.user.hasName():
                         record["pageEditor"]=tableEditing.user.name
 
-    def fetchEntityPropertiesFromMarkup(self, tableEditing:WikiTableEditing):
+    def fetchEntityPropertiesFromMarkup(self, tableEditing:WikiTableEditing, wikiFileManager:WikiFileManager=None):
         """
         # ToDo: Migrate to WikiPage usage
         Fetches for each entity in the lod the entity properties from the page markup
         Args:
             tableEditing: TableEditing with the entites to fetch in the lods
+            wikiFileManager: WikiFileManager of the source wiki. If None a new one is created
 
         Returns:
             Nothing
         """
         extractedLods={}
         wikiFiles={}
-        wikiFileManager=WikiFileManager(sourceWikiId=self.wikiId, login=False)
+        if wikiFileManager is None:
+            wikiFileManager=WikiFileManager(sourceWikiId=self.wikiId, login=False)
         for name, lods in tableEditing.lods.items():
             extractedEntites=[]
             for lod in lods:
                 if isinstance(lod, dict):
                     pageTitle=lod.get("pageTitle")
-                    wikiFile=wikiFileManager.getWikiFileFromWiki(pageTitle)
+                    with trackWikiRequest(self.wikiId, "pageFetch"):
+                        wikiFile=wikiFileManager.getWikiFileFromWiki(pageTitle)
                     wikiFiles[pageTitle]=wikiFile
                     wikiSONs=wikiFile.extractTemplate(templateName=name)
                     if len(wikiSONs) == 1:
@@ -531,26 +695,64 @@ class OrApi:
         lods = qres.json()
         tableEditing.lods=lods
 
-    def getHtmlTables(self, tableEditing:WikiTableEditing):
+    def getHtmlTables(self, tableEditing:WikiTableEditing, dataUrls:dict=None):
         """
         Converts the given tables into a html table
         Args:
             tableEditing:
+            dataUrls: map of table names to DataTables server-side data urls. If a url is given for a table only the table
+                      header is rendered and the rows are loaded page by page from the url
 
         Returns:
 
         """
-        lods=copy.deepcopy(tableEditing.lods)
-        valueMap = self.propertyToLinkMap()
-        seriesLod = self.convertLodValues(lods[OrApi.SERIES_TEMPLATE_NAME], valueMap)
-        eventLod = self.convertLodValues(lods[OrApi.EVENT_TEMPLATE_NAME], valueMap)
-        seriesTable = LodTable(seriesLod, headers={v: v for v in LOD.getFields(seriesLod)},name="Event series")
-        eventPropertyOrder=["pageTitle", "Acronym", "Ordinal", "Year", "City", "Start date", "End date", "Title", "Series", "wikidataId","wikicfpId","DblpConferenceId","TibKatId"]
-        eventFields = LOD.getFields(eventLod)
-        eventHeaders={**{v:v for v in eventPropertyOrder if v in eventFields}, **{v:v for v in eventFields if v not in eventPropertyOrder}}
-        eventsTable = LodTable(eventLod, headers=eventHeaders, name="Events", isDatatable=True)
+        if dataUrls is None:
+            dataUrls = {}
+        tables = []
+        for tableName, name in [(OrApi.SERIES_TEMPLATE_NAME, "Event series"), (OrApi.EVENT_TEMPLATE_NAME, "Events")]:
+            lod = tableEditing.lods.get(tableName)
+            headers = self.getTableHeaders(tableName, lod)
+            isDatatable = tableName == OrApi.EVENT_TEMPLATE_NAME
+            if tableName in dataUrls:
+                table = ServerSideLodTable(headers=headers, dataUrl=dataUrls[tableName], name=name)
+            else:
+                lod = self.convertLodValues(copy.deepcopy(lod), self.propertyToLinkMap())
+                table = LodTable(lod, headers=headers, name=name, isDatatable=isDatatable)
+            tables.append(table)
+        seriesTable, eventsTable = tables
         return seriesTable, eventsTable
 
+    def getTableHeaders(self, tableName:str, lod:list) -> dict:
+        """
+        Returns the headers of the html table for the given entity table
+        Args:
+            tableName: name of the table
+            lod: records of the table
+
+        Returns:
+            dict
+        """
+        fields = LOD.getFields(lod) if lod else []
+        if tableName == OrApi.EVENT_TEMPLATE_NAME:
+            eventPropertyOrder=["pageTitle", "Acronym", "Ordinal", "Year", "City", "Start date", "End date", "Title", "Series", "wikidataId","wikicfpId","DblpConferenceId","TibKatId"]
+            headers={**{v:v for v in eventPropertyOrder if v in fields}, **{v:v for v in fields if v not in eventPropertyOrder}}
+        else:
+            headers={v: v for v in fields}
+        return headers
+
+    def getTableData(self, lods:dict, tableName:str, query:DataTableQuery) -> dict:
+        """
+        Returns the requested page of the given table. Links are only built for the records of the requested page
+        Args:
+            lods: entity tables
+            tableName: name of the requested table
+            query: DataTables server-side query
+
+        Returns:
+            dict DataTables server-side response
+        """
+        return query.apply(lods.get(tableName, []), valueMap=self.propertyToLinkMap())
+
     def getValidationTable(self, validationResult:dict):
         """
         Converts given validation result to html table
@@ -582,8 +784,9 @@ class OrApi:
         """
         Returns a mapping to convert a property to the corresponding link
         """
+        wikiUrl=self.wikiUrl
         map={
-            "pageTitle": lambda value: Link(url=f"{self.wikiUrl}/index.php?title={value}", title=value),
+            "pageTitle": lambda value: Link(url=f"{wikiUrl}/index.php?title={value}", title=value),
             "Homepage": lambda value: Link(url=value, title=value),
             "wikidataId": lambda value: Link(url=f"https://www.wikidata.org/wiki/{value}", title=value),
             "cityWikidataId": lambda value: Link(url=f"https://www.wikidata.org/wiki/{value}", title=value),
@@ -593,15 +796,15 @@ class OrApi:
             "wikicfpId": lambda value: Link(url=f"http://www.wikicfp.com/cfp/servlet/event.showcfp?eventid={value}",title=value),
             "DblpConferenceId": lambda value: Link(url=f"https://dblp2.uni-trier.de/db/conf/{value}", title=value),
             "DblpSeries": lambda value: Link(url=f"https://dblp.org/db/conf/{value}/index.html", title=value),
-            "Series": lambda value: Link(url=f"{self.wikiUrl}/index.php?title={value}",title=value),
+            "Series": lambda value: Link(url=f"{wikiUrl}/index.php?title={value}",title=value),
             "TibKatId": lambda value: Link(url=f"https://www.tib.eu/en/search/id/TIBKAT:{value}", title=value),
-            "Logo": lambda value: Image(url=f"{self.wikiUrl}/index.php?title=Special:Redirect/file/File:{value}",alt=value) if value else value,
+            "Logo": lambda value: Image(url=f"{wikiUrl}/index.php?title=Special:Redirect/file/File:{value}",alt=value) if value else value,
             "Ordinal": lambda value: int(value) if isinstance(value, float) and value.is_integer() else value,
-            "City": lambda value: Link(url=f"{self.wikiUrl}/index.php?title={value}", title=value),
-            "State": lambda value: Link(url=f"{self.wikiUrl}/index.php?title={value}", title=value),
-            "Country": lambda value: Link(url=f"{self.wikiUrl}/index.php?title={value}", title=value),
-            "pageEditor": lambda value: Link(url=f"{self.wikiUrl}/index.php?title=User:{value}", title=value),
-            "pageCreator": lambda value: Link(url=f"{self.wikiUrl}/index.php?title=User:{value}", title=value),
+            "City": lambda value: Link(url=f"{wikiUrl}/index.php?title={value}", title=value),
+            "State": lambda value: Link(url=f"{wikiUrl}/index.php?title={value}", title=value),
+            "Country": lambda value: Link(url=f"{wikiUrl}/index.php?title={value}", title=value),
+            "pageEditor": lambda value: Link(url=f"{wikiUrl}/index.php?title=User:{value}", title=value),
+            "pageCreator": lambda value: Link(url=f"{wikiUrl}/index.php?title=User:{value}", title=value),
         }
         return map
 
@@ -659,6 +862,8 @@ class OrApiService:
         self.defaultSourceWiki=defaultSourceWiki
         self.authUpdates=authUpdates
         self.orapis={}
+        self._orapisLock=threading.Lock()
+        self.enhancedSeries=LodCache(maxSize=32, ttl=600)
         self.enhancerURLs = {}
         wikiUserIds = list(WikiUser.getWikiUsers().keys())
         if wikiIds is None:
@@ -674,17 +879,40 @@ class OrApiService:
     def getOrApi(self, wikiId:str, targetWikiId:str=None) -> OrApi:
         """
         Returns the OrApi corresponding to the given wikiId
+        The OrApi instances are cached per (wikiId, targetWikiId)
         Args:
             wikiId: wiki id
+            targetWikiId: id of the wiki changes are published to
 
         Returns:
             OrApi
         """
-        orapi = OrApi(wikiId=wikiId, targetWikiId=targetWikiId, authUpdates=self.authUpdates, debug=self.debug)
+        key = (wikiId, targetWikiId)
+        with self._orapisLock:
+            orapi = self.orapis.get(key)
+            if orapi is None:
+                orapi = OrApi(wikiId=wikiId, targetWikiId=targetWikiId, authUpdates=self.authUpdates, debug=self.debug)
+                self.orapis[key] = orapi
         for enhancerName, url in self.enhancerURLs.items():
-            orapi.optionalEnhancers[enhancerName] = partial(orapi.apiEnhancer, apiUrl=url)
+            if enhancerName not in orapi.optionalEnhancers:
+                orapi.optionalEnhancers[enhancerName] = partial(orapi.apiEnhancer, apiUrl=url)
         return orapi
 
+    def invalidateCache(self, wikiId:str=None):
+        """
+        Drops the cached OrApi instances e.g. if the wiki configuration changed
+        Args:
+            wikiId: If given only the OrApis having the wiki as source or target are dropped. Otherwise all cached OrApis are dropped
+        """
+        with self._orapisLock:
+            if wikiId is None:
+                keys = list(self.orapis.keys())
+            else:
+                keys = [key for key in self.orapis.keys() if wikiId in key]
+            for key in keys:
+                orapi = self.orapis.pop(key)
+                orapi.invalidateWikiUrl()
+
     def getAvailableWikiChoices(self) -> list:
         return [(wid, wid) for wid in self.wikiIds]
 
@@ -696,3 +924,7 @@ class OrApiService:
         """
         if enhancerURLs is not None:
             self.enhancerURLs = {**self.enhancerURLs, **enhancerURLs}
+            with self._orapisLock:
+                for orapi in self.orapis.values():
+                    for enhancerName, url in enhancerURLs.items():
+                        orapi.optionalEnhancers[enhancerName] = partial(orapi.apiEnhancer, apiUrl=url)
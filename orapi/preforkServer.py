@@ -0,0 +1,333 @@
+import gc
+import io
+import json
+import mimetypes
+import os
+import re
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import time
+import traceback
+
+from apscheduler.schedulers.background import BackgroundScheduler
+from flask import send_file, abort
+from werkzeug.serving import make_server
+
+from orapi.sharedLodCache import SharedLodCache
+
+
+class SpoolPubSub:
+    """
+    Replacement of the in-process PubSub of the SSE_BluePrint for multiple worker processes.
+    The messages of a channel are appended to a spool file so that a channel can be published by a job of one worker
+    and subscribed through a request that is handled by another worker.
+    """
+
+    POLL_INTERVAL = 0.05
+    # longer than the keep-alive interval of the ProgressStream publishers
+    TIMEOUT = 60
+    # seconds after the last write after which channels and files nobody retrieved are removed
+    MAX_AGE = 3600
+    PURGE_INTERVAL = 600
+    CHANNEL_PATTERN = re.compile(r"^[\w-]+$")
+
+    def __init__(self, spoolDir:str):
+        """
+
+        Args:
+            spoolDir: directory the channels are spooled to. Must be shared by all workers
+        """
+        self.spoolDir = spoolDir
+        os.makedirs(self.spoolDir, exist_ok=True)
+
+    def getChannelPath(self, channel:str) -> str:
+        if not self.CHANNEL_PATTERN.match(channel):
+            raise ValueError(f"Invalid channel '{channel}'")
+        return os.path.join(self.spoolDir, f"{channel}.ndjson")
+
+    def getFileDir(self, channel:str) -> str:
+        if not self.CHANNEL_PATTERN.match(channel):
+            raise ValueError(f"Invalid channel '{channel}'")
+        return os.path.join(self.spoolDir, f"{channel}.file")
+
+    def publish(self, message, channel:str='sse', debug=False):
+        """
+        publish the given message to the given channel.
+        Files (BytesIO) are stored under the channel and can be retrieved once with retrieveFile
+
+        Args:
+            message: json string, None to mark the end of the channel or BytesIO
+            channel: id of the channel
+            debug: not used. Signature of SSE_BluePrint.publish
+        """
+        if isinstance(message, io.BytesIO):
+            fileDir = self.getFileDir(channel)
+            tmpDir = tempfile.mkdtemp(dir=self.spoolDir)
+            fileName = os.path.basename(getattr(message, "name", None) or channel)
+            with open(os.path.join(tmpDir, fileName), "wb") as f:
+                f.write(message.getvalue())
+            os.replace(tmpDir, fileDir)
+        else:
+            with open(self.getChannelPath(channel), "a") as f:
+                f.write(json.dumps(message) + "\n")
+
+    def subscribe(self, channel:str, timeout:float=None):
+        """
+        subscribe to the given channel
+
+        Args:
+            channel: id of the channel
+            timeout: seconds without new messages after which the subscription ends
+
+        Returns:
+            yields the messages of the channel until the end of the channel is reached
+        """
+        if timeout is None:
+            timeout = self.TIMEOUT
+        path = self.getChannelPath(channel)
+        lastMessage = time.monotonic()
+        position = 0
+        pending = ""
+        while time.monotonic() - lastMessage < timeout:
+            if os.path.exists(path):
+                with open(path, "r") as f:
+                    f.seek(position)
+                    data = f.read()
+                    position = f.tell()
+                lines = (pending + data).split("\n")
+                # the last part is an incomplete line or empty
+                pending = lines.pop()
+                for line in lines:
+                    lastMessage = time.monotonic()
+                    message = json.loads(line)
+                    yield message
+                    if self.isFinalMessage(message):
+                        os.remove(path)
+                        return
+            time.sleep(self.POLL_INTERVAL)
+
+    @staticmethod
+    def isFinalMessage(message) -> bool:
+        """
+        Returns True if the given message ends the channel (None or the final DictStreamResult response)
+        """
+        if message is None:
+            return True
+        try:
+            return "result" in json.loads(message)
+        except (TypeError, ValueError):
+            return False
+
+    def retrieveFile(self, channel:str, timeout:float=None) -> io.BytesIO:
+        """
+        Returns the file published under the given channel and removes it from the spool
+
+        Args:
+            channel: id of the channel
+            timeout: seconds to wait for the file
+
+        Returns:
+            BytesIO or None if no file was published
+        """
+        if timeout is None:
+            timeout = self.TIMEOUT
+        fileDir = self.getFileDir(channel)
+        start = time.monotonic()
+        while not os.path.isdir(fileDir):
+            if time.monotonic() - start > timeout:
+                return None
+            time.sleep(self.POLL_INTERVAL)
+        fileName = os.listdir(fileDir)[0]
+        with open(os.path.join(fileDir, fileName), "rb") as f:
+            buffer = io.BytesIO(f.read())
+        buffer.name = fileName
+        shutil.rmtree(fileDir, ignore_errors=True)
+        return buffer
+
+    def purge(self, maxAge:float=None):
+        """
+        remove the channels and files of the spool that were not written for the given number of seconds
+        e.g. channels nobody subscribed to
+
+        Args:
+            maxAge: seconds after the last write. Default MAX_AGE
+        """
+        if maxAge is None:
+            maxAge = self.MAX_AGE
+        expired = time.time() - maxAge
+        for entry in os.scandir(self.spoolDir):
+            try:
+                if entry.stat().st_mtime >= expired:
+                    continue
+                if entry.is_dir():
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                else:
+                    os.remove(entry.path)
+            except FileNotFoundError:
+                # removed by another worker
+                pass
+
+    def install(self, sseBluePrint):
+        """
+        route the publishing and the subscriptions of the given SSE_BluePrint through this spool
+        """
+        sseBluePrint.publish = self.publish
+
+        def subscribe(channel):
+            try:
+                messages = self.subscribe(channel)
+            except ValueError:
+                abort(404)
+            return sseBluePrint.streamGen(messages)
+
+        def retrieveFile(id):
+            try:
+                file = self.retrieveFile(id)
+            except ValueError:
+                file = None
+            if file is None:
+                abort(404)
+            mimeType = mimetypes.guess_type(file.name)
+            return send_file(file, as_attachment=True, attachment_filename=file.name, mimetype=mimeType[0])
+
+        sseBluePrint.app.view_functions["subscribe"] = subscribe
+        sseBluePrint.app.view_functions["retrieveFile"] = retrieveFile
+
+
+class PreforkServer:
+    """
+    Serves the orapi webserver with multiple worker processes.
+    The app, the LocationContext and the wiki configuration are loaded once in the master process before the workers
+    are forked so that the read-only data is shared copy-on-write.
+    All workers accept connections on the same listening socket, the kernel thus balances the requests across the workers.
+    """
+
+    RESTART_DELAY = 1
+
+    def __init__(self, web, workers:int, debug:bool=False):
+        """
+
+        Args:
+            web(WebServer): initialized webserver to serve
+            workers: number of worker processes
+            debug: print debug output if true
+        """
+        self.web = web
+        self.workers = workers
+        self.debug = debug
+        self.socket = None
+        self.pids = {}
+        self.stopping = False
+        self.spool = None
+
+    def preload(self):
+        """
+        load the data the workers share before forking
+        """
+        # threads do not survive the fork → the location data has to be loaded before the workers are forked
+        self.web.locationService.locationService.waitUntilReady()
+        orapiService = self.web.orapiService
+        for wikiId in orapiService.wikiIds:
+            try:
+                _wikiUrl = orapiService.getOrApi(wikiId).wikiUrl
+            except Exception as e:
+                print(f"Wiki '{wikiId}' could not be preloaded: {e}", file=sys.stderr)
+        self.spool = SpoolPubSub(os.path.join(self.web.fileStoragePath, "sse"))
+        self.spool.purge()
+        self.spool.install(self.web.sseBluePrint)
+        # the table data requests of an html view are usually handled by another worker than the view
+        enhancedSeries = orapiService.enhancedSeries
+        orapiService.enhancedSeries = SharedLodCache(os.path.join(self.web.fileStoragePath, "enhancedSeries.db"),
+                                                     maxSize=enhancedSeries.maxSize, ttl=enhancedSeries.ttl)
+
+    def bind(self) -> socket.socket:
+        """
+        Returns the listening socket shared by the workers
+        """
+        addrInfo = socket.getaddrinfo(self.web.host, self.web.port, type=socket.SOCK_STREAM)
+        family, socketType, proto, _canonName, address = addrInfo[0]
+        sock = socket.socket(family, socketType, proto)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind(address)
+        sock.listen(128)
+        sock.set_inheritable(True)
+        return sock
+
+    def serve(self):
+        """
+        preload the app, fork the workers and restart workers that died until the master is stopped
+        """
+        self.preload()
+        self.socket = self.bind()
+        # the scheduler thread does not survive the fork → each worker starts its own scheduler
+        scheduler = self.web.sseBluePrint.scheduler
+        if scheduler is not None and scheduler.running:
+            scheduler.shutdown(wait=False)
+        # keep the preloaded objects out of the gc generations so that collections in the workers do not touch their pages
+        gc.collect()
+        gc.freeze()
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        print(f"Serving on http://{self.web.host}:{self.web.port} with {self.workers} workers", flush=True)
+        for _ in range(self.workers):
+            self.spawn()
+        while self.pids:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            except InterruptedError:
+                continue
+            started = self.pids.pop(pid, None)
+            if self.stopping:
+                continue
+            if self.debug:
+                print(f"Worker {pid} exited with status {status} → restarting", file=sys.stderr)
+            if started is not None and time.monotonic() - started < self.RESTART_DELAY:
+                time.sleep(self.RESTART_DELAY)
+            self.spawn()
+        self.socket.close()
+
+    def spawn(self):
+        """
+        fork a new worker
+        """
+        pid = os.fork()
+        if pid == 0:
+            exitCode = 0
+            try:
+                self.runWorker()
+            except BaseException:
+                exitCode = 1
+                traceback.print_exc(file=sys.stderr)
+                sys.stderr.flush()
+            finally:
+                os._exit(exitCode)
+        self.pids[pid] = time.monotonic()
+
+    def runWorker(self):
+        """
+        serve requests on the shared socket
+        """
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        scheduler = BackgroundScheduler()
+        scheduler.add_job(self.spool.purge, "interval", seconds=self.spool.PURGE_INTERVAL)
+        scheduler.start()
+        self.web.sseBluePrint.scheduler = scheduler
+        server = make_server(self.web.host, self.web.port, self.web.app, threaded=True, fd=self.socket.fileno())
+        server.serve_forever()
+
+    def stop(self, signum=None, frame=None):
+        """
+        stop the workers
+        """
+        self.stopping = True
+        for pid in list(self.pids):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
@@ -0,0 +1,106 @@
+import json
+import threading
+import time
+from datetime import datetime
+
+from fb4.sse_bp import DictStream, DictStreamResult, PubSub, SSE_BluePrint
+
+from orapi.metrics import ACTIVE_SSE_STREAMS
+from orapi.requestProfile import RequestProfile, activated
+
+
+class ProgressStream(DictStream):
+    """
+    DictStream that publishes the progress messages of a generator in fixed time intervals.
+
+    The generator is consumed by the scheduler job while a flusher thread publishes the buffered messages every
+    flushInterval seconds. Messages of slow steps are thus displayed without delay and the messages of fast steps
+    are coalesced into one SSE message instead of flooding the client.
+    During steps without messages an empty message is published every keepAliveInterval seconds so that the
+    subscription (see SpoolPubSub.TIMEOUT) does not end before the final result.
+    """
+
+    KEEP_ALIVE_INTERVAL = 15
+
+    def __init__(self, generator, sseBlueprint:SSE_BluePrint, flushInterval:float=0.1, profile:RequestProfile=None, keepAliveInterval:float=None):
+        """
+
+        Args:
+            generator: generator yielding progress messages and optionally a final DictStreamResult
+            sseBlueprint: blueprint used to publish the messages
+            flushInterval: time in seconds between two published messages
+            profile: If given the generator is consumed with the profile activated and the timing breakdown is attached to the final message
+            keepAliveInterval: seconds without published messages after which an empty message is published. Default KEEP_ALIVE_INTERVAL
+        """
+        super(ProgressStream, self).__init__(generator, sseBlueprint=sseBlueprint)
+        self.flushInterval=flushInterval
+        self.profile=profile
+        self.keepAliveInterval=keepAliveInterval if keepAliveInterval is not None else self.KEEP_ALIVE_INTERVAL
+
+    def startSseChannel(self):
+        """
+        Start the generator and publish the results to the sse channel
+        """
+        # create the channel before the job starts so that publisher and subscriber share the same queue
+        PubSub.forChannel(self.sseChannel)
+        self.sseBl.scheduler.add_job(self._publishCallback, 'date', run_date=datetime.now())
+
+    def _publishCallback(self, bundleTime:float=None):
+        """
+        publish all results of the generator to the sse channel.
+        Buffered messages are published every flushInterval seconds and once the generator is exhausted.
+        If the end of the generator is reached the final result or None is published
+
+        Args:
+            bundleTime: Time in seconds in which all retrieved results are published as one data package. If None the flushInterval is used
+        """
+        if bundleTime is None:
+            bundleTime = self.flushInterval
+        buffer = []
+        lock = threading.Lock()
+        done = threading.Event()
+        lastPublished = [time.monotonic()]
+
+        def flush():
+            with lock:
+                messages = buffer.copy()
+                buffer.clear()
+            if messages or time.monotonic() - lastPublished[0] >= self.keepAliveInterval:
+                # an empty message keeps the subscription alive and is not displayed
+                self.sseBl.publish(json.dumps({'data': messages}), self.sseChannel)
+                lastPublished[0] = time.monotonic()
+
+        def flusher():
+            while not done.wait(bundleTime):
+                flush()
+
+        flushThread = threading.Thread(target=flusher, daemon=True)
+        flushThread.start()
+        ACTIVE_SSE_STREAMS.inc()
+        result = None
+        try:
+            with activated(self.profile):
+                for resPart in self.generator:
+                    if isinstance(resPart, DictStreamResult):
+                        result = resPart
+                        break
+                    with lock:
+                        buffer.append(resPart)
+        except Exception as e:
+            result = DictStreamResult(f"<br>❗ {e}")
+        finally:
+            ACTIVE_SSE_STREAMS.dec()
+            done.set()
+            flushThread.join()
+            flush()
+            if self.profile is not None:
+                self.profile.dumpCProfile()
+                if result is None:
+                    result = DictStreamResult(None)
+            if result:
+                response = result.getResponse(self)
+                if self.profile is not None:
+                    response["profile"] = self.profile.toDict()
+                self.sseBl.publish(json.dumps(response), self.sseChannel)
+            else:
+                self.sseBl.publish(None, self.sseChannel)
@@ -0,0 +1,188 @@
+import cProfile
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager, nullcontext
+
+
+class RequestProfile(object):
+    """
+    Opt-in wall time breakdown of a single request.
+    The profile is activated per thread, the instrumented steps (enhancers, wiki requests, rendering) record their
+    durations into the profile that is active in the current thread.
+    """
+
+    PARAMETER = "profile"
+    HEADER = "X-Orapi-Profile"
+    # cProfile dumps kept in the dump directory
+    MAX_DUMPS = 32
+    MAX_DUMP_AGE = 24 * 3600
+
+    _active = threading.local()
+
+    def __init__(self, withCProfile:bool=False, dumpDir:str=None):
+        """
+
+        Args:
+            withCProfile: If True the request is additionally profiled with cProfile
+            dumpDir: directory the cProfile dumps are stored in
+        """
+        self.id = uuid.uuid4().hex
+        self.start = time.perf_counter()
+        self.timings = {}
+        self._lock = threading.Lock()
+        self.cProfile = cProfile.Profile() if withCProfile else None
+        self.dumpDir = dumpDir
+        self.dumpFile = None
+
+    @classmethod
+    def fromRequest(cls, request, dumpDir:str=None, allowCProfile:bool=False) -> 'RequestProfile':
+        """
+        Returns a RequestProfile if profiling is requested by the profile parameter or the X-Orapi-Profile header
+        (1 for the timing breakdown, cprofile to additionally store a cProfile dump). Otherwise None
+
+        Args:
+            request: profiled request
+            dumpDir: directory the cProfile dumps are stored in
+            allowCProfile: If False cprofile requests only get the timing breakdown
+        """
+        value = request.values.get(cls.PARAMETER) or request.headers.get(cls.HEADER)
+        if not value or value.lower() in ["0", "false", "no"]:
+            return None
+        return cls(withCProfile=allowCProfile and value.lower() == "cprofile", dumpDir=dumpDir)
+
+    @classmethod
+    def getActive(cls) -> 'RequestProfile':
+        """
+        Returns the profile active in the current thread or None
+        """
+        return getattr(cls._active, "profile", None)
+
+    @contextmanager
+    def activate(self):
+        """
+        activate the profile in the current thread
+        """
+        previous = self.getActive()
+        self._active.profile = self
+        if self.cProfile is not None:
+            self.cProfile.enable()
+        try:
+            yield self
+        finally:
+            if self.cProfile is not None:
+                self.cProfile.disable()
+            self._active.profile = previous
+
+    def record(self, phase:str, name:str, seconds:float):
+        """
+        add the duration of a step. Steps with the same phase and name are summed up
+        """
+        with self._lock:
+            count, total = self.timings.get((phase, name), (0, 0.0))
+            self.timings[(phase, name)] = (count + 1, total + seconds)
+
+    def dumpCProfile(self) -> str:
+        """
+        stores the cProfile stats in the dumpDir
+
+        Returns:
+            name of the dump file
+        """
+        if self.cProfile is None or self.dumpDir is None:
+            return None
+        os.makedirs(self.dumpDir, exist_ok=True)
+        self.dumpFile = f"{self.id}.prof"
+        self.cProfile.dump_stats(os.path.join(self.dumpDir, self.dumpFile))
+        self.purgeDumps(self.dumpDir)
+        return self.dumpFile
+
+    @classmethod
+    def purgeDumps(cls, dumpDir:str, maxDumps:int=None, maxAge:float=None):
+        """
+        removes the dumps older than maxAge seconds and the oldest dumps if more than maxDumps are stored
+
+        Args:
+            dumpDir: directory the cProfile dumps are stored in
+            maxDumps: maximum number of dumps. Default MAX_DUMPS
+            maxAge: maximum age of a dump in seconds. Default MAX_DUMP_AGE
+        """
+        if maxDumps is None:
+            maxDumps = cls.MAX_DUMPS
+        if maxAge is None:
+            maxAge = cls.MAX_DUMP_AGE
+        try:
+            entries = [(entry.stat().st_mtime, entry.path) for entry in os.scandir(dumpDir) if entry.is_file() and entry.name.endswith(".prof")]
+        except FileNotFoundError:
+            return
+        entries.sort()
+        expired = time.time() - maxAge
+        for i, (mtime, path) in enumerate(entries):
+            if mtime < expired or i < len(entries) - maxDumps:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    def toDict(self) -> dict:
+        """
+        Returns the timing breakdown
+        """
+        with self._lock:
+            timings = dict(self.timings)
+        phases = {}
+        for (phase, _name), (_count, seconds) in timings.items():
+            phases[phase] = phases.get(phase, 0.0) + seconds
+        res = {
+            "id": self.id,
+            "total": round(time.perf_counter() - self.start, 6),
+            "phases": {phase: round(seconds, 6) for phase, seconds in phases.items()},
+            "timings": [{"phase": phase, "name": name, "count": count, "seconds": round(seconds, 6)}
+                        for (phase, name), (count, seconds) in timings.items()]
+        }
+        if self.dumpFile:
+            res["cProfile"] = self.dumpFile
+        return res
+
+    def toServerTiming(self) -> str:
+        """
+        Returns the timing breakdown as value of the Server-Timing header
+        """
+        with self._lock:
+            timings = dict(self.timings)
+        entries = []
+        for (phase, name), (count, seconds) in timings.items():
+            description = f"{name} ({count}x)".replace('"', "'")
+            entries.append(f'{phase};desc="{description}";dur={seconds * 1000:.1f}')
+        entries.append(f"total;dur={(time.perf_counter() - self.start) * 1000:.1f}")
+        return ", ".join(entries)
+
+
+@contextmanager
+def measure(phase:str, name:str):
+    """
+    record the duration of the context in the profile active in the current thread (if any)
+
+    Args:
+        phase: phase of the step e.g. enhancer, wiki, render
+        name: name of the step
+    """
+    profile = RequestProfile.getActive()
+    if profile is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.record(phase, name, time.perf_counter() - start)
+
+
+def activated(profile:RequestProfile):
+    """
+    Returns a context that activates the given profile or does nothing if the profile is None
+    """
+    if profile is None:
+        return nullcontext()
+    return profile.activate()
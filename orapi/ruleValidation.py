@@ -0,0 +1,320 @@
+import datetime
+import hashlib
+import json
+import re
+from typing import Callable, Iterator, List
+
+from corpus.datasources.openresearch import OREvent, OREventSeries
+from dateutil import parser as dateParser
+
+
+class Invalid(object):
+    """
+    marks a value that could not be converted
+    """
+
+    def __repr__(self):
+        return "INVALID"
+
+
+INVALID = Invalid()
+
+
+class RuleTable(object):
+    """
+    columns of a list of records. Each column and each conversion of a column is extracted once and shared by all
+    rules. Conversions are computed once per distinct value of a column
+    """
+
+    def __init__(self, lod:list):
+        self.lod = lod
+        self.size = len(lod)
+        self._columns = {}
+        self._conversions = {}
+
+    def getColumn(self, name:str) -> list:
+        """
+        Returns the values of the given column. Missing and blank values are None
+        """
+        column = self._columns.get(name)
+        if column is None:
+            column = [self.normalize(record.get(name, None)) for record in self.lod]
+            self._columns[name] = column
+        return column
+
+    def getConverted(self, name:str, converter:Callable) -> list:
+        """
+        Returns the values of the given column converted with the given converter. Values that can not be converted
+        are INVALID
+        """
+        key = (name, converter)
+        converted = self._conversions.get(key)
+        if converted is None:
+            memo = {}
+            converted = []
+            for value in self.getColumn(name):
+                if value is None:
+                    converted.append(None)
+                    continue
+                try:
+                    converted.append(memo[value])
+                except KeyError:
+                    memo[value] = self.convert(converter, value)
+                    converted.append(memo[value])
+                except TypeError:
+                    # unhashable value
+                    converted.append(self.convert(converter, value))
+            self._conversions[key] = converted
+        return converted
+
+    @staticmethod
+    def convert(converter:Callable, value):
+        try:
+            return converter(value)
+        except (ValueError, TypeError, OverflowError):
+            return INVALID
+
+    @staticmethod
+    def normalize(value):
+        if value is None:
+            return None
+        if isinstance(value, float) and value != value:
+            # NaN of empty spreadsheet cells
+            return None
+        if isinstance(value, str):
+            value = value.strip()
+            if not value:
+                return None
+        return value
+
+
+def toDate(value) -> datetime.date:
+    """
+    converts dates, datetimes and date strings to a date
+    """
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    if isinstance(value, str):
+        try:
+            return datetime.date.fromisoformat(value)
+        except ValueError:
+            return dateParser.parse(value).date()
+    raise ValueError(f"{value} is not a date")
+
+
+def toInteger(value) -> int:
+    """
+    converts ints, integral floats and numeric strings to an int
+    """
+    if isinstance(value, bool):
+        raise ValueError(f"{value} is not an integer")
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float):
+        if value.is_integer():
+            return int(value)
+        raise ValueError(f"{value} is not an integer")
+    if isinstance(value, str) and value.isnumeric():
+        return int(value)
+    raise ValueError(f"{value} is not an integer")
+
+
+def toYear(value) -> int:
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.year
+    year = toInteger(value)
+    if not 1000 <= year <= 9999:
+        raise ValueError(f"{value} is not a year")
+    return year
+
+
+ACRONYM_YEAR = re.compile(r"^\S.*\s(\d{4})$")
+
+
+def toAcronymYear(value) -> int:
+    """
+    Returns the year at the end of an event acronym e.g. 2020 of "3DUI 2020"
+    """
+    match = ACRONYM_YEAR.match(str(value))
+    if match is None:
+        raise ValueError(f"{value} does not end with a year")
+    return int(match.group(1))
+
+
+class Rule(object):
+    """
+    declarative rule on the columns of the records of the given entity types
+    """
+
+    def __init__(self, message:str, entityTypes:list=None):
+        """
+
+        Args:
+            message: error message of the records violating the rule
+            entityTypes: entity types the rule applies to. If None the rule applies to all entity types
+        """
+        self.message = message
+        self.entityTypes = entityTypes
+
+    def appliesTo(self, entityType:str) -> bool:
+        return self.entityTypes is None or entityType in self.entityTypes
+
+    @property
+    def columns(self) -> list:
+        """
+        columns the rule looks at
+        """
+        return []
+
+    def getViolations(self, table:RuleTable) -> Iterator[int]:
+        """
+        Returns the indices of the records violating the rule
+        """
+        return NotImplemented
+
+
+class RequiredRule(Rule):
+    """
+    the column must have a value
+    """
+
+    def __init__(self, column:str, message:str=None, entityTypes:list=None):
+        super().__init__(message if message else f"{column} missing", entityTypes)
+        self.column = column
+
+    @property
+    def columns(self) -> list:
+        return [self.column]
+
+    def getViolations(self, table:RuleTable) -> Iterator[int]:
+        return (i for i, value in enumerate(table.getColumn(self.column)) if value is None)
+
+
+class ConversionRule(Rule):
+    """
+    the value of the column, if given, must be convertible by the converter
+    """
+
+    def __init__(self, column:str, converter:Callable, message:str, entityTypes:list=None):
+        super().__init__(message, entityTypes)
+        self.column = column
+        self.converter = converter
+
+    @property
+    def columns(self) -> list:
+        return [self.column]
+
+    def getViolations(self, table:RuleTable) -> Iterator[int]:
+        return (i for i, value in enumerate(table.getConverted(self.column, self.converter)) if value is INVALID)
+
+
+class ComparisonRule(Rule):
+    """
+    the converted values of two columns, if both are given and valid, must satisfy the comparison
+    """
+
+    def __init__(self, left:str, leftConverter:Callable, right:str, rightConverter:Callable, compare:Callable, message:str, entityTypes:list=None):
+        super().__init__(message, entityTypes)
+        self.left = left
+        self.leftConverter = leftConverter
+        self.right = right
+        self.rightConverter = rightConverter
+        self.compare = compare
+
+    @property
+    def columns(self) -> list:
+        return [self.left, self.right]
+
+    def getViolations(self, table:RuleTable) -> Iterator[int]:
+        leftValues = table.getConverted(self.left, self.leftConverter)
+        rightValues = table.getConverted(self.right, self.rightConverter)
+        for i, (leftValue, rightValue) in enumerate(zip(leftValues, rightValues)):
+            if leftValue is None or rightValue is None or leftValue is INVALID or rightValue is INVALID:
+                continue
+            if not self.compare(leftValue, rightValue):
+                yield i
+
+
+class RuleEngine(object):
+    """
+    validates the records of a table with rules on its columns in one pass per table.
+    The columns and their conversions are extracted once and shared by all rules
+    """
+
+    def __init__(self, rules:List[Rule]):
+        self.rules = rules
+
+    @classmethod
+    def getDefault(cls, strict:bool=False) -> 'RuleEngine':
+        """
+        Returns RuleEngine with the rules of events and event series
+
+        Args:
+            strict: If True the acronym and the year are also required and the acronym of an event must end with its year
+        """
+        event = [OREvent.templateName]
+        series = [OREventSeries.templateName]
+        rules = [
+            RequiredRule("ordinal", "Ordinal missing", entityTypes=event),
+            ConversionRule("ordinal", toInteger, "Ordinal format invalid", entityTypes=event),
+            ConversionRule("year", toYear, "Year format invalid", entityTypes=event),
+            ConversionRule("startDate", toDate, "Start date invalid", entityTypes=event),
+            ConversionRule("endDate", toDate, "End date invalid", entityTypes=event),
+            ComparisonRule("startDate", toDate, "endDate", toDate, lambda start, end: start <= end, "Start date after end date", entityTypes=event),
+            ComparisonRule("year", toYear, "startDate", toDate, lambda year, start: year == start.year, "Year differs from start date", entityTypes=event),
+        ]
+        if strict:
+            rules.extend([
+                RequiredRule("acronym", "Acronym missing", entityTypes=event + series),
+                RequiredRule("year", "Year missing", entityTypes=event),
+                ConversionRule("acronym", toAcronymYear, "Acronym does not end with the year", entityTypes=event),
+                ComparisonRule("acronym", toAcronymYear, "year", toYear, lambda acronymYear, year: acronymYear == year, "Year of acronym differs from year", entityTypes=event),
+            ])
+        return cls(rules)
+
+    def getVersion(self) -> str:
+        """
+        Returns a hash of the rules that changes if a rule is added, removed or changed
+        """
+        rules = [(type(rule).__name__, rule.columns, rule.message, rule.entityTypes) for rule in self.rules]
+        return hashlib.sha256(json.dumps(rules).encode()).hexdigest()[:16]
+
+    def getColumns(self, entityType:str) -> list:
+        """
+        Returns the columns the rules of the given entity type look at
+        """
+        columns = []
+        for rule in self.rules:
+            if rule.appliesTo(entityType):
+                columns.extend(column for column in rule.columns if column not in columns)
+        return columns
+
+    def validateTable(self, entityType:str, lod:list) -> List[list]:
+        """
+        Returns the error messages of each record of the given table or None if no rule applies to the table
+        """
+        rules = [rule for rule in self.rules if rule.appliesTo(entityType)]
+        if not rules:
+            return None
+        table = RuleTable(lod)
+        errors = [[] for _i in range(table.size)]
+        for rule in rules:
+            for i in rule.getViolations(table):
+                errors[i].append(rule.message)
+        return errors
+
+    def validateRecords(self, lods:dict):
+        """
+        validate the records of the given lods
+
+        Returns:
+            generator of (entity type, entity name, {"result", "errors"})
+        """
+        for entityType, lod in lods.items():
+            errors = self.validateTable(entityType, lod)
+            if errors is None:
+                continue
+            for record, errMsgs in zip(lod, errors):
+                yield entityType, record.get("pageTitle"), {"result": not errMsgs, "errors": errMsgs}
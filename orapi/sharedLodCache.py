@@ -0,0 +1,90 @@
+import json
+import pickle
+import time
+
+from orapi.dataTable import LodCache
+from orapi.sqliteCache import SqliteCache
+
+
+class LodStore(SqliteCache):
+    """
+    lods stored in a sqlite database shared by the worker processes of the server
+    """
+
+    TABLES = ["lods"]
+
+    def __init__(self, dbFile:str, maxSize:int=32):
+        """
+
+        Args:
+            dbFile: sqlite database file of the store
+            maxSize: maximum number of stored entries. The least recently used entries are removed first
+        """
+        super().__init__(dbFile)
+        self.maxSize = maxSize
+        self.getConnection().execute("""CREATE TABLE IF NOT EXISTS lods(
+            key TEXT PRIMARY KEY,
+            value BLOB NOT NULL,
+            accessed REAL NOT NULL,
+            expires REAL NOT NULL)""")
+        self.purge()
+
+    @staticmethod
+    def getKey(key) -> str:
+        return json.dumps(key, default=str)
+
+    def get(self, key):
+        """
+        Returns the stored value of the given key or None if the key is not stored or expired
+        """
+        now = time.time()
+        dbKey = self.getKey(key)
+        with self._lock:
+            connection = self.getConnection()
+            row = connection.execute("SELECT value FROM lods WHERE key=? AND expires>=?", (dbKey, now)).fetchone()
+            if row is None:
+                return None
+            connection.execute("UPDATE lods SET accessed=? WHERE key=?", (now, dbKey))
+        return pickle.loads(row[0])
+
+    def put(self, key, value, ttl:float):
+        """
+        store the given value under the given key for ttl seconds
+        """
+        now = time.time()
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            connection = self.getConnection()
+            connection.execute("INSERT OR REPLACE INTO lods(key, value, accessed, expires) VALUES (?,?,?,?)",
+                               (self.getKey(key), data, now, now + ttl))
+            connection.execute("DELETE FROM lods WHERE key NOT IN (SELECT key FROM lods ORDER BY accessed DESC LIMIT ?)", (self.maxSize,))
+
+
+class SharedLodCache(LodCache):
+    """
+    LodCache whose entries are also stored in a LodStore so that a lod cached by one worker process is available to
+    the other workers e.g. the enhanced series of an html view for the table data requests handled by another worker
+    """
+
+    def __init__(self, dbFile:str, maxSize:int=32, ttl:float=600):
+        """
+
+        Args:
+            dbFile: sqlite database file shared by the workers
+            maxSize: maximum number of cached entries
+            ttl: time to live of an entry in seconds
+        """
+        super().__init__(maxSize=maxSize, ttl=ttl)
+        self.store = LodStore(dbFile, maxSize=maxSize)
+
+    def get(self, key):
+        value = super().get(key)
+        if value is None:
+            value = self.store.get(key)
+            if value is not None:
+                super().put(key, value)
+        return value
+
+    def put(self, key, value):
+        super().put(key, value)
+        self.store.put(key, value, self.ttl)
@@ -0,0 +1,53 @@
+import os
+import sqlite3
+import threading
+import time
+
+
+class SqliteCache:
+    """
+    Base class of the persistent caches stored in a sqlite database shared by the worker processes of the server.
+    Each table of the cache has an expires column
+    """
+
+    TABLES = []
+
+    def __init__(self, dbFile:str):
+        """
+
+        Args:
+            dbFile: sqlite database file of the cache
+        """
+        self.dbFile = dbFile
+        dbDir = os.path.dirname(os.path.abspath(dbFile))
+        os.makedirs(dbDir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = None
+        self._pid = None
+
+    def getConnection(self) -> sqlite3.Connection:
+        """
+        Returns the connection of the current process. Worker processes forked from the server open their own connection
+        """
+        if self._pid != os.getpid():
+            self._connection = sqlite3.connect(self.dbFile, timeout=10, check_same_thread=False, isolation_level=None)
+            # the cache is shared by the worker processes of the server
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._pid = os.getpid()
+        return self._connection
+
+    def purge(self):
+        """
+        remove the expired entries
+        """
+        now = time.time()
+        with self._lock:
+            for table in self.TABLES:
+                self.getConnection().execute(f"DELETE FROM {table} WHERE expires < ?", (now,))
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None and self._pid == os.getpid():
+                self._connection.close()
+            self._connection = None
+            self._pid = None
@@ -0,0 +1,112 @@
+import json
+import time
+
+from orapi.sqliteCache import SqliteCache
+
+
+class UrlCheckCache(SqliteCache):
+    """
+    Persistent cache of url checks and Wayback lookups stored in a sqlite database.
+    Positive results (available urls, archived urls) and negative results are kept for separate TTLs.
+    Transient failures (connection errors, timeouts and server errors) are not cached
+    """
+
+    TABLES = ["urlCheck", "archivedUrl"]
+    POSITIVE_TTL = 7 * 24 * 3600
+    NEGATIVE_TTL = 24 * 3600
+
+    def __init__(self, dbFile:str, positiveTtl:float=None, negativeTtl:float=None):
+        """
+
+        Args:
+            dbFile: sqlite database file of the cache
+            positiveTtl: seconds available and archived urls are cached
+            negativeTtl: seconds unavailable and not archived urls are cached
+        """
+        super().__init__(dbFile)
+        self.positiveTtl = positiveTtl if positiveTtl is not None else self.POSITIVE_TTL
+        self.negativeTtl = negativeTtl if negativeTtl is not None else self.NEGATIVE_TTL
+        connection = self.getConnection()
+        connection.execute("""CREATE TABLE IF NOT EXISTS urlCheck(
+            url TEXT PRIMARY KEY,
+            statusCode INTEGER,
+            finalUrl TEXT,
+            error TEXT,
+            contains TEXT NOT NULL,
+            expires REAL NOT NULL)""")
+        connection.execute("""CREATE TABLE IF NOT EXISTS archivedUrl(
+            url TEXT PRIMARY KEY,
+            archiveUrl TEXT,
+            expires REAL NOT NULL)""")
+        self.purge()
+
+    def getTtl(self, isPositive:bool) -> float:
+        return self.positiveTtl if isPositive else self.negativeTtl
+
+    @staticmethod
+    def isTransient(statusCode:int=None, error:str=None) -> bool:
+        """
+        Returns True if the check failed for a reason that may disappear on the next request
+        """
+        return error is not None or statusCode is None or statusCode >= 500
+
+    def getCheck(self, url:str, mustContains:list=None) -> dict:
+        """
+        Returns the cached check of the given url or None if it is not cached, expired or lacks one of the content checks
+
+        Args:
+            url: checked url
+            mustContains: texts the cached check must contain the result for
+
+        Returns:
+            dict with statusCode, finalUrl, error and contains (text and whether it was found)
+        """
+        with self._lock:
+            row = self.getConnection().execute("SELECT statusCode, finalUrl, error, contains FROM urlCheck WHERE url=? AND expires>=?",
+                                               (url, time.time())).fetchone()
+        if row is None:
+            return None
+        statusCode, finalUrl, error, contains = row
+        contains = json.loads(contains)
+        if statusCode == 200 and mustContains and any(text not in contains for text in mustContains):
+            return None
+        return {"statusCode": statusCode, "finalUrl": finalUrl, "error": error, "contains": contains}
+
+    def putCheck(self, url:str, statusCode:int=None, finalUrl:str=None, error:str=None, contains:dict=None):
+        """
+        cache the check of the given url. Content checks of an unexpired entry of the same status are merged.
+        Transient failures are not cached
+        """
+        if self.isTransient(statusCode, error):
+            return
+        contains = dict(contains) if contains else {}
+        cached = self.getCheck(url)
+        if cached is not None and cached["statusCode"] == statusCode:
+            contains = {**cached["contains"], **contains}
+        expires = time.time() + self.getTtl(statusCode == 200)
+        with self._lock:
+            self.getConnection().execute("INSERT OR REPLACE INTO urlCheck(url, statusCode, finalUrl, error, contains, expires) VALUES (?,?,?,?,?,?)",
+                                         (url, statusCode, finalUrl, error, json.dumps(contains), expires))
+
+    def getArchive(self, url:str) -> (bool, str):
+        """
+        Returns:
+            (isCached, archive url or None if the url is not archived)
+        """
+        with self._lock:
+            row = self.getConnection().execute("SELECT archiveUrl FROM archivedUrl WHERE url=? AND expires>=?", (url, time.time())).fetchone()
+        if row is None:
+            return False, None
+        return True, row[0]
+
+    def putArchive(self, url:str, archiveUrl:str=None):
+        """
+        cache the Wayback lookup of the given url
+
+        Args:
+            url: looked up url
+            archiveUrl: url of the closest snapshot. None if the url is not archived
+        """
+        expires = time.time() + self.getTtl(archiveUrl is not None)
+        with self._lock:
+            self.getConnection().execute("INSERT OR REPLACE INTO archivedUrl(url, archiveUrl, expires) VALUES (?,?,?)", (url, archiveUrl, expires))
@@ -74,6 +74,50 @@ class PageRevision(JSONAble):
                             yield pageRevision
 
 
+    @staticmethod
+    def getLatestRevisions(pageTitles:List[str], wikiUrl:str, batchSize:int=50) -> dict:
+        """
+        Returns the latest revision of the given pages.
+        The revisions are queried in batches of batchSize pages per request
+
+        Args:
+            pageTitles(list): titles of the pages
+            wikiUrl(str): location of the wiki the pages are in
+            batchSize(int): number of pages per request (mediawiki allows at most 50 titles for normal users)
+
+        Returns:
+            dict of pageTitle and the latest PageRevision. Pages that do not exist are not included
+        """
+        url = f"{wikiUrl}/api.php"
+        titles = sorted({pageTitle for pageTitle in pageTitles if pageTitle})
+        latestRevisions = {}
+        for i in range(0, len(titles), batchSize):
+            batch = titles[i:i+batchSize]
+            params = {
+                "action": "query",
+                "prop": "revisions",
+                "titles": "|".join(batch),
+                "rvprop": "ids|timestamp",
+                "format": "json",
+                "formatversion": 2
+            }
+            resp = requests.post(url=url, data=params)
+            data = resp.json()
+            queryRecord = data.get("query", {})
+            # map normalized titles back to the requested titles
+            titleLookup = {normalized.get("to"): normalized.get("from") for normalized in queryRecord.get("normalized", [])}
+            for page in queryRecord.get("pages", []):
+                revisions = page.get("revisions", [])
+                if page.get("missing", False) or not revisions:
+                    continue
+                title = titleLookup.get(page.get("title"), page.get("title"))
+                rev = {**revisions[0], "pageTitle": title, "pageId": page.get("pageid")}
+                pageRevision = PageRevision()
+                pageRevision.fromDict(rev)
+                latestRevisions[title] = pageRevision
+        return latestRevisions
+
+
 class PageHistory:
     """
     Represents the history of a page
@@ -0,0 +1,81 @@
+import hashlib
+import json
+import time
+
+from orapi.sqliteCache import SqliteCache
+
+
+class ValidationCache(SqliteCache):
+    """
+    Persistent cache of the validation results of records stored in a sqlite database.
+    A result is keyed by the validator and a hash of the fields of the record the validator looks at, so that
+    an unchanged record reuses its previous outcome while a record with a changed relevant field is validated again
+    """
+
+    TABLES = ["validationResult"]
+    TTL = 24 * 3600
+    INVALID_TTL = 3600
+    MAX_VARIABLES = 500
+
+    def __init__(self, dbFile:str, ttl:float=None, invalidTtl:float=None):
+        """
+
+        Args:
+            dbFile: sqlite database file of the cache
+            ttl: seconds the results of valid records are cached
+            invalidTtl: seconds the results of invalid records are cached. Shorter since they may depend on external state e.g. an unavailable homepage
+        """
+        super().__init__(dbFile)
+        self.ttl = ttl if ttl is not None else self.TTL
+        self.invalidTtl = invalidTtl if invalidTtl is not None else self.INVALID_TTL
+        self.getConnection().execute("""CREATE TABLE IF NOT EXISTS validationResult(
+            key TEXT PRIMARY KEY,
+            result TEXT NOT NULL,
+            expires REAL NOT NULL)""")
+        self.purge()
+
+    @staticmethod
+    def getKey(validator:str, entityType:str, record:dict, fields:list=None, version:str=None) -> str:
+        """
+        Returns the key of the validation result of the given record
+
+        Args:
+            validator: name of the validator
+            entityType: type of the entity
+            record: entity record
+            fields: fields of the record the validator looks at. If None the whole record is hashed
+            version: version of the validation logic so that results of a changed validator are not reused
+        """
+        if fields is None:
+            fields = record.keys()
+        values = {field: record.get(field, None) for field in fields}
+        content = json.dumps([validator, version, entityType, values], sort_keys=True, default=str)
+        return hashlib.sha256(content.encode()).hexdigest()
+
+    def getResults(self, keys:list) -> dict:
+        """
+        Returns the unexpired cached results of the given keys
+
+        Returns:
+            dict of key and {"result", "errors"}
+        """
+        keys = list(set(keys))
+        now = time.time()
+        results = {}
+        for i in range(0, len(keys), self.MAX_VARIABLES):
+            batch = keys[i:i + self.MAX_VARIABLES]
+            query = f"SELECT key, result FROM validationResult WHERE expires>=? AND key IN ({','.join('?' * len(batch))})"
+            with self._lock:
+                rows = self.getConnection().execute(query, (now, *batch)).fetchall()
+            for key, result in rows:
+                results[key] = json.loads(result)
+        return results
+
+    def putResult(self, key:str, result:dict):
+        """
+        cache the validation result of the given key
+        """
+        expires = time.time() + (self.ttl if result.get("result") else self.invalidTtl)
+        with self._lock:
+            self.getConnection().execute("INSERT OR REPLACE INTO validationResult(key, result, expires) VALUES (?,?,?)",
+                                         (key, json.dumps(result, default=str), expires))
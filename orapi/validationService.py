@@ -1,6 +1,11 @@
+import codecs
 import requests
 import json
+import threading
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
 from typing import Dict, Tuple
+from urllib.parse import urlparse
 
 import validators
 from corpus.datasources.openresearch import OREvent, OREventSeries
@@ -8,6 +13,12 @@ from fb4.widgets import Link
 from flask import Blueprint, request, jsonify
 from spreadsheet.tableediting import TableEditing
 
+from orapi.eventIndex import EventIndex
+from orapi.metrics import VALIDATION_SECONDS, VALIDATED_RECORDS, VALIDATION_SERVICE_SECONDS, CACHED_VALIDATION_RECORDS
+from orapi.ruleValidation import RuleEngine
+from orapi.urlCheckCache import UrlCheckCache
+from orapi.validationCache import ValidationCache
+
 
 class ValidationBlueprint(object):
     """
@@ -42,6 +53,11 @@ class ValidationBlueprint(object):
         def validateOrdinalFormat():
             return self.validateOrdinalFormat()
 
+        @self.blueprint.route('/rules', methods=["POST"])
+        @self.appWrap.csrf.exempt
+        def validateRules():
+            return self.validateRules()
+
         app.register_blueprint(self.blueprint)
 
     def validateHomepage(self):
@@ -66,16 +82,214 @@ class ValidationBlueprint(object):
         res = OrdinalValidator.validate(tableEditing)
         return jsonify(res)
 
+    def validateRules(self):
+        """
+        validates the records with the column rules. With the query parameter strict=true the strict rules are applied
+
+        Returns:
+            validation result as json
+        """
+        tableEditing = self.getTableEdingFromRequest()
+        validator = StrictRuleValidator if request.args.get("strict", "").lower() == "true" else RuleValidator
+        res = validator.validate(tableEditing)
+        return jsonify(res)
+
     def getTableEdingFromRequest(self) -> TableEditing:
-        lods = json.loads(request.json)
+        lods = request.json
+        if isinstance(lods, str):
+            # older clients send the lods json encoded as json string
+            lods = json.loads(lods)
         tableEditing = TableEditing()
         tableEditing.lods=lods
         return tableEditing
 
+class ValidatorRegistry(object):
+    """
+    validators by name. Validators are either Validator classes that are called in-process or urls of remote
+    validation services (see ValidationBlueprint) the lods are posted to
+    """
+    TIMEOUT = 60
+
+    def __init__(self, validators:dict=None, cache:ValidationCache=None):
+        """
+
+        Args:
+            validators: validator name and Validator class or url of the validation service
+            cache: cache of the validation results of the records. If set only records whose validated fields changed are validated again
+        """
+        self.cache = cache
+        self.validators = {}
+        if validators is not None:
+            for name, validator in validators.items():
+                self.register(name, validator)
+
+    @classmethod
+    def getDefault(cls) -> 'ValidatorRegistry':
+        """
+        Returns ValidatorRegistry with the in-process homepage and rule validators
+        """
+        return cls({"homepage": HomepageValidator, "rules": RuleValidator})
+
+    @staticmethod
+    def parseServiceUrl(spec:str) -> tuple:
+        """
+        parses a remote validation service given as NAME=URL e.g. "homepage=http://localhost:8558/validate/homepage"
+
+        Returns:
+            (name, url)
+        """
+        name, sep, url = spec.partition("=")
+        name = name.strip()
+        url = url.strip()
+        parsedUrl = urlparse(url)
+        if not sep or not name:
+            raise ValueError(f"Invalid validation service '{spec}' expected NAME=URL: name missing")
+        if parsedUrl.scheme not in ["http", "https"] or not parsedUrl.netloc:
+            raise ValueError(f"Invalid validation service '{spec}' expected NAME=URL: '{url}' is not a http(s) url")
+        return name, url
+
+    @classmethod
+    def parseServiceUrls(cls, specs:list) -> dict:
+        """
+        Returns the urls of the given remote validation services by name (see parseServiceUrl)
+        """
+        serviceUrls = {}
+        for spec in specs if specs else []:
+            name, url = cls.parseServiceUrl(spec)
+            serviceUrls[name] = url
+        return serviceUrls
+
+    def register(self, name:str, validator):
+        """
+        register the given validator under the given name
+
+        Args:
+            name: name of the validator
+            validator: Validator class or url of a remote validation service
+        """
+        if not isinstance(validator, str) and not (isinstance(validator, type) and issubclass(validator, Validator)):
+            raise TypeError(f"Validator {name} must be a Validator class or the url of a validation service")
+        self.validators[name] = validator
+
+    def isRemote(self, name:str) -> bool:
+        return isinstance(self.validators.get(name), str)
+
+    def items(self):
+        return self.validators.items()
+
+    def validate(self, name:str, tableEditing:TableEditing) -> dict:
+        """
+        validate the given tableEditing with the validator of the given name
+
+        Returns:
+            dict of entity type, entity name and {"result", "errors"}
+        """
+        validator = self.validators[name]
+        with VALIDATION_SERVICE_SECONDS.time(service=name):
+            if isinstance(validator, str):
+                data = json.dumps(tableEditing.lods, default=str)
+                resp = requests.post(validator, data=data, headers={"Content-Type": "application/json"}, timeout=self.TIMEOUT)
+                resp.raise_for_status()
+                return resp.json()
+            return validator.validate(tableEditing)
+
+    def getValidatedFields(self, name:str, entityType:str) -> list:
+        """
+        Returns the fields of the records of the given entity type the validator of the given name looks at.
+        None if the fields are not known e.g. of remote validation services
+        """
+        validator = self.validators[name]
+        if isinstance(validator, str):
+            return None
+        return validator.getValidatedFields(entityType)
+
+    def getVersion(self, name:str) -> str:
+        """
+        Returns the version of the validator of the given name. Remote validation services are identified by their url
+        """
+        validator = self.validators[name]
+        if isinstance(validator, str):
+            return validator
+        return validator.getVersion()
+
+    def isCacheable(self, name:str) -> bool:
+        """
+        Returns True if the results of the validator of the given name only depend on the validated record
+        """
+        validator = self.validators[name]
+        return isinstance(validator, str) or validator.IS_CACHEABLE
+
+    def validateRecords(self, name:str, tableEditing:TableEditing):
+        """
+        validate the given tableEditing with the validator of the given name and yield the result of each record as
+        soon as it is available. Remote validation services yield the records once the service answered.
+        If a cache is set the cached results of unchanged records are yielded first and only the other records are
+        validated. Records without a pageTitle or with a pageTitle repeated in their table are not cached since their
+        results can not be told apart
+
+        Returns:
+            generator of (entity type, entity name, {"result", "errors"})
+        """
+        if self.cache is None or not self.isCacheable(name):
+            yield from self.validateUncachedRecords(name, tableEditing)
+            return
+        keys = {}
+        version = self.getVersion(name)
+        for entityType, lod in tableEditing.lods.items():
+            fields = self.getValidatedFields(name, entityType)
+            pageTitles = Counter(record.get("pageTitle") for record in lod)
+            for record in lod:
+                entityName = record.get("pageTitle")
+                if entityName is not None and pageTitles[entityName] == 1:
+                    keys[(entityType, entityName)] = self.cache.getKey(name, entityType, record, fields, version=version)
+        cachedResults = self.cache.getResults(list(keys.values()))
+        uncachedLods = {}
+        for entityType, lod in tableEditing.lods.items():
+            uncached = uncachedLods.setdefault(entityType, [])
+            for record in lod:
+                entityName = record.get("pageTitle")
+                key = keys.get((entityType, entityName))
+                recordResult = cachedResults.get(key) if key is not None else None
+                if recordResult is None:
+                    uncached.append(record)
+                else:
+                    CACHED_VALIDATION_RECORDS.inc(validator=name)
+                    yield entityType, entityName, recordResult
+        if any(uncachedLods.values()):
+            uncachedTableEditing = TableEditing()
+            uncachedTableEditing.lods = uncachedLods
+            for entityType, entityName, recordResult in self.validateUncachedRecords(name, uncachedTableEditing):
+                key = keys.get((entityType, entityName))
+                if key is not None:
+                    self.cache.putResult(key, recordResult)
+                yield entityType, entityName, recordResult
+
+    def validateUncachedRecords(self, name:str, tableEditing:TableEditing):
+        """
+        validate the given tableEditing with the validator of the given name without using the cache
+
+        Returns:
+            generator of (entity type, entity name, {"result", "errors"})
+        """
+        validator = self.validators[name]
+        if isinstance(validator, str):
+            # validate times the request to the validation service
+            for entityType, records in self.validate(name, tableEditing).items():
+                for entityName, recordResult in records.items():
+                    yield entityType, entityName, recordResult
+        else:
+            with VALIDATION_SERVICE_SECONDS.time(service=name):
+                yield from validator.validateRecords(tableEditing)
+
+
 class Validator(object):
     """
     Validates a dict of dicts
     """
+    # False if the result of a record also depends on other records or the state of a wiki
+    IS_CACHEABLE = True
+    # increase if the validation logic changes so that cached results of the previous logic are not reused
+    VERSION = 1
 
     def validate(self, tableEditing:TableEditing) -> dict:
         """
@@ -102,6 +316,56 @@ class Validator(object):
         """
         return NotImplemented
 
+    @classmethod
+    def getValidatedFields(cls, entityType:str) -> list:
+        """
+        Returns the fields of the records of the given entity type the validator looks at.
+        None if the validator may look at all fields
+        """
+        return None
+
+    @classmethod
+    def getVersion(cls) -> str:
+        """
+        Returns the version of the validation logic. Part of the key of the cached validation results
+        """
+        return f"{cls.__name__}:{cls.VERSION}"
+
+    @classmethod
+    def validateRecords(cls, tableEditing:TableEditing):
+        """
+        validate the records of the given tableEditing and yield the result of each record as soon as it is available
+
+        Returns:
+            generator of (entity type, entity name, {"result", "errors"})
+        """
+        for tableName, lod in tableEditing.lods.items():
+            for d in lod:
+                recordResult = cls.getRecordResult(tableName, d)
+                if recordResult is not None:
+                    yield tableName, d.get("pageTitle"), recordResult
+
+    @classmethod
+    def getRecordResult(cls, entityType:str, entityRecord:dict, validateRecord=None) -> dict:
+        """
+        validate the given record
+
+        Args:
+            entityType: type of the entity
+            entityRecord: entity record
+            validateRecord: function validating the record. If None validateRecord of the class is used
+
+        Returns:
+            {"result", "errors"} or None if the record is not validated by this validator
+        """
+        if validateRecord is None:
+            validateRecord = cls.validateRecord
+        isValid, errMsgs = validateRecord(entityName=entityRecord.get("pageTitle"), entityType=entityType, entityRecord=entityRecord)
+        if isValid is None and errMsgs is None:
+            return None
+        VALIDATED_RECORDS.inc(validator=cls.__name__, result="valid" if isValid else "invalid")
+        return {"result": isValid, "errors": errMsgs}
+
     @classmethod
     def validateRecordBased(cls, tableEditing:TableEditing) -> dict:
         """
@@ -112,18 +376,369 @@ class Validator(object):
         Returns:
 
         """
-        validationResult = {}
-        for tableName, lod in tableEditing.lods.items():
-            validationResult[tableName] = {}
-            for d in lod:
-                pageTitle = d.get("pageTitle")
-                isValid, errMsgs = cls.validateRecord(entityName=pageTitle, entityType=tableName, entityRecord=d)
-                if isValid is None and errMsgs is None:
-                    continue
-                validationResult[tableName][pageTitle] = {"result": isValid, "errors": errMsgs}
+        validationResult = {tableName: {} for tableName in tableEditing.lods.keys()}
+        with VALIDATION_SECONDS.time(validator=cls.__name__):
+            for tableName, entityName, recordResult in cls.validateRecords(tableEditing):
+                validationResult[tableName][entityName] = recordResult
         return validationResult
 
 
+class UrlCheck(object):
+    """
+    result of requesting a url
+    """
+    CHUNK_SIZE = 16 * 1024
+    MAX_BODY_BYTES = 2 * 1024 * 1024
+
+    def __init__(self, url:str, statusCode:int=None, finalUrl:str=None, error:str=None, contains:dict=None):
+        """
+
+        Args:
+            url: requested url
+            statusCode: status code of the response. None if the request failed
+            finalUrl: url of the response after following the redirects
+            error: error message if the request failed
+            contains: expected texts and whether they were found in the body
+        """
+        self.url = url
+        self.statusCode = statusCode
+        self.finalUrl = finalUrl
+        self.error = error
+        self.contains = contains if contains is not None else {}
+
+    @property
+    def isAvailable(self) -> bool:
+        return self.statusCode == 200
+
+    def containsText(self, text:str) -> bool:
+        """
+        Returns True if the given text was found in the body of the response
+        """
+        return self.contains.get(text, False)
+
+    @classmethod
+    def fetch(cls, url:str, timeout:float, mustContains:list=None, maxBytes:int=None, session:requests.Session=None) -> 'UrlCheck':
+        """
+        request the given url.
+        If no content is expected only a HEAD request is sent and a GET request only if HEAD is not answered with 200.
+        Otherwise the body is streamed until all expected texts are found or maxBytes are read.
+
+        Args:
+            url: url to request
+            timeout: timeout of the request in seconds
+            mustContains: expected texts that are looked up in the body
+            maxBytes: maximal number of bytes of the body that are searched for the expected texts
+            session: session used for the requests
+        """
+        if maxBytes is None:
+            maxBytes = cls.MAX_BODY_BYTES
+        if session is None:
+            session = requests
+        try:
+            if not mustContains:
+                resp = session.head(url, allow_redirects=True, timeout=timeout)
+                if resp.status_code == 200:
+                    return cls(url, statusCode=resp.status_code, finalUrl=resp.url)
+            with session.get(url, allow_redirects=True, timeout=timeout, stream=True) as resp:
+                contains = {}
+                if mustContains and resp.status_code == 200:
+                    contains = cls.searchBody(resp, mustContains, maxBytes)
+                return cls(url, statusCode=resp.status_code, finalUrl=resp.url, contains=contains)
+        except Exception as e:
+            return cls(url, error=str(e))
+
+    @classmethod
+    def searchBody(cls, resp:requests.Response, texts:list, maxBytes:int) -> dict:
+        """
+        search the streamed body of the given response for the given texts
+
+        Returns:
+            dict of text and whether it was found
+        """
+        found = {text: False for text in texts}
+        decoder = codecs.getincrementaldecoder(cls.getEncoding(resp))(errors="replace")
+        # keep the end of the previous chunk to find texts spanning two chunks
+        overlap = max(len(text) for text in texts) - 1
+        tail = ""
+        bytesRead = 0
+        for chunk in resp.iter_content(chunk_size=cls.CHUNK_SIZE):
+            bytesRead += len(chunk)
+            window = tail + decoder.decode(chunk)
+            for text, isFound in found.items():
+                if not isFound and text in window:
+                    found[text] = True
+            if all(found.values()) or bytesRead >= maxBytes:
+                break
+            tail = window[-overlap:] if overlap > 0 else ""
+        return found
+
+    @staticmethod
+    def getEncoding(resp:requests.Response) -> str:
+        encoding = resp.encoding if resp.encoding else "utf-8"
+        try:
+            codecs.lookup(encoding)
+        except LookupError:
+            encoding = "utf-8"
+        return encoding
+
+
+class UrlChecker(object):
+    """
+    Host aware worker pool for url checks and Wayback lookups.
+    At most maxPerHost requests run concurrently per host and the free workers take the pending requests of the hosts
+    in turn so that a series with many homepages on one host does not hammer that host or block the other hosts.
+    Each host has its own session to reuse the connections.
+    Concurrent checks of the same url share one request. Wayback lookups are collected and resolved in batches.
+    If a cache is set the results are taken from and stored in the cache.
+    """
+
+    MAX_WORKERS = 16
+    MAX_PER_HOST = 2
+    ARCHIVE_BATCH_DELAY = 0.2
+    _instance = None
+    _instanceLock = threading.Lock()
+
+    def __init__(self, maxWorkers:int=None, timeout:float=2, cache:UrlCheckCache=None, maxPerHost:int=None, archiveApiUrl:str=None, archiveBatchDelay:float=None):
+        """
+
+        Args:
+            maxWorkers: maximal number of concurrent requests
+            timeout: timeout of the url requests in seconds
+            cache: persistent cache of the url checks and Wayback lookups
+            maxPerHost: maximal number of concurrent requests per host
+            archiveApiUrl: url of the Wayback availability api. Defaults to ArchivedUrl.API_URL
+            archiveBatchDelay: seconds Wayback lookups are collected before they are requested as one batch
+        """
+        self.timeout = timeout
+        self.archiveApiUrl = archiveApiUrl if archiveApiUrl else ArchivedUrl.API_URL
+        self.archiveBatchDelay = archiveBatchDelay if archiveBatchDelay is not None else self.ARCHIVE_BATCH_DELAY
+        self.cache = cache
+        self.maxWorkers = maxWorkers if maxWorkers else self.MAX_WORKERS
+        self.maxPerHost = maxPerHost if maxPerHost else self.MAX_PER_HOST
+        self.executor = ThreadPoolExecutor(max_workers=self.maxWorkers, thread_name_prefix="urlChecker")
+        self._inflight = {}
+        # pending tasks per host in the order the hosts are served
+        self._pending = OrderedDict()
+        self._activePerHost = {}
+        self._running = 0
+        self._sessions = {}
+        # pending Wayback lookups of the next batch
+        self._archiveBatch = {}
+        self._archiveTimer = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def getInstance(cls) -> 'UrlChecker':
+        """
+        Returns the UrlChecker shared by all validations of the process
+        """
+        with cls._instanceLock:
+            if cls._instance is None:
+                cls._instance = cls(timeout=HomepageValidator.TIMEOUT)
+            return cls._instance
+
+    @staticmethod
+    def getHost(url:str) -> str:
+        try:
+            return (urlparse(url).hostname or "").lower()
+        except ValueError:
+            return ""
+
+    def getSession(self, host:str) -> requests.Session:
+        """
+        Returns the session of the given host
+        """
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=self.maxPerHost)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._sessions[host] = session
+        return session
+
+    def submit(self, key:tuple, host:str, function, *args) -> Future:
+        """
+        schedule the given function for the given host unless a function with the same key is in progress.
+        The function is called with the session of the host as keyword argument session
+
+        Returns:
+            Future of the function with the given key
+        """
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                return future
+            future = Future()
+            self._inflight[key] = future
+            self._pending.setdefault(host, deque()).append((future, function, args))
+        future.add_done_callback(lambda done: self._forget(key, done))
+        self._schedule()
+        return future
+
+    def _schedule(self):
+        """
+        start pending tasks while workers are free, taking the hosts in turn
+        """
+        with self._lock:
+            while self._running < self.maxWorkers:
+                host = next((host for host in self._pending if self._activePerHost.get(host, 0) < self.maxPerHost), None)
+                if host is None:
+                    break
+                tasks = self._pending.pop(host)
+                task = tasks.popleft()
+                if tasks:
+                    # the host is served again after the other hosts
+                    self._pending[host] = tasks
+                self._activePerHost[host] = self._activePerHost.get(host, 0) + 1
+                self._running += 1
+                self.executor.submit(self._run, host, *task)
+
+    def _run(self, host:str, future:Future, function, args:tuple):
+        try:
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(function(*args, session=self.getSession(host)))
+                except BaseException as e:
+                    future.set_exception(e)
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._activePerHost[host] -= 1
+                if self._activePerHost[host] == 0:
+                    del self._activePerHost[host]
+            self._schedule()
+
+    def _forget(self, key:tuple, future:Future):
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    @staticmethod
+    def getDone(result) -> Future:
+        future = Future()
+        future.set_result(result)
+        return future
+
+    def check(self, url:str, mustContains:list=None) -> Future:
+        """
+        Args:
+            url: url to check
+            mustContains: expected texts that are looked up in the body
+
+        Returns:
+            Future of the UrlCheck of the given url
+        """
+        mustContains = tuple(sorted(set(mustContains))) if mustContains else tuple()
+        if self.cache is not None:
+            cached = self.cache.getCheck(url, mustContains)
+            if cached is not None:
+                return self.getDone(UrlCheck(url, **cached))
+        return self.submit(("check", url, mustContains), self.getHost(url), self._check, url, mustContains)
+
+    def _check(self, url:str, mustContains:tuple, session:requests.Session=None) -> UrlCheck:
+        urlCheck = UrlCheck.fetch(url, timeout=self.timeout, mustContains=mustContains, session=session)
+        if self.cache is not None:
+            self.cache.putCheck(url, statusCode=urlCheck.statusCode, finalUrl=urlCheck.finalUrl, error=urlCheck.error, contains=urlCheck.contains)
+        return urlCheck
+
+    def lookupArchive(self, url:str, flush:bool=False) -> Future:
+        """
+        Looks up the given url in the Wayback Machine. The lookups are collected for archiveBatchDelay seconds or
+        until ArchivedUrl.BATCH_SIZE urls are pending and are then resolved by one batched request
+
+        Args:
+            url: url to look up
+            flush: if True the pending lookups are requested right away
+
+        Returns:
+            Future of the ArchivedUrl of the given url
+        """
+        if self.cache is not None:
+            isCached, archiveUrl = self.cache.getArchive(url)
+            if isCached:
+                return self.getDone(ArchivedUrl.fromArchiveUrl(url, archiveUrl))
+        key = ("archive", url)
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is None:
+                future = Future()
+                self._inflight[key] = future
+                self._archiveBatch[url] = future
+                isNew = True
+            else:
+                isNew = False
+            flush = flush or len(self._archiveBatch) >= ArchivedUrl.BATCH_SIZE
+            if self._archiveBatch and not flush and self._archiveTimer is None:
+                self._archiveTimer = threading.Timer(self.archiveBatchDelay, self.flushArchiveLookups)
+                self._archiveTimer.daemon = True
+                self._archiveTimer.start()
+        if isNew:
+            future.add_done_callback(lambda done: self._forget(key, done))
+        if flush:
+            self.flushArchiveLookups()
+        return future
+
+    def lookupArchives(self, urls:list) -> Dict[str, Future]:
+        """
+        Returns:
+            Future of the ArchivedUrl per given url. The lookups are requested right away in batches
+        """
+        futures = {url: self.lookupArchive(url) for url in urls}
+        self.flushArchiveLookups()
+        return futures
+
+    def flushArchiveLookups(self):
+        """
+        schedule the batched request of the pending Wayback lookups
+        """
+        with self._lock:
+            batch, self._archiveBatch = self._archiveBatch, {}
+            timer, self._archiveTimer = self._archiveTimer, None
+            if batch:
+                self._pending.setdefault(self.getHost(self.archiveApiUrl), deque()).append((Future(), self._lookupArchives, (batch,)))
+        if timer is not None:
+            timer.cancel()
+        if batch:
+            self._schedule()
+
+    def _lookupArchives(self, batch:Dict[str, Future], session:requests.Session=None):
+        futures = {url: future for url, future in batch.items() if future.set_running_or_notify_cancel()}
+        try:
+            archivedUrls = ArchivedUrl.lookupAll(list(futures.keys()), session=session, apiUrl=self.archiveApiUrl)
+        except BaseException as e:
+            for future in futures.values():
+                future.set_exception(e)
+            raise
+        for url, future in futures.items():
+            archivedUrl = archivedUrls[url]
+            # failed lookups are not cached
+            if self.cache is not None and "archived_snapshots" in archivedUrl.availabilityResponse:
+                self.cache.putArchive(url, archivedUrl.getArchiveUrl() if archivedUrl.isArchived() else None)
+            future.set_result(archivedUrl)
+
+    def checkAll(self, urls:dict) -> Tuple[Dict[str, UrlCheck], Dict[str, 'ArchivedUrl']]:
+        """
+        check the given urls concurrently and look up the unavailable urls in the Wayback Machine
+
+        Args:
+            urls: urls to check and the expected texts of each url
+
+        Returns:
+            UrlCheck per url, ArchivedUrl per unavailable url
+        """
+        checks = [self.check(url, mustContains) for url, mustContains in urls.items()]
+        urlChecks = {}
+        for future in as_completed(checks):
+            urlCheck = future.result()
+            urlChecks[urlCheck.url] = urlCheck
+        unavailableUrls = [url for url, urlCheck in urlChecks.items() if not urlCheck.isAvailable]
+        archiveLookups = self.lookupArchives(unavailableUrls)
+        archivedUrls = {url: future.result() for url, future in archiveLookups.items()}
+        return urlChecks, archivedUrls
+
+
 class HomepageValidator(Validator):
     """
     validates the homepage url
@@ -135,25 +750,93 @@ class HomepageValidator(Validator):
         return cls.validateRecordBased(tableEditing)
 
     @classmethod
-    def validateRecord(cls, entityName:str, entityType:str, entityRecord:dict) -> (bool, list):
+    def validateRecords(cls, tableEditing:TableEditing):
+        """
+        validates the homepages of the given tableEditing.
+        Each distinct homepage is checked once and all checks run concurrently in the pool of the UrlChecker.
+        The Wayback lookups of the unavailable homepages are batched.
+        The records of a homepage are yielded as soon as its check (and Wayback lookup) is finished
+        """
+        urls = {}
+        recordsByUrl = {}
+        for entityType, lod in tableEditing.lods.items():
+            for record in lod:
+                homepage = record.get("homepage", None)
+                if isinstance(homepage, str):
+                    mustContains = urls.setdefault(homepage, set())
+                    mustContain = cls.getMustContain(entityType, record)
+                    if isinstance(mustContain, str):
+                        mustContains.add(mustContain)
+                    recordsByUrl.setdefault(homepage, []).append((entityType, record))
+                elif homepage is not None:
+                    recordResult = cls.getRecordResult(entityType, record)
+                    if recordResult is not None:
+                        yield entityType, record.get("pageTitle"), recordResult
+        urlChecker = UrlChecker.getInstance()
+        checks = {urlChecker.check(url, mustContains): url for url, mustContains in urls.items()}
+        archiveLookups = {}
+        urlChecks = {}
+        pending = set(checks.keys())
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                archivedUrls = None
+                if future in checks:
+                    urlCheck = future.result()
+                    url = checks[future]
+                    urlChecks[url] = urlCheck
+                    if not urlCheck.isAvailable:
+                        lookup = urlChecker.lookupArchive(url)
+                        archiveLookups[lookup] = url
+                        pending.add(lookup)
+                        continue
+                else:
+                    url = archiveLookups[future]
+                    archivedUrls = {url: future.result()}
+                def validateRecord(entityName:str, entityType:str, entityRecord:dict):
+                    return cls.validateRecord(entityName, entityType, entityRecord, urlChecks=urlChecks, archivedUrls=archivedUrls)
+                for entityType, record in recordsByUrl[url]:
+                    recordResult = cls.getRecordResult(entityType, record, validateRecord=validateRecord)
+                    if recordResult is not None:
+                        yield entityType, record.get("pageTitle"), recordResult
+            if archiveLookups and not any(future in checks for future in pending):
+                # all urls are checked, the remaining Wayback lookups need not wait for further lookups of this run
+                urlChecker.flushArchiveLookups()
+
+    @classmethod
+    def getValidatedFields(cls, entityType:str) -> list:
+        return ["homepage", "eventInSeries", "acronym"]
+
+    @staticmethod
+    def getMustContain(entityType:str, entityRecord:dict) -> str:
+        """
+        Returns the text the homepage of the given entity is expected to contain
+        """
         if entityType == OREvent.templateName:
-            mustContain = entityRecord.get("eventInSeries", None)
+            return entityRecord.get("eventInSeries", None)
         elif entityType == OREventSeries.templateName:
-            mustContain = entityRecord.get("acronym", None)
-        else:
-            mustContain = None
+            return entityRecord.get("acronym", None)
+        return None
+
+    @classmethod
+    def validateRecord(cls, entityName:str, entityType:str, entityRecord:dict, urlChecks:dict=None, archivedUrls:dict=None) -> (bool, list):
+        mustContain = cls.getMustContain(entityType, entityRecord)
         homepage = entityRecord.get("homepage", None)
         if homepage is not None:
-            isValid, errMsgs = cls.validateUrl(url=homepage, checkAvailability=True, mustContain=mustContain)
+            urlCheck = urlChecks.get(homepage) if urlChecks else None
+            archivedUrl = archivedUrls.get(homepage) if archivedUrls else None
+            isValid, errMsgs = cls.validateUrl(url=homepage, checkAvailability=True, mustContain=mustContain, urlCheck=urlCheck, archivedUrl=archivedUrl)
             return isValid, errMsgs
         return None, None
 
     @classmethod
-    def validateUrl(cls, url:str, checkAvailability:bool=False, mustContain:str=None) -> (bool, list):
+    def validateUrl(cls, url:str, checkAvailability:bool=False, mustContain:str=None, urlCheck:UrlCheck=None, archivedUrl:'ArchivedUrl'=None) -> (bool, list):
         """
         validates the availability of the given url
         Args:
             url: url to be validated
+            urlCheck: result of an already performed request of the url
+            archivedUrl: result of an already performed Wayback lookup of the url
 
         Returns:
             (isAvailable, errMsg)
@@ -165,18 +848,16 @@ class HomepageValidator(Validator):
         isAvailable = True
         contains = True
         if checkAvailability:
-            try:
-                resp = requests.get(url, allow_redirects=True, timeout=cls.TIMEOUT)
-                isAvailable = resp.status_code == 200
-            except Exception as e:
-                isAvailable = False
+            if urlCheck is None:
+                urlCheck = UrlCheck.fetch(url, timeout=cls.TIMEOUT, mustContains=[mustContain] if isinstance(mustContain, str) else None)
+            isAvailable = urlCheck.isAvailable
             if isAvailable:
                 if mustContain is not None:
-                    contains = mustContain in resp.text
+                    contains = urlCheck.containsText(mustContain)
                     if not contains:
                         errMsg.append("Expected content not found")
             else:
-                archivUrl = ArchivedUrl(url)
+                archivUrl = archivedUrl if archivedUrl is not None else ArchivedUrl(url)
                 msg = "Site not available"
                 if archivUrl.isArchived():
                     msg += f" {Link(url=archivUrl.getArchiveUrl(), title='(but archived)')}"
@@ -207,6 +888,10 @@ class OrdinalValidator(Validator):
     def validate(cls, tableEditing:TableEditing) -> dict:
         return cls.validateRecordBased(tableEditing)
 
+    @classmethod
+    def getValidatedFields(cls, entityType:str) -> list:
+        return ["ordinal"]
+
     @classmethod
     def validateRecord(cls, entityName:str, entityType:str, entityRecord:dict) -> (bool, list):
         if entityType != OREvent.templateName:
@@ -243,15 +928,128 @@ class OrdinalValidator(Validator):
             return False
 
 
+class RuleValidator(Validator):
+    """
+    validates the records with the column rules of the RuleEngine (ordinal, dates and year) in one pass over each table
+    """
+    ENGINE = RuleEngine.getDefault()
+
+    @classmethod
+    def validate(cls, tableEditing:TableEditing) -> dict:
+        return cls.validateRecordBased(tableEditing)
+
+    @classmethod
+    def getValidatedFields(cls, entityType:str) -> list:
+        return cls.ENGINE.getColumns(entityType)
+
+    @classmethod
+    def getVersion(cls) -> str:
+        return f"{super().getVersion()}:{cls.ENGINE.getVersion()}"
+
+    @classmethod
+    def validateRecords(cls, tableEditing:TableEditing):
+        """
+        Returns:
+            generator of (entity type, entity name, {"result", "errors"})
+        """
+        counts = {"valid": 0, "invalid": 0}
+        try:
+            for entityType, entityName, recordResult in cls.ENGINE.validateRecords(tableEditing.lods):
+                counts["valid" if recordResult["result"] else "invalid"] += 1
+                yield entityType, entityName, recordResult
+        finally:
+            for result, count in counts.items():
+                if count:
+                    VALIDATED_RECORDS.inc(count, validator=cls.__name__, result=result)
+
+
+class StrictRuleValidator(RuleValidator):
+    """
+    RuleValidator that also requires the acronym and the year and checks that the acronym of an event ends with its year
+    """
+    ENGINE = RuleEngine.getDefault(strict=True)
+
+
+class DuplicateEventValidator(Validator):
+    """
+    flags events of the table that have the same normalized acronym or the same series and year as an existing event
+    of the wiki or as another event of the table. The events of the wiki are looked up in the EventIndex of the wiki
+    """
+    IS_CACHEABLE = False
+    WIKI_ID = None
+
+    @classmethod
+    def forWiki(cls, wikiId:str) -> type:
+        """
+        Returns DuplicateEventValidator looking up the existing events in the given wiki
+        """
+        return type(cls.__name__, (cls,), {"WIKI_ID": wikiId})
+
+    @classmethod
+    def validate(cls, tableEditing:TableEditing) -> dict:
+        return cls.validateRecordBased(tableEditing)
+
+    @classmethod
+    def getValidatedFields(cls, entityType:str) -> list:
+        return ["pageTitle", "acronym", "inEventSeries", "year"]
+
+    @classmethod
+    def getEventIndex(cls) -> EventIndex:
+        if cls.WIKI_ID is None:
+            raise ValueError("The DuplicateEventValidator needs the wiki to look up the existing events (see forWiki)")
+        eventIndex = EventIndex.getInstance(cls.WIKI_ID)
+        eventIndex.refresh()
+        return eventIndex
+
+    @classmethod
+    def validateRecords(cls, tableEditing:TableEditing):
+        """
+        Returns:
+            generator of (entity type, entity name, {"result", "errors"})
+        """
+        lod = tableEditing.lods.get(OREvent.templateName)
+        if not lod:
+            return
+        duplicates = cls.getEventIndex().findDuplicates(lod)
+        for i, record in enumerate(lod):
+            pageTitles = duplicates[i]
+            errMsgs = [f"Possible duplicate of {', '.join(pageTitles)}"] if pageTitles else []
+            VALIDATED_RECORDS.inc(validator=cls.__name__, result="invalid" if pageTitles else "valid")
+            yield OREvent.templateName, record.get("pageTitle"), {"result": not pageTitles, "errors": errMsgs}
+
+
 class ArchivedUrl:
     """
     Wrapper to access the Internet Archive availability api
     """
     TIMEOUT = 2
+    API_URL = "https://archive.org/wayback/available"
+    BATCH_SIZE = 50
+
+    def __init__(self, url:str, availabilityResponse:dict=None, session:requests.Session=None):
+        """
 
-    def __init__(self, url:str):
+        Args:
+            url: url to look up
+            availabilityResponse: response of the availability api. If None the api is requested
+            session: session used to request the availability api
+        """
         self.url=url
-        self.availabilityResponse = self.getAvailabilityResponse(self.url)
+        if availabilityResponse is None:
+            availabilityResponse = self.getAvailabilityResponse(self.url, session=session)
+        self.availabilityResponse = availabilityResponse
+
+    @classmethod
+    def fromArchiveUrl(cls, url:str, archiveUrl:str=None) -> 'ArchivedUrl':
+        """
+        Returns ArchivedUrl with the given closest snapshot without requesting the availability api
+
+        Args:
+            url: looked up url
+            archiveUrl: url of the closest snapshot. None if the url is not archived
+        """
+        snapshots = {"closest": {"available": True, "url": archiveUrl}} if archiveUrl else {}
+        return cls(url, availabilityResponse={"archived_snapshots": snapshots})
 
     def isArchived(self) -> bool:
         """
@@ -276,20 +1074,73 @@ class ArchivedUrl:
                 return archiveUrl
 
     @classmethod
-    def getAvailabilityResponse(cls, url):
+    def getAvailabilityResponse(cls, url, session:requests.Session=None, apiUrl:str=None):
         """
         Checks whether the given url is archived or not
         see https://archive.org/help/wayback_api.php
         Args:
             url: url to be checked
+            session: session used for the request
+            apiUrl: url of the availability api. Defaults to API_URL
 
         Returns:
 
         """
+        if session is None:
+            session = requests
         try:
-            archiveUrl = f"https://archive.org/wayback/available?url={url}"
-            resp = requests.get(archiveUrl, timeout=cls.TIMEOUT)
+            resp = session.get(apiUrl if apiUrl else cls.API_URL, params={"url": url}, timeout=cls.TIMEOUT)
             res = resp.json()
             return res
         except Exception as e:
             return {}
+
+    @classmethod
+    def getAvailabilityResponses(cls, urls:list, session:requests.Session=None, apiUrl:str=None) -> Dict[str, dict]:
+        """
+        Looks up the given urls with batched POST requests of BATCH_SIZE urls each.
+        Urls that are missing in the answer of a batch (e.g. because the batch request failed) are looked up
+        one by one with GET requests
+
+        Args:
+            urls: urls to be checked
+            session: session used for the requests
+            apiUrl: url of the availability api. Defaults to API_URL
+
+        Returns:
+            availability response per url
+        """
+        if session is None:
+            session = requests
+        responses = {}
+        for i in range(0, len(urls), cls.BATCH_SIZE):
+            batch = urls[i:i + cls.BATCH_SIZE]
+            try:
+                resp = session.post(apiUrl if apiUrl else cls.API_URL, data={"url": batch}, timeout=cls.TIMEOUT * 2)
+                results = resp.json().get("results", [])
+            except Exception as e:
+                results = []
+            isOrdered = len(results) == len(batch)
+            for j, result in enumerate(results):
+                if not isinstance(result, dict) or "archived_snapshots" not in result:
+                    continue
+                url = result.get("url")
+                if url not in batch:
+                    # the api may answer with a normalized url
+                    if not isOrdered:
+                        continue
+                    url = batch[j]
+                responses[url] = result
+        for url in urls:
+            if url not in responses:
+                responses[url] = cls.getAvailabilityResponse(url, session=session, apiUrl=apiUrl)
+        return responses
+
+    @classmethod
+    def lookupAll(cls, urls:list, session:requests.Session=None, apiUrl:str=None) -> Dict[str, 'ArchivedUrl']:
+        """
+        Returns:
+            ArchivedUrl per given url looked up with batched requests (see getAvailabilityResponses)
+        """
+        responses = cls.getAvailabilityResponses(urls, session=session, apiUrl=apiUrl)
+        return {url: cls(url, availabilityResponse=response) for url, response in responses.items()}
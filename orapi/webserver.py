@@ -1,29 +1,38 @@
 import datetime
+import json
 import os
+import re
 import sys
 from enum import Enum, auto
 from io import BytesIO
 from os import path
-from time import sleep
 
 from fb4.app import AppWrap
 from fb4.sse_bp import SSE_BluePrint, DictStreamResult, DictStreamFileResult
 from fb4.widgets import DropZoneField, ButtonField, Menu, MenuItem, LodTable, Link
 from flask_wtf import FlaskForm
 from markupsafe import Markup
-from spreadsheet.spreadsheet import SpreadSheetType, ExcelDocument, OdsDocument
+from spreadsheet.spreadsheet import SpreadSheetType, ExcelDocument, OdsDocument, SpreadSheet
 from werkzeug.exceptions import Unauthorized
-from wikibot3rd.wikiclient import WikiClient
 from wtforms import SelectField, SubmitField, BooleanField, StringField
 from wtforms.widgets import Select as Select
 
 import orapi
+from orapi.admissionControl import AdmissionControl, AdmissionSlot
+from orapi.dataTable import DataTableQuery
+from orapi.documentCache import DocumentCache
 from orapi.locationService import LocationServiceBlueprint
+from orapi.metrics import REGISTRY
 from orapi.orapiservice import OrApi, WikiTableEditing, OrApiService
-from flask import request, send_file, render_template, flash, jsonify, url_for
+from orapi.preforkServer import PreforkServer
+from orapi.progressStream import ProgressStream
+from orapi.requestProfile import RequestProfile, activated, measure
+from flask import request, send_file, render_template, flash, jsonify, url_for, Response, abort, g
 import socket
 from orapi.utils import WikiUserInfo
-from orapi.validationService import ValidationBlueprint
+from orapi.urlCheckCache import UrlCheckCache
+from orapi.validationCache import ValidationCache
+from orapi.validationService import ValidationBlueprint, ValidatorRegistry, UrlChecker, DuplicateEventValidator, StrictRuleValidator
 
 
 class ResponseType(Enum):
@@ -35,6 +44,7 @@ class ResponseType(Enum):
     EXCEL=SpreadSheetType.EXCEL
     ODS=SpreadSheetType.ODS
     JSON=auto()
+    NDJSON=auto()
     HTML=auto()
 
 
@@ -71,11 +81,28 @@ class WebServer(AppWrap):
         def home():
             return self.home()
 
+        @self.app.route('/metrics')
+        def metrics():
+            return self.metrics()
+
+        @self.app.route('/profile/<profileId>')
+        def getProfileDump(profileId:str):
+            return self.getProfileDump(profileId)
+
+        @self.app.route('/ready')
+        def ready():
+            return self.ready()
+
         @self.app.route('/api/series/<series>', methods=['GET','POST'])
         @self.csrf.exempt
         def getSeries(series: str):
             return self.getSeries(series)
 
+        @self.app.route('/api/series/<series>/table/<tableName>', methods=['GET'])
+        @self.csrf.exempt
+        def getSeriesTableData(series:str, tableName:str):
+            return self.getSeriesTableData(series, tableName)
+
         @self.app.route('/api/upload/series', methods=['GET','POST'])
         @self.csrf.exempt
         def updateSeries():
@@ -91,6 +118,29 @@ class WebServer(AppWrap):
         def publishSeries(series:str):
             return self.publishSeries(series)
 
+        @self.app.after_request
+        def disableSseBuffering(response):
+            # ensure that proxies and the browser forward the progress messages directly
+            if response.mimetype == "text/event-stream":
+                response.headers["Cache-Control"] = "no-cache"
+                response.headers["X-Accel-Buffering"] = "no"
+            return response
+
+        @self.app.after_request
+        def holdAdmissionSlots(response):
+            # streamed responses are still generated after the request ends
+            for slot in g.get("admissionSlots", []):
+                if not slot.isHandedOver:
+                    slot.isHandedOver = True
+                    response.call_on_close(slot.release)
+            return response
+
+        @self.app.teardown_request
+        def releaseAdmissionSlots(exception=None):
+            for slot in g.get("admissionSlots", []):
+                if not slot.isHandedOver:
+                    slot.release()
+
         @self.app.before_first_request
         def before_first_request():
             def basedUrl(url:str) ->str:
@@ -108,26 +158,89 @@ class WebServer(AppWrap):
             enhancerUrls = {
                 "locationEnhancer": basedUrl(url_for("location.enhanceLocations"))
             }
-            self.orapiService.enhancerURLs = enhancerUrls
+            self.orapiService.addEnhancerURLs(enhancerUrls)
 
-    def init(self,orapiService:OrApiService, baseUrl:str=None, fileStoragePath:str=None):
+    def init(self,orapiService:OrApiService, baseUrl:str=None, fileStoragePath:str=None, admissionControl:AdmissionControl=None, validationServiceUrls:dict=None, strictRules:bool=False, allowCProfile:bool=False):
         """
         Args:
             orApi(OrApi): api service to handle the requested actions
             baseUrl(str): base url of the server
             fileStoragePath(str): location to store the uploaded files
+            admissionControl(AdmissionControl): concurrency limits of the expensive endpoints. If None the default limits are used
+            validationServiceUrls(dict): urls of remote validation services by validator name used instead of the in-process validators
+            strictRules(bool): If True uploads are validated with the strict rules that also require the acronym and the year and check that the acronym of an event ends with its year
+            allowCProfile(bool): If True requests with profile=cprofile store a cProfile dump that can be downloaded from /profile/<id>
         """
         self.orapiService = orapiService
+        self.validationServiceUrls = validationServiceUrls
+        self.strictRules = strictRules
+        self.allowCProfile = allowCProfile
+        self.admissionControl = admissionControl if admissionControl is not None else AdmissionControl()
         self.baseUrl = baseUrl
         if fileStoragePath is None:
             fileStoragePath = os.path.join("/tmp", "orapi")
         self.fileStoragePath = os.path.abspath(fileStoragePath)
         if not os.path.exists(self.fileStoragePath):
             os.makedirs(self.fileStoragePath)
+        self.documentCache = DocumentCache(os.path.join(self.fileStoragePath, "documents"))
+        UrlChecker.getInstance().cache = UrlCheckCache(os.path.join(self.fileStoragePath, "urlChecks.db"))
+        self.validationCache = ValidationCache(os.path.join(self.fileStoragePath, "validationResults.db"))
 
     def home(self):
         return self.renderTemplate('home.html')
 
+    def metrics(self):
+        """
+        Returns the metrics of this process in the prometheus text format
+        """
+        return Response(REGISTRY.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+    def ready(self):
+        """
+        Returns the readiness of the server. 503 while the location data is loaded in the background.
+        A failed warm-up is started again once its retry backoff elapsed
+        """
+        locationService = self.locationService.locationService
+        if locationService.getStatus() == "failed":
+            locationService.startWarmUp()
+        status = {"locations": locationService.getStatus()}
+        response = jsonify({"ready": locationService.isReady, "components": status})
+        if not locationService.isReady:
+            response.status_code = 503
+            response.headers["Retry-After"] = str(locationService.RETRY_AFTER)
+        return response
+
+    def admit(self, endpoint:str, wikiId:str) -> AdmissionSlot:
+        """
+        Acquires an admission slot for the current request. The slot is released at the end of the response unless
+        it is handed over to a generator with AdmissionSlot.guard
+
+        Args:
+            endpoint: name of the expensive endpoint
+            wikiId: id of the wiki the request works on
+
+        Returns:
+            AdmissionSlot or None if the endpoint is not bounded
+
+        Raises:
+            ServiceUnavailable: 503 with Retry-After if the request is rejected
+        """
+        slot = self.admissionControl.acquire(endpoint, wikiId)
+        if slot is not None:
+            if "admissionSlots" not in g:
+                g.admissionSlots = []
+            g.admissionSlots.append(slot)
+        return slot
+
+    @staticmethod
+    def holdSlot(slot:AdmissionSlot, generator):
+        """
+        Returns the given generator which holds the given slot until it is finished
+        """
+        if slot is None:
+            return generator
+        return slot.guard(generator)
+
     def getSeries(self, series:str=""):
         """
         Return the series and its events as OpenDocument Spreadsheet
@@ -163,30 +276,104 @@ class WebServer(AppWrap):
         if sourceWiki is None:
             sourceWiki = self.orapiService.wikiIds[0]
         orapi = self.orapiService.getOrApi(sourceWiki)
-        tableEditing=orapi.getSeriesTableEditing(series, enhancers=enhancers)
+        profile = RequestProfile.fromRequest(request, dumpDir=self.getProfileDir(), allowCProfile=self.allowCProfile)
+        with activated(profile):
+            tableEditing=orapi.getSeriesTableEditing(series, enhancers=enhancers)
+        if responseFormat is ResponseType.JSON:
+            with activated(profile):
+                version, lastModified = orapi.getSeriesVersion(tableEditing, enhancers)
+            if self.isNotModified(version, lastModified):
+                return self.notModified(version, lastModified)
+        # only enhancing and rendering the series needs an admission slot
+        slot = self.admit("series", sourceWiki)
         if responseFormat is ResponseType.JSON:
-            tableEditing.enhance()
-            return jsonify(tableEditing.lods)
+            with activated(profile):
+                orapi.enhance(tableEditing)
+                with measure("render", "json"):
+                    response = jsonify(tableEditing.lods)
+            response.set_etag(version)
+            response.last_modified = lastModified
+            return self.addProfileHeaders(response, profile)
+        elif responseFormat is ResponseType.NDJSON:
+            def ndjsonGenerator():
+                with activated(profile):
+                    for entityType, record, error in orapi.getSeriesRecordGenerator(tableEditing):
+                        line = {"entityType": entityType, "record": record}
+                        if error:
+                            line["error"] = error
+                        yield json.dumps(line, default=str) + "\n"
+                if profile is not None:
+                    profile.dumpCProfile()
+                    yield json.dumps({"profile": profile.toDict()}) + "\n"
+            return Response(ndjsonGenerator(), mimetype="application/x-ndjson")
         elif request.method =="GET" and isinstance(responseFormat.value, Enum) and responseFormat.value in SpreadSheetType:
-            tableEditing.enhance()
-            doc = tableEditing.toSpreadSheet(responseFormat.value, name=series)
-            buffer=doc.toBytesIO()
-            return send_file(buffer, attachment_filename=doc.filename, as_attachment=True, mimetype=doc.MIME_TYPE)
+            with activated(profile):
+                orapi.enhance(tableEditing)
+            return self.addProfileHeaders(self.sendDocument(tableEditing.lods, responseFormat.value, name=series), profile)
 
+        dataUrls = self.getSeriesTableDataUrls(series, sourceWiki, enhancers)
         def generator():
             yield from orapi.getSeriesTableEnhanceGenerator(tableEditing)
-            seriesTable, eventsTable = orapi.getHtmlTables(tableEditing)
+            self.orapiService.enhancedSeries.put((sourceWiki, series, tuple(enhancers)), tableEditing.lods)
+            with measure("render", "htmlTables"):
+                seriesTable, eventsTable = orapi.getHtmlTables(tableEditing, dataUrls=dataUrls)
             if isinstance(responseFormat.value, Enum) and responseFormat.value in SpreadSheetType:
-                doc = tableEditing.toSpreadSheet(responseFormat.value, name=series)
-                buffer = doc.toBytesIO()
+                with measure("render", "document"):
+                    buffer = self.documentCache.toBytesIO(tableEditing.lods, responseFormat.value, name=series)
                 yield DictStreamFileResult(result=str(seriesTable) + str(eventsTable), file=buffer)
             else:
                 yield DictStreamResult(str(seriesTable) + str(eventsTable))
-        downloadProgress = self.sseBluePrint.streamDictGenerator(generator=generator())
+        downloadProgress = self.streamProgress(generator=self.holdSlot(slot, generator()), profile=profile)
         return self.renderTemplate('seriesAndEvents.html',
                                downloadForm=downloadForm,
                                progress=downloadProgress)
 
+    def getSeriesTableData(self, series:str, tableName:str):
+        """
+        DataTables server-side data source for the tables of an enhanced series.
+        The enhanced series is taken from the cache and only enhanced again if it is not cached.
+        Enhancing the series needs an admission slot of the series endpoint.
+
+        Args:
+            series(str): name of the series
+            tableName(str): name of the requested table e.g. Event or Event series
+
+        Returns:
+            json DataTables server-side response
+        """
+        sourceWiki = request.values.get('source', None)
+        if sourceWiki not in self.orapiService.wikiIds:
+            sourceWiki = self.orapiService.wikiIds[0]
+        orapi = self.orapiService.getOrApi(sourceWiki)
+        # only known enhancers so that arbitrary enhancer names can not fill the cache
+        enhancers = tuple(dict.fromkeys(enhancer for enhancer in request.values.getlist('enhancer') if enhancer in orapi.optionalEnhancers))
+        def loadEnhancedSeries() -> dict:
+            # only enhancing the series is expensive, pages of a cached series are served without a slot
+            self.admit("series", sourceWiki)
+            tableEditing = orapi.getSeriesTableEditing(series, enhancers=list(enhancers))
+            orapi.enhance(tableEditing)
+            return tableEditing.lods
+        lods = self.orapiService.enhancedSeries.getOrLoad((sourceWiki, series, enhancers), loadEnhancedSeries)
+        query = DataTableQuery.fromRequestArgs(request.values)
+        return jsonify(orapi.getTableData(lods, tableName, query))
+
+    def getSeriesTableDataUrls(self, series:str, sourceWiki:str, enhancers:list=None) -> dict:
+        """
+        Returns the urls of the server-side data sources for the tables of the given series
+        Args:
+            series: name of the series
+            sourceWiki: id of the wiki the series is taken from
+            enhancers: names of the applied optional enhancers
+
+        Returns:
+            dict of table name and data url
+        """
+        dataUrls = {}
+        for tableName in [OrApi.SERIES_TEMPLATE_NAME, OrApi.EVENT_TEMPLATE_NAME]:
+            url = url_for("getSeriesTableData", series=series, tableName=tableName, source=sourceWiki, enhancer=enhancers if enhancers else [])
+            dataUrls[tableName] = self.basedUrl(url)
+        return dataUrls
+
     def updateSeries(self):
         """
         Updates the series
@@ -202,20 +389,35 @@ class WebServer(AppWrap):
             orapi = self.orapiService.getOrApi(targetWiki, targetWikiId=targetWiki)
             publisher = WikiUserInfo.fromWiki(orapi.wikiUrl, request.headers)
             if len(request.files) == 1:  #ToDo Extend for multiple file upload
+                slot = self.admit("upload", targetWiki)
                 file = list(request.files.values())[0]
                 if not uploadForm.isDryRun:
                     filename = self.getFileName(file.filename, publisher.name)
                     filePath = os.path.join(self.fileStoragePath, filename)
                     file.save(filePath)
-                tableEditing=orapi.getTableEditingFromSpreadsheet(file, publisher)
+                    file.stream.seek(0)
+                # SpreadSheet.load only accepts named buffers
+                document = BytesIO(file.read())
+                document.name = file.filename
+                tableEditing=orapi.getTableEditingFromSpreadsheet(document, publisher)
                 try:
-                    validationServices = self.getValidationServices()
-                    def generator(tableEditing:WikiTableEditing, headers, validate:bool=False):
+                    validationServices = self.getValidationServices(wikiId=targetWiki)
+                    def generator(tableEditing:WikiTableEditing, headers, validate:bool=False, failFast:bool=False):
                         if validate:
-                            # validate
-                            sleep(0.05) #
-                            yield "Starting validation..."
-                            isValid, validationResult = orapi.validate(tableEditing, validationServices)
+                            # validate and show the result of each record as soon as it is available
+                            yield "Starting validation...<br>"
+                            isValid = True
+                            validationResult = {}
+                            validationGenerator = orapi.validateGenerator(tableEditing, validationServices)
+                            for entityType, entityName, validationService, evr in validationGenerator:
+                                validationResult.setdefault(entityType, {}).setdefault(entityName, {})[validationService] = evr
+                                yield self.getValidationMessage(entityName, validationService, evr)
+                                if not evr.get("result", False):
+                                    isValid = False
+                                    if failFast:
+                                        validationGenerator.close()
+                                        yield "Stopped validation at the first invalid record<br>"
+                                        break
                             if not isValid:
                                 validationTables = orapi.getValidationTable(validationResult)
                                 yield "<br>Input invalid → see tables below"
@@ -232,7 +434,7 @@ class WebServer(AppWrap):
                         yield from updateGenerator
                         seriesTable, eventsTable = orapi.getHtmlTables(tableEditing)
                         yield DictStreamResult(str(seriesTable) + str(eventsTable))
-                    uploadProgress=self.sseBluePrint.streamDictGenerator(generator(tableEditing, request.headers, validate=uploadForm.validate.data))
+                    uploadProgress=self.streamProgress(self.holdSlot(slot, generator(tableEditing, request.headers, validate=uploadForm.validate.data, failFast=uploadForm.failFast.data)))
                 except Unauthorized as e:
                     flash(e.description, category="error")
                 except Exception as e:
@@ -245,6 +447,30 @@ class WebServer(AppWrap):
                                uploadForm=uploadForm,
                                progress=uploadProgress)
 
+    def streamProgress(self, generator, profile:RequestProfile=None) -> ProgressStream:
+        """
+        Streams the progress messages of the given generator to the client over SSE
+        Args:
+            generator: generator yielding progress messages and optionally a final DictStreamResult
+            profile: If given the timing breakdown of the generator is attached to the final message
+
+        Returns:
+            ProgressStream
+        """
+        progressStream = ProgressStream(generator, sseBlueprint=self.sseBluePrint, profile=profile)
+        progressStream.startSseChannel()
+        return progressStream
+
+    @staticmethod
+    def getValidationMessage(entityName:str, validationService:str, validationResult:dict) -> str:
+        """
+        Returns the progress message of the given validation result of a record
+        """
+        if validationResult.get("result", False):
+            return f"{entityName} ({validationService}) ✅<br>"
+        errors = validationResult.get("errors") or []
+        return f"{entityName} ({validationService}) ❌ {', '.join(str(error) for error in errors)}<br>"
+
     def getFileName(self, filename:str, uploader:str):
         """
         Generates a unique filename based on the given input
@@ -261,22 +487,25 @@ class WebServer(AppWrap):
         res = f"{date.isoformat()}_{uploader}_{filename}"
         return res
 
-    def getValidationServices(self):
+    def getValidationServices(self, wikiId:str=None) -> ValidatorRegistry:
         """
 
+        Args:
+            wikiId: id of the wiki the validated records are uploaded to. If given the records are checked for duplicates of the events of the wiki
+
         Returns:
-            dict of validation services and their names
+            ValidatorRegistry with the in-process validators overridden by the configured remote validation services.
+            The validation results of the records are cached so that re-uploads only validate changed records
         """
-        def hostWorkaround(url):
-            if self.port == 80:
-                baseUrl = f"http://{self.host}"
-            else:
-                baseUrl = f"http://{self.host}:{self.port}"
-            return f"{baseUrl}/{url}"
-        validationServices = {
-            "homepage": hostWorkaround(url_for('validation.validateHomepage')),
-            "ordinal": hostWorkaround(url_for('validation.validateOrdinalFormat')),
-        }
+        validationServices = ValidatorRegistry.getDefault()
+        validationServices.cache = self.validationCache
+        if self.strictRules:
+            validationServices.register("rules", StrictRuleValidator)
+        if wikiId is not None:
+            validationServices.register("duplicates", DuplicateEventValidator.forWiki(wikiId))
+        if self.validationServiceUrls:
+            for name, url in self.validationServiceUrls.items():
+                validationServices.register(name, url)
         return validationServices
 
     def getListOfDblpSeries(self):
@@ -314,8 +543,9 @@ class WebServer(AppWrap):
             if not publisher:
                 flash("You must define a page editor to publish a series", category="warning")
             else:
+                slot = self.admit("publish", targetWikiId)
                 publishGenerator = orapi.publishSeries(seriesAcronym=series, publisher=publisher)
-                publishProgress = self.sseBluePrint.streamDictGenerator(generator=publishGenerator)
+                publishProgress = self.streamProgress(generator=self.holdSlot(slot, publishGenerator))
                 return self.renderTemplate('publishedPages.html',
                                        series=series,
                                        publishForm=form,
@@ -335,14 +565,18 @@ class WebServer(AppWrap):
             flash("You must define a page editor")
         else:
             flash("Please ensure that the page editor is correct", category="info")
+        # the preview only enhances the series of the source wiki
+        slot = self.admit("series", sourceWikiId)
         tableEditing = orapi.getSeriesTableEditing(series)
         if targetWikiId is not None and targetWikiId in [k for (k,v) in form.targetWikiId.choices]:
             form.targetWikiId.data=targetWikiId
+        dataUrls = self.getSeriesTableDataUrls(series, sourceWikiId)
         def generator():
             yield from orapi.getSeriesTableEnhanceGenerator(tableEditing)
-            seriesTable, eventsTable = orapi.getHtmlTables(tableEditing)
+            self.orapiService.enhancedSeries.put((sourceWikiId, series, ()), tableEditing.lods)
+            seriesTable, eventsTable = orapi.getHtmlTables(tableEditing, dataUrls=dataUrls)
             yield DictStreamResult(str(seriesTable) + str(eventsTable))
-        sourceSeriesOverviewProgress = self.sseBluePrint.streamDictGenerator(generator=generator())
+        sourceSeriesOverviewProgress = self.streamProgress(generator=self.holdSlot(slot, generator()))
         form.pageEditor.data=publisher.name
         return self.renderTemplate('publishedPages.html',
                                series=series,
@@ -358,8 +592,7 @@ class WebServer(AppWrap):
         Returns:
 
         """
-        wikiUser = WikiClient.ofWikiId(wikiId).wikiUser
-        return wikiUser.url + wikiUser.scriptPath
+        return self.orapiService.getOrApi(wikiId).wikiUrl
 
     def isAuthorized(self, wikiId:str, wikiUserInfo:WikiUserInfo=None):
         """
@@ -377,6 +610,97 @@ class WebServer(AppWrap):
         else:
             return True
 
+    @staticmethod
+    def isNotModified(etag:str, lastModified:datetime.datetime=None) -> bool:
+        """
+        Checks the conditional headers of the request against the given version of the requested resource
+        If-None-Match takes precedence over If-Modified-Since
+
+        Args:
+            etag: current entity tag of the resource
+            lastModified: time of the last modification of the resource
+
+        Returns:
+            True if the client has the current version of the resource
+        """
+        if request.if_none_match:
+            return request.if_none_match.contains(etag)
+        if lastModified is not None and request.if_modified_since is not None:
+            return lastModified.replace(microsecond=0) <= request.if_modified_since
+        return False
+
+    @staticmethod
+    def notModified(etag:str, lastModified:datetime.datetime=None) -> Response:
+        """
+        Returns:
+            304 response for the given version of the resource
+        """
+        response = Response(status=304)
+        response.set_etag(etag)
+        if lastModified is not None:
+            response.last_modified = lastModified
+        return response
+
+    def getProfileDir(self) -> str:
+        """
+        Returns the directory the cProfile dumps of profiled requests are stored in
+        """
+        return os.path.join(self.fileStoragePath, "profiles")
+
+    def addProfileHeaders(self, response:Response, profile:RequestProfile) -> Response:
+        """
+        adds the timing breakdown of the given profile as Server-Timing header to the response
+
+        Args:
+            response: response of the profiled request
+            profile: profile of the request. If None the response is not changed
+        """
+        if profile is None:
+            return response
+        response.headers["Server-Timing"] = profile.toServerTiming()
+        if profile.dumpCProfile():
+            response.headers[RequestProfile.HEADER] = self.basedUrl(url_for("getProfileDump", profileId=profile.id))
+        return response
+
+    def getProfileDump(self, profileId:str):
+        """
+        Returns the cProfile dump of a profiled request
+        """
+        if not self.allowCProfile or not re.fullmatch(r"[0-9a-f]{32}", profileId):
+            abort(404)
+        path = os.path.join(self.getProfileDir(), f"{profileId}.prof")
+        if not os.path.isfile(path):
+            abort(404)
+        return send_file(path, as_attachment=True, attachment_filename=f"{profileId}.prof", mimetype="application/octet-stream")
+
+    def sendDocument(self, lods:dict, spreadSheetType:SpreadSheetType, name:str):
+        """
+        Send the given lods as spreadsheet document.
+        The document is identified by the hash of its content which is used as ETag. Unchanged documents are answered
+        with 304 if the client already has them and are otherwise served from the document cache.
+        New documents are streamed to the client while they are generated.
+
+        Args:
+            lods: tables of the document
+            spreadSheetType: format of the document
+            name: name of the document
+
+        Returns:
+            Response
+        """
+        key = self.documentCache.getKey(lods, spreadSheetType, name)
+        doc = SpreadSheet.create(spreadSheetType, name=name)
+        if self.isNotModified(key):
+            return self.notModified(key)
+        path = self.documentCache.get(key, spreadSheetType)
+        if path is not None:
+            response = send_file(path, attachment_filename=doc.filename, as_attachment=True, mimetype=doc.MIME_TYPE, conditional=True, etag=False)
+        else:
+            response = Response(self.documentCache.generate(lods, spreadSheetType, name, key=key), mimetype=doc.MIME_TYPE)
+            response.headers["Content-Disposition"] = f'attachment; filename="{doc.filename}"'
+        response.set_etag(key)
+        return response
+
     def sendFile(self, data:str, name:str,mimetype:str="text" ):
         """
         Send the given string as file
@@ -420,6 +744,8 @@ class WebServer(AppWrap):
                 request_format = ResponseType.HTML
             elif 'application/json' in request.accept_mimetypes:
                 request_format = ResponseType.JSON
+            elif 'application/x-ndjson' in request.accept_mimetypes:
+                request_format = ResponseType.NDJSON
             elif 'text/csv' in request.accept_mimetypes:
                 request_format = ResponseType.CSV
             elif ExcelDocument.MIME_TYPE in request.accept_mimetypes:
@@ -524,6 +850,7 @@ class UploadForm(FlaskForm):
     #                                             "allowClear": 'true'})
     dropzone = DropZoneField(id="files", url="/api/upload/series", uploadId="upload",configParams={'acceptedFiles': ".ods, .xlsx"})
     validate = BooleanField("Validate", default=False)
+    failFast = BooleanField("Stop validation at the first invalid record", default=False)
     addPageEditorCreator = BooleanField("Add pageEditor & pageCreator", default="checked")
     ensureLocationExists = BooleanField("Ensure Location pages exist", default=True)
     dryRun = BooleanField(id="Dry run", default="checked")
@@ -575,21 +902,35 @@ DEBUG = False
 
 def main(argv=None):
     '''main program.'''
-    # construct the web application
-    web=WebServer()
     home=path.expanduser("~")
-    parser = web.getParser(description="openresearch api to retrieve and edit data")
+    parser = WebServer.getParser(description="openresearch api to retrieve and edit data")
     parser.add_argument('--wikiTextPath',default=f"{home}/.or/generated/orfixed", help="location of the wikiMarkup files to be used to initialize the ConferenceCorpus")  #ToDo: Update default value
     parser.add_argument('--wikiIds',nargs='*', help="wikiIds for which orapi should be provided if none provided all wikiIds will are available")
     parser.add_argument('--host', default=None, help="host (server name)")
     parser.add_argument('--requireAuthentication', action="store_true", help="Require wiki session cookie to update a wiki")
     parser.add_argument('--verbose', default=True, action="store_true", help="should relevant server actions be logged [default: %(default)s]")
     parser.add_argument('--fileStoragePath', help="location to store the uploaded files [default: /tmp/orapi]")
-    args = parser.parse_args()
+    parser.add_argument('--workers', type=int, default=0, help="number of worker processes to serve with. If not set the development server is used [default: %(default)s]")
+    parser.add_argument('--admissionLimit', nargs='*', default=[], help="concurrency limits of the expensive endpoints (series, upload, publish) as ENDPOINT[:WIKI]=ACTIVE[/QUEUED] e.g. upload:orfixed=1/2")
+    parser.add_argument('--validationService', nargs='*', default=[], help="remote validation services used instead of the in-process validators as NAME=URL e.g. homepage=http://localhost:8558/validate/homepage")
+    parser.add_argument('--strictRules', action="store_true", help="validate uploads with the strict rules that also require the acronym and the year and check that the acronym of an event ends with its year")
+    parser.add_argument('--cProfile', action="store_true", help="allow requests with profile=cprofile to store cProfile dumps that can be downloaded from /profile/<id>")
+    parser.add_argument('--queueTimeout', type=float, default=10, help="seconds a request waits for a free slot of an expensive endpoint before it is rejected with 503 [default: %(default)s]")
+    args = parser.parse_args(argv)
+    # construct the web application
+    web=WebServer(host=args.host)
     web.optionalDebug(args)
     orapiService = OrApiService(wikiIds=args.wikiIds, authUpdates=args.requireAuthentication)
-    web.init(orapiService=orapiService, baseUrl=args.baseUrl, fileStoragePath=args.fileStoragePath)
-    web.run(args)
+    try:
+        admissionControl = AdmissionControl.fromSpecs(args.admissionLimit, queueTimeout=args.queueTimeout)
+        validationServiceUrls = ValidatorRegistry.parseServiceUrls(args.validationService)
+    except ValueError as e:
+        parser.error(str(e))
+    web.init(orapiService=orapiService, baseUrl=args.baseUrl, fileStoragePath=args.fileStoragePath, admissionControl=admissionControl, validationServiceUrls=validationServiceUrls, strictRules=args.strictRules, allowCProfile=args.cProfile)
+    if args.workers > 0:
+        PreforkServer(web, workers=args.workers, debug=args.debug).serve()
+    else:
+        web.run(args)
 
 if __name__ == '__main__':
     sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,166 @@
+import copy
+import datetime
+import json
+import platform
+import sys
+import time
+from argparse import ArgumentParser
+
+from orapi import VERSION
+from orapi.locationService import LocationService
+from orapi.orapiservice import OrApi, WikiTableEditing
+from orapi.utils import WikiUserInfo
+from orapi.validationService import HomepageValidator, OrdinalValidator
+from tests.fakeWiki import FakeWiki
+
+
+class Benchmark(object):
+    """
+    measures the throughput of downloading, uploading, publishing, validating and location enhancing series of
+    different sizes against local FakeWiki instances
+    """
+
+    PHASES = ["download", "validation", "locationEnhancement", "upload", "publish"]
+    SOURCE_WIKI_ID = "orbench"
+    TARGET_WIKI_ID = "orbenchtarget"
+
+    def __init__(self, sizes:list, latency:float=0.0, phases:list=None, locationTimeout:float=600, debug:bool=False):
+        """
+
+        Args:
+            sizes: numbers of events of the benchmarked series
+            latency: delay of each request to the fake wikis in seconds
+            phases: phases to benchmark. If None all phases are benchmarked
+            locationTimeout: seconds to wait for the location data. If the data is not available the locationEnhancement is skipped
+            debug: print progress if True
+        """
+        self.sizes = sizes
+        self.latency = latency
+        self.phases = phases if phases else self.PHASES
+        self.locationTimeout = locationTimeout
+        self.debug = debug
+
+    def run(self) -> dict:
+        """
+        run the benchmark
+
+        Returns:
+            dict with the environment of the run and the list of results per size and phase
+        """
+        started = datetime.datetime.now().isoformat()
+        results = []
+        with FakeWiki(self.SOURCE_WIKI_ID, latency=self.latency) as sourceWiki, FakeWiki(self.TARGET_WIKI_ID, latency=self.latency) as targetWiki:
+            self.wikis = [sourceWiki, targetWiki]
+            orapi = OrApi(wikiId=self.SOURCE_WIKI_ID, targetWikiId=self.TARGET_WIKI_ID, authUpdates=False)
+            for size in self.sizes:
+                acronym = f"BENCH{size}"
+                sourceWiki.addSeries(acronym, size)
+                results.extend(self.runSize(orapi, acronym, size))
+        return {
+            "benchmark": "orapi",
+            "version": VERSION,
+            "started": started,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "latency": self.latency,
+            "results": results
+        }
+
+    def runSize(self, orapi:OrApi, acronym:str, size:int) -> list:
+        """
+        benchmark the phases for the given series
+        """
+        results = []
+        downloaded = {}
+        def download():
+            downloaded["tableEditing"] = orapi.getSeriesTableEditing(acronym)
+            orapi.enhance(downloaded["tableEditing"])
+        if "download" in self.phases:
+            results.append(self.measure("download", size, download))
+        else:
+            download()
+        tableEditing = downloaded["tableEditing"]
+        tableEditing.user = WikiUserInfo(**WikiUserInfo.getSamples()[0])
+        normalized = WikiTableEditing(user=tableEditing.user)
+        normalized.lods = copy.deepcopy(tableEditing.lods)
+        orapi.normalizeEntityProperties(normalized)
+        if "validation" in self.phases:
+            def validate():
+                HomepageValidator.validate(normalized)
+                OrdinalValidator.validate(normalized)
+            results.append(self.measure("validation", size, validate))
+        if "locationEnhancement" in self.phases:
+            locationService = LocationService.getInstance()
+            if locationService.waitUntilReady(timeout=self.locationTimeout):
+                results.append(self.measure("locationEnhancement", size, lambda: locationService.enhanceLocation(normalized)))
+            else:
+                results.append(self.getResult("locationEnhancement", size, status="skipped", error=f"location data {locationService.getStatus()}"))
+        if "upload" in self.phases:
+            generator = orapi.uploadLodTableGenerator(tableEditing, ensureLocationsExits=False)
+            results.append(self.measure("upload", size, lambda: self.exhaust(generator)))
+        if "publish" in self.phases:
+            generator = orapi.publishSeries(acronym, publisher=FakeWiki.USER, ensureLocationsExits=False)
+            results.append(self.measure("publish", size, lambda: self.exhaust(generator)))
+        return results
+
+    @staticmethod
+    def exhaust(generator):
+        for _progress in generator:
+            pass
+
+    def measure(self, phase:str, size:int, function) -> dict:
+        """
+        measure the duration and the wiki requests of the given function
+
+        Args:
+            phase: name of the benchmarked phase
+            size: number of events of the benchmarked series
+            function: function to measure
+        """
+        requestsBefore = sum(wiki.requestCount for wiki in self.wikis)
+        start = time.perf_counter()
+        status, error = "ok", None
+        try:
+            function()
+        except Exception as e:
+            status, error = "failed", str(e)
+        seconds = time.perf_counter() - start
+        wikiRequests = sum(wiki.requestCount for wiki in self.wikis) - requestsBefore
+        return self.getResult(phase, size, seconds=seconds, wikiRequests=wikiRequests, status=status, error=error)
+
+    def getResult(self, phase:str, size:int, seconds:float=None, wikiRequests:int=None, status:str="ok", error:str=None) -> dict:
+        result = {
+            "phase": phase,
+            "events": size,
+            "status": status,
+            "seconds": round(seconds, 6) if seconds is not None else None,
+            "eventsPerSecond": round(size / seconds, 3) if seconds and status == "ok" else None,
+            "wikiRequests": wikiRequests
+        }
+        if error is not None:
+            result["error"] = error
+        if self.debug:
+            print(f"{phase} {size} events: {status} {result['seconds']} s {result['eventsPerSecond']} events/s", file=sys.stderr)
+        return result
+
+
+def main(argv=None):
+    parser = ArgumentParser(description="benchmarks orapi against local stand-in wikis")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000], help="numbers of events of the benchmarked series")
+    parser.add_argument("--latency", type=float, default=0.0, help="delay of each request to the stand-in wikis in seconds")
+    parser.add_argument("--phases", nargs="+", choices=Benchmark.PHASES, default=None, help="phases to benchmark (default: all)")
+    parser.add_argument("--locationTimeout", type=float, default=600, help="seconds to wait for the location data")
+    parser.add_argument("--output", help="file the JSON results are written to (default: stdout)")
+    parser.add_argument("--debug", action="store_true", help="print the progress")
+    args = parser.parse_args(argv)
+    benchmark = Benchmark(sizes=args.sizes, latency=args.latency, phases=args.phases, locationTimeout=args.locationTimeout, debug=args.debug)
+    results = benchmark.run()
+    if args.output:
+        with open(args.output, "w") as outputFile:
+            json.dump(results, outputFile, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,404 @@
+import calendar
+import datetime
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from urllib.parse import unquote
+
+from flask import Flask, request, jsonify
+from werkzeug.serving import make_server, WSGIRequestHandler
+from wikibot3rd.wikiuser import WikiUser
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    """
+    request handler that does not log the requests
+    """
+
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+class FakeWikiUsers(object):
+    """
+    Keeps the WikiUser ini files of the running FakeWikis in a temporary directory instead of the configuration of the
+    user running the tests. While a FakeWiki is running WikiUser only knows the wikis of the running FakeWikis
+    """
+
+    _lock = threading.Lock()
+    _running = 0
+    _iniPath = None
+    _getIniPath = None
+
+    @classmethod
+    def acquire(cls):
+        with cls._lock:
+            if cls._running == 0:
+                cls._iniPath = tempfile.mkdtemp(prefix="fakeWikiUsers")
+                cls._getIniPath = WikiUser.__dict__["getIniPath"]
+                iniPath = cls._iniPath
+                WikiUser.getIniPath = staticmethod(lambda: iniPath)
+            cls._running += 1
+
+    @classmethod
+    def release(cls):
+        with cls._lock:
+            cls._running -= 1
+            if cls._running == 0:
+                WikiUser.getIniPath = cls._getIniPath
+                shutil.rmtree(cls._iniPath, ignore_errors=True)
+                cls._iniPath = None
+
+
+class FakeWiki(object):
+    """
+    In-process stand-in for the api.php of a Semantic MediaWiki.
+    Supports the api calls used by orapi (siteinfo, login, tokens, page info, revisions, edit and the ask queries
+    of a series) on generated Event and Event series pages and serves the homepages of the generated events.
+    Homepages below /homepage/gone/ are not found. The Wayback availability api (GET and batched POST) is answered
+    for the urls registered in archivedUrls.
+    Each api request is delayed by the configured latency to simulate a remote wiki.
+    """
+
+    VERSION = "MediaWiki 1.35.5"
+    USER = "Bench"
+    # template params and types of the properties that can be printed by ask queries
+    PRINTOUT_PARAMS = {"Acronym": "Acronym", "Event in series": "Series", "Has year": "Year"}
+    PRINTOUT_TYPES = {"Event in series": "_wpg", "Has year": "_num", "Modification date": "_dat"}
+
+    def __init__(self, wikiId:str="orbench", latency:float=0.0, host:str="127.0.0.1", port:int=0, debug:bool=False):
+        """
+
+        Args:
+            wikiId: id under which the wiki is registered as WikiUser
+            latency: delay of each request in seconds
+            host: host to bind to
+            port: port to bind to. If 0 a free port is chosen
+            debug: print the api requests if True
+        """
+        self.wikiId = wikiId
+        self.latency = latency
+        self.debug = debug
+        self.pages = {}
+        self.requestCount = 0
+        self.homepageRequestCount = 0
+        self.homepageMethods = []
+        self.activeHomepageRequests = 0
+        self.maxActiveHomepageRequests = 0
+        self.archivedUrls = {}
+        self.waybackMethods = []
+        self.waybackBatchSupported = True
+        self.askQueries = []
+        self._lock = threading.Lock()
+        self._revid = 0
+        self.app = Flask(__name__)
+        self.app.add_url_rule("/api.php", "api", self.api, methods=["GET", "POST"])
+        self.app.add_url_rule("/homepage/<path:path>", "homepage", self.homepage, methods=["GET", "HEAD"])
+        self.app.add_url_rule("/wayback/available", "wayback", self.wayback, methods=["GET", "POST"])
+        self.server = make_server(host, port, self.app, threaded=True, request_handler=QuietRequestHandler)
+        self.url = f"http://{host}:{self.server.server_port}"
+        self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def start(self) -> 'FakeWiki':
+        """
+        starts serving in a background thread and registers the WikiUser of the wiki in a temporary directory
+        """
+        FakeWikiUsers.acquire()
+        self.registerWikiUser()
+        self._thread = threading.Thread(target=self.server.serve_forever, name=f"fakeWiki-{self.wikiId}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        stops serving and removes the WikiUser of the wiki
+        """
+        self.server.shutdown()
+        self.server.server_close()
+        iniFile = WikiUser.iniFilePath(self.wikiId)
+        if os.path.isfile(iniFile):
+            os.remove(iniFile)
+        FakeWikiUsers.release()
+
+    def registerWikiUser(self):
+        wikiUser = WikiUser.ofDict({
+            "wikiId": self.wikiId,
+            "url": self.url,
+            "scriptPath": "",
+            "version": self.VERSION,
+            "user": self.USER,
+            "email": "noreply@nouser.com",
+            "password": "bench"
+        }, encrypted=False)
+        wikiUser.save()
+
+    def getHomepage(self, pageTitle:str) -> str:
+        return f"{self.url}/homepage/{pageTitle.replace(' ', '_')}"
+
+    def getWaybackApiUrl(self) -> str:
+        return f"{self.url}/wayback/available"
+
+    def addSeries(self, acronym:str, events:int):
+        """
+        generates the page of the series and the pages of the given number of events in the series
+        """
+        self.setPage(acronym, "\n".join([
+            "{{Event series",
+            f"|Acronym={acronym}",
+            f"|Title=Benchmark Conference {acronym}",
+            f"|Homepage={self.getHomepage(acronym)}",
+            "}}"]))
+        cities = [("Berlin", "Germany"), ("Paris", "France"), ("Vienna", "Austria"), ("Rome", "Italy")]
+        for i in range(1, events + 1):
+            pageTitle = f"{acronym} {i}"
+            year = 1900 + i % 120
+            city, country = cities[i % len(cities)]
+            self.setPage(pageTitle, "\n".join([
+                "{{Event",
+                f"|Acronym={pageTitle}",
+                f"|Title={i}. Benchmark Conference {acronym}",
+                f"|Series={acronym}",
+                f"|Ordinal={i}",
+                f"|Year={year}",
+                f"|Start date={year}-06-01",
+                f"|End date={year}-06-03",
+                f"|City={city}",
+                f"|Country={country}",
+                f"|Homepage={self.getHomepage(pageTitle)}",
+                "}}"]))
+
+    def setPage(self, pageTitle:str, text:str, user:str=None, comment:str="") -> dict:
+        """
+        adds a new revision with the given text to the page
+        """
+        with self._lock:
+            self._revid += 1
+            page = self.pages.setdefault(pageTitle, {"pageid": len(self.pages) + 1, "revisions": []})
+            revisions = page["revisions"]
+            revision = {
+                "revid": self._revid,
+                "parentid": revisions[-1]["revid"] if revisions else 0,
+                "user": user if user else self.USER,
+                "userid": 1,
+                "timestamp": datetime.datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "size": len(text),
+                "comment": comment,
+                "text": text
+            }
+            revisions.append(revision)
+            return revision
+
+    def getPage(self, pageTitle:str) -> dict:
+        with self._lock:
+            return self.pages.get(pageTitle)
+
+    @staticmethod
+    def normalizeTitle(pageTitle:str) -> str:
+        return unquote(pageTitle).replace("_", " ").strip()
+
+    def api(self):
+        """
+        api.php
+        """
+        with self._lock:
+            self.requestCount += 1
+        if self.latency:
+            time.sleep(self.latency)
+        params = request.values
+        if self.debug:
+            print(dict(params))
+        action = params.get("action")
+        if action == "query":
+            res = self.query(params)
+        elif action == "login":
+            res = {"login": {"result": "Success", "lgusername": self.USER}}
+        elif action == "edit":
+            revision = self.setPage(self.normalizeTitle(params.get("title")), params.get("text", ""), comment=params.get("summary", ""))
+            res = {"edit": {"result": "Success", "newrevid": revision["revid"], "newtimestamp": revision["timestamp"]}}
+        elif action == "ask":
+            res = self.ask(params.get("query", ""))
+        else:
+            res = {"error": {"code": "badvalue", "info": f"Unrecognized value for parameter action: {action}"}}
+        return jsonify(res)
+
+    def query(self, params) -> dict:
+        formatVersion2 = params.get("formatversion") == "2"
+        query = {}
+        meta = params.get("meta", "").split("|")
+        if "siteinfo" in meta:
+            query["general"] = {"generator": self.VERSION, "server": self.url, "scriptpath": "", "sitename": self.wikiId}
+            query["namespaces"] = {"0": {"id": 0, "*": ""}, "2": {"id": 2, "*": "User"}, "6": {"id": 6, "*": "File"}, "14": {"id": 14, "*": "Category"}}
+        if "userinfo" in meta:
+            query["userinfo"] = {
+                "id": 1,
+                "name": self.USER,
+                "groups": ["user"],
+                "rights": ["read", "edit", "createpage", "writeapi"],
+                "registrationdate": "2020-01-01T00:00:00Z",
+                "acceptlang": [{"q": 1, "*": "en"}]
+            }
+        if "tokens" in meta:
+            query["tokens"] = {"logintoken": "benchlogin+\\", "csrftoken": "benchcsrf+\\"}
+        if "titles" in params:
+            pages = []
+            for i, pageTitle in enumerate(params.get("titles").split("|")):
+                pages.append(self.getPageRecord(self.normalizeTitle(pageTitle), params, missingId=-(i + 1)))
+            query["pages"] = pages if formatVersion2 else {str(page.get("pageid", -1)): page for page in pages}
+        return {"batchcomplete": True if formatVersion2 else "", "query": query}
+
+    def getPageRecord(self, pageTitle:str, params, missingId:int) -> dict:
+        page = self.getPage(pageTitle)
+        if page is None:
+            return {"ns": 0, "title": pageTitle, "missing": True if params.get("formatversion") == "2" else "", "pageid": missingId}
+        revisions = page["revisions"]
+        record = {"pageid": page["pageid"], "ns": 0, "title": pageTitle}
+        prop = params.get("prop", "")
+        if prop == "info":
+            record.update({"contentmodel": "wikitext", "lastrevid": revisions[-1]["revid"], "length": revisions[-1]["size"],
+                           "touched": revisions[-1]["timestamp"], "protection": []})
+        elif prop == "revisions":
+            rvprop = params.get("rvprop", "ids|timestamp").split("|")
+            if "content" in rvprop or params.get("rvlimit") is None:
+                selected = revisions[-1:]
+            else:
+                selected = list(reversed(revisions))[:int(params.get("rvlimit"))]
+            record["revisions"] = [self.getRevisionRecord(revision, rvprop, params) for revision in selected]
+        return record
+
+    @staticmethod
+    def getRevisionRecord(revision:dict, rvprop:list, params) -> dict:
+        record = {key: value for key, value in revision.items() if key != "text"}
+        if "content" in rvprop:
+            content = {"contentmodel": "wikitext", "contentformat": "text/x-wiki", "*": revision["text"]}
+            if params.get("rvslots"):
+                record["slots"] = {"main": content}
+            else:
+                record.update(content)
+        return record
+
+    def ask(self, query:str) -> dict:
+        """
+        answers the ask queries for a series and its events and the query of all events (optionally restricted to
+        the events modified since a given time) with the printouts of PRINTOUT_PARAMS
+        """
+        self.askQueries.append(query)
+        seriesMatch = re.search(r"\[\[EventSeries acronym::([^\]]+)\]\]", query)
+        eventMatch = re.search(r"\[\[Event in series::([^\]]+)\]\]", query)
+        modifiedMatch = re.search(r"\[\[Modification date::>(=?)([^\]]+)\]\]", query)
+        with self._lock:
+            pages = {pageTitle: page["revisions"][-1] for pageTitle, page in self.pages.items()}
+        titles = []
+        if seriesMatch:
+            pattern = self.getTemplatePattern("Event series", "Acronym", seriesMatch.group(1).strip())
+        elif eventMatch:
+            pattern = self.getTemplatePattern("Event", "Series", eventMatch.group(1).strip())
+        elif "[[Concept:Event]]" in query:
+            pattern = re.compile(r"^\{\{\s*Event\s*[|\n]")
+        else:
+            pattern = None
+        if pattern is not None:
+            titles = [pageTitle for pageTitle, revision in pages.items() if pattern.search(revision["text"])]
+        if modifiedMatch:
+            since = datetime.datetime.fromisoformat(modifiedMatch.group(2).strip())
+            if modifiedMatch.group(1):
+                titles = [pageTitle for pageTitle in titles if self.getModificationDate(pages[pageTitle]) >= since]
+            else:
+                titles = [pageTitle for pageTitle in titles if self.getModificationDate(pages[pageTitle]) > since]
+        printouts = [(prop.strip(), label.strip()) for prop, label in re.findall(r"\|\s*\?([^=|}]+)=([^|}\n]+)", query)]
+        results = {pageTitle: {"printouts": {label: self.getPrintout(pages[pageTitle], prop) for prop, label in printouts},
+                               "fulltext": pageTitle, "fullurl": f"{self.url}/index.php?title={pageTitle}",
+                               "namespace": 0, "exists": "1", "displaytitle": ""} for pageTitle in titles}
+        printrequests = [{"label": "pageTitle", "key": "", "redi": "", "typeid": "_wpg", "mode": 2}]
+        printrequests.extend({"label": label, "key": prop, "redi": "", "typeid": self.PRINTOUT_TYPES.get(prop, "_txt"), "mode": 1} for prop, label in printouts)
+        return {
+            "query": {
+                "printrequests": printrequests,
+                "results": results,
+                "serializer": "SMW\\Serializers\\QueryResultSerializer",
+                "version": 2,
+                "meta": {"hash": "", "count": len(results), "offset": 0, "source": "", "time": "0.001"}
+            }
+        }
+
+    @staticmethod
+    def getModificationDate(revision:dict) -> datetime.datetime:
+        return datetime.datetime.strptime(revision["timestamp"], "%Y-%m-%dT%H:%M:%SZ")
+
+    def getPrintout(self, revision:dict, prop:str) -> list:
+        """
+        Returns the serialized values of the given property of the page with the given revision
+        """
+        if prop == "Modification date":
+            timestamp = calendar.timegm(self.getModificationDate(revision).timetuple())
+            return [{"timestamp": str(timestamp), "raw": revision["timestamp"]}]
+        param = self.PRINTOUT_PARAMS.get(prop)
+        match = re.search(r"\|\s*%s\s*=\s*([^|}\n]*)" % re.escape(param), revision["text"]) if param else None
+        if match is None or not match.group(1).strip():
+            return []
+        value = match.group(1).strip()
+        typeid = self.PRINTOUT_TYPES.get(prop, "_txt")
+        if typeid == "_wpg":
+            return [{"fulltext": value}]
+        if typeid == "_num":
+            return [int(value)]
+        return [value]
+
+    @staticmethod
+    def getTemplatePattern(templateName:str, param:str, value:str):
+        """
+        Returns pattern matching the markup of a page with the given template and template param value
+        """
+        return re.compile(r"^\{\{\s*%s\s*[|\n][^}]*?\|\s*%s\s*=\s*%s\s*(?=[|}\n])" % (re.escape(templateName), re.escape(param), re.escape(value)))
+
+    def homepage(self, path:str):
+        """
+        homepage of a generated event or series
+        """
+        with self._lock:
+            self.homepageRequestCount += 1
+            self.homepageMethods.append(request.method)
+            self.activeHomepageRequests += 1
+            self.maxActiveHomepageRequests = max(self.maxActiveHomepageRequests, self.activeHomepageRequests)
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.activeHomepageRequests -= 1
+        if path.startswith("gone/"):
+            return "Not Found", 404
+        pageTitle = self.normalizeTitle(path)
+        return f"<html><head><title>{pageTitle}</title></head><body><h1>{pageTitle}</h1></body></html>"
+
+    def wayback(self):
+        """
+        Wayback availability api. A GET looks up the url parameter, a POST looks up all url values of the form
+        """
+        with self._lock:
+            self.waybackMethods.append(request.method)
+        if self.latency:
+            time.sleep(self.latency)
+        if request.method == "POST":
+            if not self.waybackBatchSupported:
+                return "Method Not Allowed", 405
+            return jsonify({"results": [self.getAvailability(url) for url in request.form.getlist("url")]})
+        return jsonify(self.getAvailability(request.args.get("url", "")))
+
+    def getAvailability(self, url:str) -> dict:
+        snapshots = {}
+        timestamp = self.archivedUrls.get(url)
+        if timestamp is not None:
+            snapshots["closest"] = {
+                "status": "200",
+                "available": True,
+                "url": f"http://web.archive.org/web/{timestamp}/{url}",
+                "timestamp": timestamp
+            }
+        return {"url": url, "archived_snapshots": snapshots}
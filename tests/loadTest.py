@@ -0,0 +1,347 @@
+import json
+import math
+import multiprocessing
+import os
+import re
+import socket
+import sys
+import tempfile
+import threading
+import time
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from werkzeug.serving import make_server
+
+from orapi.orapiservice import OrApi, WikiTableEditing, OrApiService
+from tests.fakeWiki import FakeWiki, QuietRequestHandler
+
+
+class LoadTestServer(object):
+    """
+    orapi WebServer running in a child process so that its threads and memory can be measured independently of the
+    threads generating the load
+    """
+
+    def __init__(self, wikiIds:list, host:str="127.0.0.1", fileStoragePath:str=None):
+        """
+
+        Args:
+            wikiIds: ids of the wikis the server provides. The first one is the default source wiki
+            host: host to bind to
+            fileStoragePath: location to store the uploaded files. If None a temporary directory is used
+        """
+        self.wikiIds = wikiIds
+        self.host = host
+        self.fileStoragePath = fileStoragePath if fileStoragePath else tempfile.mkdtemp(prefix="orapiLoadTest")
+        with socket.socket() as sock:
+            sock.bind((host, 0))
+            self.port = sock.getsockname()[1]
+        self.url = f"http://{host}:{self.port}"
+        self.process = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def start(self, timeout:float=60) -> 'LoadTestServer':
+        """
+        start the server process and wait until it accepts requests
+        """
+        context = multiprocessing.get_context("fork")
+        self.process = context.Process(target=self.serve, name="orapiLoadTestServer", daemon=True)
+        self.process.start()
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                requests.get(f"{self.url}/ready", timeout=5)
+                return self
+            except requests.ConnectionError:
+                time.sleep(0.1)
+        self.stop()
+        raise TimeoutError(f"orapi server did not start within {timeout}s")
+
+    def serve(self):
+        # imported in the server process only
+        from orapi.webserver import WebServer
+        web = WebServer(host=self.host, port=self.port)
+        web.init(OrApiService(wikiIds=self.wikiIds, authUpdates=False, defaultSourceWiki=self.wikiIds[0]), fileStoragePath=self.fileStoragePath)
+        server = make_server(self.host, self.port, web.app, threaded=True, request_handler=QuietRequestHandler)
+        server.serve_forever()
+
+    def stop(self):
+        if self.process is not None and self.process.is_alive():
+            self.process.terminate()
+            self.process.join(10)
+
+    def getResourceUsage(self) -> dict:
+        """
+        Returns the number of threads and the resident memory of the server process (None if /proc is not available)
+        """
+        usage = {"threads": None, "rssBytes": None}
+        try:
+            with open(f"/proc/{self.process.pid}/status") as statusFile:
+                for line in statusFile:
+                    if line.startswith("Threads:"):
+                        usage["threads"] = int(line.split()[1])
+                    elif line.startswith("VmRSS:"):
+                        usage["rssBytes"] = int(line.split()[1]) * 1024
+        except OSError:
+            pass
+        return usage
+
+
+class ResourceSampler(object):
+    """
+    samples the resource usage of the server while a scenario runs
+    """
+
+    def __init__(self, server:LoadTestServer, interval:float=0.05):
+        self.server = server
+        self.interval = interval
+        self.samples = []
+        self._done = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.samples.append(self.server.getResourceUsage())
+        self._thread = threading.Thread(target=self.sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self._done.set()
+        self._thread.join()
+        self.samples.append(self.server.getResourceUsage())
+
+    def sample(self):
+        while not self._done.wait(self.interval):
+            self.samples.append(self.server.getResourceUsage())
+
+    def getSummary(self) -> dict:
+        summary = {}
+        for key in ["threads", "rssBytes"]:
+            values = [sample[key] for sample in self.samples if sample[key] is not None]
+            summary[key] = {
+                "before": values[0] if values else None,
+                "peak": max(values) if values else None,
+                "after": values[-1] if values else None
+            }
+        return summary
+
+
+class LoadTest(object):
+    """
+    drives the expensive endpoints of the orapi WebServer at the given concurrency levels and reports latency
+    percentiles, error rates and the threads and memory of the server
+    """
+
+    SCENARIOS = ["series", "seriesJson", "upload", "location", "validateHomepage", "validateOrdinal"]
+    SSE_CHANNEL_PATTERN = re.compile(r'showProgressMessages\("([^"]+)"')
+
+    def __init__(self, server:LoadTestServer, series:str, sourceWikiId:str, targetWikiId:str, scenarios:list=None,
+                 requestsPerLevel:int=50, timeout:float=300, debug:bool=False):
+        """
+
+        Args:
+            server: server under test
+            series: acronym of the series that is downloaded and uploaded
+            sourceWikiId: wiki the series is downloaded from
+            targetWikiId: wiki the series is uploaded to
+            scenarios: scenarios to run. If None all scenarios are run
+            requestsPerLevel: number of requests of a scenario per concurrency level
+            timeout: timeout of a request including its progress stream in seconds
+            debug: print progress if True
+        """
+        self.server = server
+        self.series = series
+        self.sourceWikiId = sourceWikiId
+        self.targetWikiId = targetWikiId
+        self.scenarios = scenarios if scenarios else self.SCENARIOS
+        self.requestsPerLevel = requestsPerLevel
+        self.timeout = timeout
+        self.debug = debug
+        self.lods = None
+        self.document = None
+
+    def prepare(self):
+        """
+        download the series once as json for the validation requests and as excel document for the uploads
+        """
+        url = f"{self.server.url}/api/series/{self.series}"
+        response = requests.get(url, params={"format": "json", "source": self.sourceWikiId}, timeout=self.timeout)
+        response.raise_for_status()
+        tableEditing = WikiTableEditing(user=None)
+        tableEditing.lods = response.json()
+        # the validation services expect normalized property names
+        OrApi.normalizeEntityProperties(tableEditing)
+        self.lods = tableEditing.lods
+        response = requests.get(url, params={"format": "excel", "source": self.sourceWikiId}, timeout=self.timeout)
+        response.raise_for_status()
+        self.document = response.content
+
+    def run(self, concurrencyLevels:list) -> dict:
+        """
+        run each scenario at each concurrency level
+
+        Returns:
+            dict with the configuration of the run and the list of results per scenario and concurrency level
+        """
+        self.prepare()
+        results = []
+        for scenario in self.scenarios:
+            for concurrency in concurrencyLevels:
+                results.append(self.runScenario(scenario, concurrency))
+        return {
+            "loadTest": "orapi",
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "series": self.series,
+            "requestsPerLevel": self.requestsPerLevel,
+            "results": results
+        }
+
+    def runScenario(self, scenario:str, concurrency:int) -> dict:
+        """
+        send requestsPerLevel requests of the given scenario with the given number of concurrent clients
+        """
+        sendRequest = getattr(self, f"request{scenario[0].upper()}{scenario[1:]}")
+        def timedRequest(_i):
+            start = time.perf_counter()
+            try:
+                status = sendRequest()
+            except Exception as e:
+                status = type(e).__name__
+            return status, time.perf_counter() - start
+        start = time.perf_counter()
+        with ResourceSampler(self.server) as sampler:
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                outcomes = list(executor.map(timedRequest, range(self.requestsPerLevel)))
+        seconds = time.perf_counter() - start
+        latencies = sorted(latency for _status, latency in outcomes)
+        statusCodes = {}
+        for status, _latency in outcomes:
+            statusCodes[str(status)] = statusCodes.get(str(status), 0) + 1
+        errors = sum(count for status, count in statusCodes.items() if not status.startswith("2"))
+        result = {
+            "scenario": scenario,
+            "concurrency": concurrency,
+            "requests": len(outcomes),
+            "seconds": round(seconds, 6),
+            "requestsPerSecond": round(len(outcomes) / seconds, 3),
+            "errors": errors,
+            "errorRate": round(errors / len(outcomes), 4),
+            "statusCodes": statusCodes,
+            "latency": {
+                "p50": self.percentile(latencies, 50),
+                "p95": self.percentile(latencies, 95),
+                "p99": self.percentile(latencies, 99),
+                "max": round(latencies[-1], 6),
+                "mean": round(sum(latencies) / len(latencies), 6)
+            },
+            "server": sampler.getSummary()
+        }
+        if self.debug:
+            latency = result["latency"]
+            print(f"{scenario} x{concurrency}: p50={latency['p50']}s p95={latency['p95']}s p99={latency['p99']}s "
+                  f"errors={result['errorRate']:.1%} threads={result['server']['threads']['peak']}", file=sys.stderr)
+        return result
+
+    @staticmethod
+    def percentile(sortedValues:list, percent:float) -> float:
+        """
+        Returns the nearest-rank percentile of the given sorted values
+        """
+        if not sortedValues:
+            return None
+        rank = max(1, math.ceil(percent / 100 * len(sortedValues)))
+        return round(sortedValues[rank - 1], 6)
+
+    def followProgress(self, response:requests.Response):
+        """
+        consume the progress stream announced in the given html page until the final message is received
+
+        Returns:
+            status code of the page or of the progress stream if it failed
+        """
+        if response.status_code != 200:
+            return response.status_code
+        match = self.SSE_CHANNEL_PATTERN.search(response.text)
+        if match is None:
+            raise ValueError("no progress stream in the response")
+        with requests.get(f"{self.server.url}/sse/{match.group(1)}", stream=True, timeout=self.timeout) as stream:
+            if stream.status_code != 200:
+                return stream.status_code
+            for line in stream.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "None":
+                    return response.status_code
+                try:
+                    message = json.loads(data)
+                except ValueError:
+                    continue
+                if isinstance(message, dict) and "result" in message:
+                    return response.status_code
+        raise ConnectionError("progress stream ended without final message")
+
+    def requestSeries(self):
+        response = requests.get(f"{self.server.url}/api/series/{self.series}", params={"source": self.sourceWikiId}, timeout=self.timeout)
+        return self.followProgress(response)
+
+    def requestSeriesJson(self):
+        response = requests.get(f"{self.server.url}/api/series/{self.series}", params={"format": "json", "source": self.sourceWikiId}, timeout=self.timeout)
+        return response.status_code
+
+    def requestUpload(self):
+        response = requests.post(f"{self.server.url}/api/upload/series",
+                                 data={"targetWiki": self.targetWikiId},
+                                 files={"file": (f"{self.series}.xlsx", self.document)},
+                                 timeout=self.timeout)
+        return self.followProgress(response)
+
+    def requestLocation(self):
+        response = requests.get(f"{self.server.url}/location/DE", timeout=self.timeout)
+        return response.status_code
+
+    def requestValidateHomepage(self):
+        response = requests.post(f"{self.server.url}/validate/homepage", json=self.lods, timeout=self.timeout)
+        return response.status_code
+
+    def requestValidateOrdinal(self):
+        response = requests.post(f"{self.server.url}/validate/ordinalFormat", json=self.lods, timeout=self.timeout)
+        return response.status_code
+
+
+def main(argv=None):
+    parser = ArgumentParser(description="load test of the orapi endpoints against local stand-in wikis")
+    parser.add_argument("--scenarios", nargs="+", choices=LoadTest.SCENARIOS, default=None, help="scenarios to run (default: all)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50], help="numbers of concurrent clients")
+    parser.add_argument("--requests", type=int, default=50, help="requests per scenario and concurrency level")
+    parser.add_argument("--events", type=int, default=20, help="number of events of the series")
+    parser.add_argument("--latency", type=float, default=0.0, help="delay of each request to the stand-in wikis in seconds")
+    parser.add_argument("--timeout", type=float, default=300, help="timeout of a request including its progress stream in seconds")
+    parser.add_argument("--output", help="file the JSON results are written to (default: stdout)")
+    parser.add_argument("--debug", action="store_true", help="print the progress")
+    args = parser.parse_args(argv)
+    with FakeWiki("orload", latency=args.latency) as sourceWiki, FakeWiki("orloadtarget", latency=args.latency) as targetWiki:
+        series = "LOAD"
+        sourceWiki.addSeries(series, args.events)
+        with LoadTestServer(wikiIds=[sourceWiki.wikiId, targetWiki.wikiId]) as server:
+            loadTest = LoadTest(server, series=series, sourceWikiId=sourceWiki.wikiId, targetWikiId=targetWiki.wikiId,
+                                scenarios=args.scenarios, requestsPerLevel=args.requests, timeout=args.timeout, debug=args.debug)
+            results = loadTest.run(args.concurrency)
+    results["events"] = args.events
+    results["latency"] = args.latency
+    if args.output:
+        with open(args.output, "w") as outputFile:
+            json.dump(results, outputFile, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
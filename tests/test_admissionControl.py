@@ -0,0 +1,128 @@
+import threading
+import time
+
+from werkzeug.exceptions import ServiceUnavailable
+
+from orapi.admissionControl import AdmissionControl, AdmissionLimit
+from orapi.orapiservice import OrApiService
+from orapi.webserver import WebServer
+from tests.basetest import Basetest
+from tests.fakeWiki import FakeWiki
+
+
+class TestAdmissionControl(Basetest):
+    """
+    tests AdmissionControl
+    """
+
+    def test_parse(self):
+        """
+        tests parsing the limit specs
+        """
+        endpoint, wikiId, limit = AdmissionLimit.parse("upload:orfixed=1/2", queueTimeout=3)
+        self.assertEqual(("upload", "orfixed", 1, 2, 3), (endpoint, wikiId, limit.maxActive, limit.maxQueued, limit.queueTimeout))
+        endpoint, wikiId, limit = AdmissionLimit.parse("series=4")
+        self.assertEqual(("series", None, 4, 0), (endpoint, wikiId, limit.maxActive, limit.maxQueued))
+        for invalid in ["series", "series=0", "series=a/b"]:
+            with self.assertRaises(ValueError):
+                AdmissionLimit.parse(invalid)
+        admissionControl = AdmissionControl.fromSpecs(["upload:orfixed=1/2"])
+        self.assertEqual(1, admissionControl.getLimit("upload", "orfixed").maxActive)
+        self.assertEqual(AdmissionControl.DEFAULT_LIMITS["upload"].maxActive, admissionControl.getLimit("upload", "orclone").maxActive)
+        self.assertIsNone(admissionControl.acquire("unbounded", "orfixed"))
+
+    def test_queue(self):
+        """
+        tests that requests wait for a free slot and are rejected if the queue is full
+        """
+        admissionControl = AdmissionControl(limits={"upload": AdmissionLimit(maxActive=1, maxQueued=1, queueTimeout=5)})
+        slot = admissionControl.acquire("upload", "orfixed")
+        # other wikis have their own slots
+        admissionControl.acquire("upload", "orclone").release()
+        waiting = {}
+        def waitForSlot():
+            waiting["slot"] = admissionControl.acquire("upload", "orfixed")
+        thread = threading.Thread(target=waitForSlot)
+        thread.start()
+        while admissionControl.admissions[("upload", "orfixed")].queued == 0:
+            time.sleep(0.01)
+        with self.assertRaises(ServiceUnavailable) as context:
+            admissionControl.acquire("upload", "orfixed")
+        self.assertEqual(503, context.exception.code)
+        self.assertIn(("Retry-After", "5"), context.exception.get_headers())
+        slot.release()
+        thread.join()
+        status = {(entry["endpoint"], entry["wiki"]): entry for entry in admissionControl.getStatus()}
+        self.assertEqual(1, status[("upload", "orfixed")]["active"])
+        self.assertEqual(0, status[("upload", "orfixed")]["queued"])
+        waiting["slot"].release()
+        waiting["slot"].release()
+        self.assertEqual(0, admissionControl.admissions[("upload", "orfixed")].active)
+
+    def test_timeout(self):
+        """
+        tests that queued requests are rejected after the queue timeout
+        """
+        admissionControl = AdmissionControl(limits={"series": AdmissionLimit(maxActive=1, maxQueued=1, queueTimeout=0.05)})
+        slot = admissionControl.acquire("series", "orfixed")
+        with self.assertRaises(ServiceUnavailable):
+            admissionControl.acquire("series", "orfixed")
+        slot.release()
+        admissionControl.acquire("series", "orfixed").release()
+
+    def test_guard(self):
+        """
+        tests that a slot handed over to a generator is released when the generator is finished or closed
+        """
+        admissionControl = AdmissionControl(limits={"series": AdmissionLimit(maxActive=1)})
+        slot = admissionControl.acquire("series", "orfixed")
+        generator = slot.guard(iter(range(3)))
+        self.assertTrue(slot.isHandedOver)
+        self.assertEqual(0, next(generator))
+        self.assertFalse(slot.isReleased)
+        generator.close()
+        self.assertTrue(slot.isReleased)
+
+    def test_webserver(self):
+        """
+        tests the admission of series downloads by the WebServer
+        """
+        with FakeWiki("oradmissiontest") as wiki:
+            wiki.addSeries("ADMISSION", 2)
+            web = WebServer()
+            admissionControl = AdmissionControl(limits={"series": AdmissionLimit(maxActive=1, queueTimeout=0.05)})
+            web.init(OrApiService(wikiIds=[wiki.wikiId], defaultSourceWiki=wiki.wikiId, authUpdates=False), admissionControl=admissionControl)
+            web.app.config['TESTING'] = True
+            client = web.app.test_client()
+            url = f"/api/series/ADMISSION?format=json&source={wiki.wikiId}"
+            slot = admissionControl.acquire("series", wiki.wikiId)
+            response = client.get(url)
+            self.assertEqual(503, response.status_code)
+            self.assertIn("Retry-After", response.headers)
+            slot.release()
+            response = client.get(url)
+            self.assertEqual(200, response.status_code)
+            etag = response.headers["ETag"]
+            response.close()
+            self.assertEqual(0, admissionControl.admissions[("series", wiki.wikiId)].active)
+            # a revalidated series that is not modified is answered without an admission slot
+            slot = admissionControl.acquire("series", wiki.wikiId)
+            response = client.get(url, headers={"If-None-Match": etag})
+            self.assertEqual(304, response.status_code)
+            response.close()
+            slot.release()
+            # the table data of a series is only admitted if the series has to be enhanced
+            tableUrl = f"/api/series/ADMISSION/table/Event?source={wiki.wikiId}&draw=1&start=0&length=10"
+            slot = admissionControl.acquire("series", wiki.wikiId)
+            response = client.get(tableUrl)
+            self.assertEqual(503, response.status_code)
+            slot.release()
+            response = client.get(tableUrl)
+            self.assertEqual(200, response.status_code)
+            response.close()
+            slot = admissionControl.acquire("series", wiki.wikiId)
+            response = client.get(tableUrl)
+            self.assertEqual(200, response.status_code)
+            response.close()
+            slot.release()
+            self.assertEqual(0, admissionControl.admissions[("series", wiki.wikiId)].active)
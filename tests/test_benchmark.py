@@ -0,0 +1,44 @@
+from orapi.orapiservice import OrApi
+from tests.basetest import Basetest
+from tests.benchmark import Benchmark
+from tests.fakeWiki import FakeWiki
+
+
+class TestBenchmark(Basetest):
+    """
+    tests the benchmark against the local stand-in wikis
+    """
+
+    def test_fakeWiki(self):
+        """
+        tests querying, fetching and pushing the generated pages of the stand-in wiki
+        """
+        with FakeWiki("orbenchtest") as wiki:
+            wiki.addSeries("BENCH", 3)
+            orapi = OrApi(wikiId=wiki.wikiId, targetWikiId=wiki.wikiId, authUpdates=False)
+            tableEditing = orapi.getSeriesTableEditing("BENCH")
+            orapi.enhance(tableEditing)
+            events = tableEditing.lods.get(OrApi.EVENT_TEMPLATE_NAME)
+            self.assertEqual(["BENCH 1", "BENCH 2", "BENCH 3"], sorted(event.get("pageTitle") for event in events))
+            self.assertEqual("BENCH", events[0].get("Series"))
+            progress = "".join(str(step) for step in orapi.uploadLodTableGenerator(tableEditing, ensureLocationsExits=False))
+            self.assertIn("Completed Upload!", progress)
+            self.assertEqual(2, len(wiki.getPage("BENCH 1")["revisions"]))
+
+    def test_benchmark(self):
+        """
+        tests that each phase is measured for each size
+        """
+        phases = ["download", "validation", "upload", "publish"]
+        benchmark = Benchmark(sizes=[5, 10], phases=phases)
+        res = benchmark.run()
+        self.assertEqual("orapi", res["benchmark"])
+        self.assertEqual(8, len(res["results"]))
+        for result in res["results"]:
+            self.assertEqual("ok", result["status"], result.get("error"))
+            self.assertIn(result["phase"], phases)
+            self.assertGreater(result["eventsPerSecond"], 0)
+        downloads = [result for result in res["results"] if result["phase"] == "download"]
+        self.assertEqual([5, 10], [result["events"] for result in downloads])
+        # one page fetch per event
+        self.assertGreaterEqual(downloads[1]["wikiRequests"], 10)
@@ -0,0 +1,122 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.datastructures import MultiDict
+
+from orapi.dataTable import DataTableQuery, LodCache, ServerSideLodTable
+from tests.basetest import Basetest
+
+
+class TestDataTableQuery(Basetest):
+    """
+    tests DataTableQuery
+    """
+
+    def setUp(self,debug=False,profile=True):
+        super().setUp(debug=debug, profile=profile)
+        self.lod = [
+            {"pageTitle": "AAAI 2020", "Ordinal": 34, "City": "US/NY/New York City"},
+            {"pageTitle": "AAAI 2021", "Ordinal": 35, "City": None},
+            {"pageTitle": "AAAI 2019", "Ordinal": 33, "City": "US/HI/Honolulu"},
+            {"pageTitle": "AAAI 2022", "Ordinal": None, "City": None},
+        ]
+
+    def test_fromRequestArgs(self):
+        """
+        tests parsing the DataTables server-side request
+        """
+        args = MultiDict({
+            "draw": "3",
+            "start": "10",
+            "length": "25",
+            "search[value]": "AAAI",
+            "columns[0][data]": "pageTitle",
+            "columns[0][search][value]": "",
+            "columns[1][data]": "Ordinal",
+            "columns[1][search][value]": "3",
+            "order[0][column]": "1",
+            "order[0][dir]": "desc",
+        })
+        query = DataTableQuery.fromRequestArgs(args)
+        self.assertEqual(3, query.draw)
+        self.assertEqual(10, query.start)
+        self.assertEqual(25, query.length)
+        self.assertEqual("aaai", query.search)
+        self.assertEqual(["pageTitle", "Ordinal"], query.columns)
+        self.assertEqual({"Ordinal": "3"}, query.columnSearch)
+        self.assertEqual([("Ordinal", False)], query.order)
+
+    def test_apply(self):
+        """
+        tests filtering, sorting and paging of a lod
+        """
+        converted = []
+        def toLink(value):
+            converted.append(value)
+            return f"<a>{value}</a>"
+        query = DataTableQuery(draw=1, start=0, length=2, search="aaai", order=[("Ordinal", True)], columns=["pageTitle", "Ordinal", "City"])
+        res = query.apply(self.lod, valueMap={"pageTitle": toLink})
+        self.assertEqual(1, res["draw"])
+        self.assertEqual(4, res["recordsTotal"])
+        self.assertEqual(4, res["recordsFiltered"])
+        self.assertEqual(["<a>AAAI 2019</a>", "<a>AAAI 2020</a>"], [record["pageTitle"] for record in res["data"]])
+        # links are only built for the requested page
+        self.assertEqual(["AAAI 2019", "AAAI 2020"], converted)
+        # source lod is not modified
+        self.assertEqual("AAAI 2020", self.lod[0]["pageTitle"])
+        query = DataTableQuery(search="honolulu")
+        res = query.apply(self.lod)
+        self.assertEqual(1, res["recordsFiltered"])
+        self.assertEqual(33, res["data"][0]["Ordinal"])
+        # empty values are returned as empty strings
+        res = DataTableQuery(search="2022").apply(self.lod)
+        self.assertEqual("", res["data"][0]["Ordinal"])
+
+    def test_serverSideLodTable(self):
+        """
+        tests rendering the table without rows
+        """
+        table = ServerSideLodTable(headers={"pageTitle": "pageTitle", "Ordinal": "Ordinal"}, dataUrl="/api/series/AAAI/table/Event", name="Events")
+        html = str(table)
+        self.assertIn("serverSide: true", html)
+        self.assertIn("/api/series/AAAI/table/Event", html)
+        self.assertIn('{"data": "Ordinal"}', html)
+        self.assertNotIn("<tbody>", html)
+
+
+class TestLodCache(Basetest):
+    """
+    tests LodCache
+    """
+
+    def test_cache(self):
+        """
+        tests the lru and ttl handling of the cache
+        """
+        cache = LodCache(maxSize=2, ttl=600)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        self.assertEqual(1, cache.get("a"))
+        cache.put("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(1, cache.get("a"))
+        cache = LodCache(ttl=-1)
+        cache.put("a", 1)
+        self.assertIsNone(cache.get("a"))
+
+    def test_getOrLoad(self):
+        """
+        tests that concurrent requests of a missing key load the value once
+        """
+        cache = LodCache()
+        loads = []
+        def load():
+            loads.append(threading.current_thread().name)
+            time.sleep(0.1)
+            return {"Event": []}
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            values = list(executor.map(lambda _i: cache.getOrLoad("AAAI", load), range(4)))
+        self.assertEqual(1, len(loads))
+        self.assertTrue(all(value is values[0] for value in values))
+        self.assertEqual({}, cache._loadLocks)
@@ -0,0 +1,70 @@
+import io
+import tempfile
+from zipfile import ZipFile
+
+from spreadsheet.spreadsheet import SpreadSheetType, SpreadSheet
+
+from orapi.documentCache import DocumentCache
+from tests.basetest import Basetest
+
+
+class TestDocumentCache(Basetest):
+    """
+    tests DocumentCache
+    """
+
+    def setUp(self,debug=False,profile=True):
+        super().setUp(debug=debug, profile=profile)
+        self.tmpDir = tempfile.TemporaryDirectory()
+        self.cache = DocumentCache(self.tmpDir.name, maxDocuments=2)
+        self.lods = {
+            "Event series": [{"pageTitle": "AAAI", "acronym": "AAAI"}],
+            "Event": [{"pageTitle": f"AAAI {year}", "year": year} for year in range(2000, 2010)]
+        }
+
+    def tearDown(self):
+        super().tearDown()
+        self.tmpDir.cleanup()
+
+    def test_getKey(self):
+        """
+        tests that the key only changes if the content or the format changes
+        """
+        key = DocumentCache.getKey(self.lods, SpreadSheetType.CSV, "AAAI")
+        self.assertEqual(key, DocumentCache.getKey(dict(self.lods), SpreadSheetType.CSV, "AAAI"))
+        self.assertNotEqual(key, DocumentCache.getKey(self.lods, SpreadSheetType.EXCEL, "AAAI"))
+        self.lods["Event"][0]["year"] = 1999
+        self.assertNotEqual(key, DocumentCache.getKey(self.lods, SpreadSheetType.CSV, "AAAI"))
+
+    def test_generateCsv(self):
+        """
+        tests streaming the csv zip and caching the document
+        """
+        key = DocumentCache.getKey(self.lods, SpreadSheetType.CSV, "AAAI")
+        self.assertIsNone(self.cache.get(key, SpreadSheetType.CSV))
+        chunks = list(self.cache.generate(self.lods, SpreadSheetType.CSV, "AAAI"))
+        self.assertGreater(len(chunks), 1)
+        with ZipFile(io.BytesIO(b"".join(chunks))) as documentZip:
+            self.assertEqual(["Event series.csv", "Event.csv"], documentZip.namelist())
+        path = self.cache.get(key, SpreadSheetType.CSV)
+        self.assertIsNotNone(path)
+        with open(path, "rb") as f:
+            self.assertEqual(b"".join(chunks), f.read())
+
+    def test_generateExcel(self):
+        """
+        tests generating an excel document
+        """
+        buffer = self.cache.toBytesIO(self.lods, SpreadSheetType.EXCEL, "AAAI")
+        self.assertEqual("AAAI.xlsx", buffer.name)
+        spreadsheet = SpreadSheet.load(buffer)
+        self.assertEqual(10, len(spreadsheet.getTable("Event")))
+
+    def test_evict(self):
+        """
+        tests that at most maxDocuments are kept
+        """
+        for spreadSheetType in [SpreadSheetType.CSV, SpreadSheetType.EXCEL, SpreadSheetType.ODS]:
+            self.cache.toBytesIO(self.lods, spreadSheetType, "AAAI")
+        self.assertIsNone(self.cache.get(DocumentCache.getKey(self.lods, SpreadSheetType.CSV, "AAAI"), SpreadSheetType.CSV))
+        self.assertIsNotNone(self.cache.get(DocumentCache.getKey(self.lods, SpreadSheetType.ODS, "AAAI"), SpreadSheetType.ODS))
@@ -0,0 +1,69 @@
+from orapi.eventIndex import EventIndex
+from orapi.orapiservice import WikiTableEditing
+from orapi.validationService import DuplicateEventValidator, ValidatorRegistry
+from tests.basetest import Basetest
+from tests.fakeWiki import FakeWiki
+
+
+class TestEventIndex(Basetest):
+    """
+    tests EventIndex
+    """
+
+    def test_keys(self):
+        """
+        tests the normalization of the index keys
+        """
+        self.assertEqual("3dui2020", EventIndex.normalizeAcronym(" 3DUI-2020 "))
+        self.assertIsNone(EventIndex.normalizeAcronym("--"))
+        self.assertEqual(("3dui2020", ("3dui", 2020)), EventIndex.getKeys({"acronym": "3DUI 2020", "inEventSeries": "3DUI", "year": "2020"}))
+        self.assertEqual(("3dui2020", None), EventIndex.getKeys({"acronym": "3DUI 2020", "inEventSeries": "3DUI", "year": "20th"}))
+
+    def test_refresh(self):
+        """
+        tests loading the index and refreshing it with the modified events only
+        """
+        with FakeWiki("oreventindextest") as wiki:
+            wiki.addSeries("DUP", 3)
+            eventIndex = EventIndex(wiki.wikiId, refreshInterval=0)
+            eventIndex.refresh()
+            self.assertEqual({"DUP 1", "DUP 2", "DUP 3"}, set(eventIndex.events.keys()))
+            self.assertEqual({"DUP 2"}, eventIndex.lookup(acronymKey="dup2"))
+            self.assertEqual({"DUP 3"}, eventIndex.lookup(seriesYearKey=("dup", 1903)))
+            wiki.setPage("DUP 2", "{{Event\n|Acronym=DUP 1904\n|Series=DUP\n|Year=1904\n}}")
+            wiki.setPage("DUP 5", "{{Event\n|Acronym=DUP 5\n|Series=DUP\n|Year=1905\n}}")
+            # pages modified in the same second as the last indexed modification are not missed
+            for pageTitle in ["DUP 2", "DUP 5"]:
+                wiki.getPage(pageTitle)["revisions"][-1]["timestamp"] = eventIndex.lastModified.strftime("%Y-%m-%dT%H:%M:%SZ")
+            eventIndex.refresh()
+            self.assertIn("[[Modification date::>=", wiki.askQueries[-1])
+            self.assertEqual(set(), eventIndex.lookup(acronymKey="dup2"))
+            self.assertEqual({"DUP 2"}, eventIndex.lookup(acronymKey="dup1904", seriesYearKey=("dup", 1904)))
+            self.assertEqual({"DUP 5"}, eventIndex.lookup(acronymKey="dup5"))
+
+    def test_validate(self):
+        """
+        tests flagging the duplicates of an upload with one query of the wiki
+        """
+        with FakeWiki("oreventindextest") as wiki:
+            wiki.addSeries("DUP", 3)
+            tableEditing = WikiTableEditing(user=None)
+            tableEditing.lods = {"Event": [
+                {"pageTitle": "DUP 2", "acronym": "DUP 2", "inEventSeries": "DUP", "year": 1902},
+                {"pageTitle": "DUP 1901", "acronym": "dup-1", "inEventSeries": "DUP", "year": 1950},
+                {"pageTitle": "NEW A", "acronym": "NEW A", "inEventSeries": "DUP", "year": 2030},
+                {"pageTitle": "NEW B", "acronym": "NEW B", "inEventSeries": "DUP", "year": 2030},
+                {"pageTitle": "NEW C", "acronym": "NEW C", "inEventSeries": "DUP", "year": 2031}
+            ]}
+            registry = ValidatorRegistry({"duplicates": DuplicateEventValidator.forWiki(wiki.wikiId)})
+            validationResult = registry.validate("duplicates", tableEditing)["Event"]
+            self.assertEqual(1, len(wiki.askQueries))
+            self.assertFalse(registry.isCacheable("duplicates"))
+            # an event of the wiki is not a duplicate of itself
+            self.assertEqual({"result": True, "errors": []}, validationResult["DUP 2"])
+            self.assertEqual(["Possible duplicate of DUP 1"], validationResult["DUP 1901"]["errors"])
+            self.assertEqual(["Possible duplicate of NEW B"], validationResult["NEW A"]["errors"])
+            self.assertEqual(["Possible duplicate of NEW A"], validationResult["NEW B"]["errors"])
+            self.assertTrue(validationResult["NEW C"]["result"])
+            with self.assertRaises(ValueError):
+                DuplicateEventValidator.validate(tableEditing)
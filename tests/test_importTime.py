@@ -0,0 +1,60 @@
+import os
+import re
+import subprocess
+import sys
+import unittest
+
+from tests.basetest import Basetest
+
+
+class TestImportTime(Basetest):
+    """
+    checks the import time budget of the orapi modules measured with -X importtime
+    """
+
+    # cumulative import time budget in seconds. Wall-clock budgets depend on the machine → only checked if the
+    # environment variable is set e.g. ORAPI_IMPORT_BUDGETS=1
+    BUDGET_ENV = "ORAPI_IMPORT_BUDGETS"
+    BUDGETS = {
+        "orapi.utils": 1,
+        "orapi.webserver": 3,
+    }
+    # dependencies that are only imported on first use
+    LAZY_MODULES = ["geograpy", "nltk", "scipy", "sklearn", "newspaper"]
+
+    @staticmethod
+    def measureImport(module:str) -> (float, list):
+        """
+        import the given module in a new interpreter
+
+        Returns:
+            (cumulative import time in seconds, names of the imported modules)
+        """
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], capture_output=True, text=True)
+        imported = {}
+        for line in proc.stderr.splitlines():
+            match = re.match(r"import time:\s+(\d+) \|\s+(\d+) \|\s*(\S+)", line)
+            if match:
+                imported[match.group(3)] = int(match.group(2))
+        return imported.get(module, 0) / 1000000, list(imported.keys())
+
+    def test_lazyImports(self):
+        """
+        tests that the modules are imported without the lazily loaded dependencies
+        """
+        for module in self.BUDGETS:
+            _importTime, imported = self.measureImport(module)
+            self.assertIn(module, imported)
+            for lazyModule in self.LAZY_MODULES:
+                self.assertNotIn(lazyModule, imported, f"{module} imports {lazyModule}")
+
+    @unittest.skipUnless(os.environ.get(BUDGET_ENV), f"set {BUDGET_ENV} to check the import time budgets")
+    def test_importTimeBudget(self):
+        """
+        tests that the modules are imported within their budget
+        """
+        for module, budget in self.BUDGETS.items():
+            importTime, _imported = self.measureImport(module)
+            if self.debug:
+                print(f"{module}: {importTime:.3f}s")
+            self.assertLess(importTime, budget, f"{module} exceeds its import time budget")
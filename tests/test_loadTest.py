@@ -0,0 +1,44 @@
+import multiprocessing
+import unittest
+
+from tests.basetest import Basetest
+from tests.fakeWiki import FakeWiki
+from tests.loadTest import LoadTest, LoadTestServer
+
+
+class TestLoadTest(Basetest):
+    """
+    tests the load test harness
+    """
+
+    def test_percentile(self):
+        """
+        tests the nearest-rank percentile
+        """
+        values = [float(i) for i in range(1, 101)]
+        self.assertEqual(50.0, LoadTest.percentile(values, 50))
+        self.assertEqual(99.0, LoadTest.percentile(values, 99))
+        self.assertEqual(1.0, LoadTest.percentile([1.0], 95))
+        self.assertIsNone(LoadTest.percentile([], 50))
+
+    @unittest.skipUnless("fork" in multiprocessing.get_all_start_methods(), "the load test server is started with fork")
+    def test_loadTest(self):
+        """
+        tests running concurrent requests against the server
+        """
+        scenarios = ["seriesJson", "validateOrdinal"]
+        with FakeWiki("orloadtest") as wiki:
+            wiki.addSeries("LOADTEST", 3)
+            with LoadTestServer(wikiIds=[wiki.wikiId]) as server:
+                loadTest = LoadTest(server, series="LOADTEST", sourceWikiId=wiki.wikiId, targetWikiId=wiki.wikiId,
+                                    scenarios=scenarios, requestsPerLevel=4)
+                res = loadTest.run([2])
+        self.assertEqual(2, len(res["results"]))
+        for result in res["results"]:
+            self.assertEqual(0, result["errors"], result["statusCodes"])
+            self.assertEqual(4, result["requests"])
+            self.assertLessEqual(result["latency"]["p50"], result["latency"]["max"])
+            # the thread count is read from /proc which is not available on all platforms
+            peakThreads = result["server"]["threads"]["peak"]
+            if peakThreads is not None:
+                self.assertGreater(peakThreads, 0)
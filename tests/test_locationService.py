@@ -1,3 +1,9 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
 from corpus.datasources.openresearch import OREvent
 from flask import url_for
 from orapi.locationService import LocationService
@@ -62,6 +68,18 @@ class TestLocationService(Basetest):
         self.assertIn("wikidataid", res)
         self.assertEqual(res["wikidataid"], "Q65")
 
+    def test_warmUp(self):
+        """
+        tests loading the location data in the background
+        """
+        locationService = LocationService(warmUp=False)
+        self.assertFalse(locationService.isReady)
+        self.assertEqual("loading", locationService.getStatus())
+        locationService.startWarmUp()
+        self.assertTrue(locationService.waitUntilReady(timeout=600))
+        self.assertEqual("ready", locationService.getStatus())
+        self.assertEqual("Q65", locationService.getCity("US", "CA", "Los Angeles")["wikidataid"])
+
     def test_getRegion(self):
         """
         tests getRegion
@@ -78,3 +96,104 @@ class TestLocationService(Basetest):
         self.assertIn("wikidataid", res)
         self.assertEqual(res["wikidataid"], "Q30")
 
+
+class TestLocationDatabase(Basetest):
+    """
+    tests the connections of the LocationService to the locations database
+    """
+
+    def setUp(self, debug=False, profile=True):
+        super().setUp(debug=debug, profile=profile)
+        self.tmpDir = tempfile.TemporaryDirectory()
+        self.cacheFile = os.path.join(self.tmpDir.name, "locations.db")
+        connection = sqlite3.connect(self.cacheFile)
+        connection.execute("CREATE TABLE CityLookup(name TEXT, regionIso TEXT, wikidataid TEXT, label TEXT)")
+        connection.execute("CREATE TABLE RegionLookup(iso TEXT, wikidataid TEXT, label TEXT)")
+        connection.execute("CREATE TABLE CountryLookup(iso TEXT, wikidataid TEXT, label TEXT)")
+        connection.executemany("INSERT INTO CityLookup VALUES (?,?,?,?)", [("Los Angeles", "US-CA", "Q65", "Los Angeles"), ("Los Angeles", "US-CA", "Q65", "LA")])
+        connection.execute("INSERT INTO RegionLookup VALUES ('US-CA', 'Q99', 'California')")
+        connection.execute("INSERT INTO CountryLookup VALUES ('US', 'Q30', 'United States')")
+        connection.commit()
+        connection.close()
+
+    def tearDown(self):
+        super().tearDown()
+        self.tmpDir.cleanup()
+
+    def test_connectionPool(self):
+        """
+        tests that the lookups of the request threads reuse a bounded number of read-only connections
+        """
+        locationService = LocationService(warmUp=False, cacheFile=self.cacheFile)
+        self.assertEqual("Q65", locationService.getCity("US", "CA", "Los Angeles")["wikidataid"])
+        self.assertEqual("Q99", locationService.getRegion("US", "CA")["wikidataid"])
+        self.assertEqual("Q30", locationService.getCountry("US")["wikidataid"])
+        self.assertIsNone(locationService.getCountry("XX"))
+        from geograpy.locator import City
+        city = City()
+        city.wikidataid = "Q65"
+        self.assertEqual(["Los Angeles", "LA"], locationService.locationAlsoKnownAs(city))
+        with locationService.getConnection() as connection:
+            self.assertEqual(LocationService.MMAP_SIZE, connection.execute("PRAGMA mmap_size").fetchone()[0])
+            with self.assertRaises(sqlite3.OperationalError):
+                connection.execute("DELETE FROM CountryLookup")
+        # each request is handled in a new thread
+        connections = []
+        def lookup():
+            self.assertEqual("Q30", locationService.getCountry("US")["wikidataid"])
+            with locationService.getConnection() as threadConnection:
+                connections.append(threadConnection)
+        for _ in range(3):
+            thread = threading.Thread(target=lookup)
+            thread.start()
+            thread.join()
+        self.assertTrue(all(threadConnection is connection for threadConnection in connections))
+        # concurrent lookups open more connections but only POOL_SIZE are kept
+        barrier = threading.Barrier(LocationService.POOL_SIZE + 2)
+        def concurrentLookup():
+            with locationService.getConnection():
+                barrier.wait()
+        threads = [threading.Thread(target=concurrentLookup) for _ in range(LocationService.POOL_SIZE + 2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(LocationService.POOL_SIZE, len(locationService._pool))
+        locationService.close()
+        self.assertEqual([], locationService._pool)
+
+    def test_quotedCacheFile(self):
+        """
+        tests a locations database whose path contains characters of the uri syntax
+        """
+        cacheFile = os.path.join(self.tmpDir.name, "locations?#1.db")
+        os.rename(self.cacheFile, cacheFile)
+        locationService = LocationService(warmUp=False, cacheFile=cacheFile)
+        self.assertEqual("Q30", locationService.getCountry("US")["wikidataid"])
+        locationService.close()
+
+    def test_retryWarmUp(self):
+        """
+        tests that the warm-up is retried after the first download failed
+        """
+        class FlakyLocationService(LocationService):
+            RETRY_BACKOFF = 0.2
+            attempts = 0
+
+            def loadLocationContext(self):
+                FlakyLocationService.attempts += 1
+                if FlakyLocationService.attempts == 1:
+                    raise ConnectionError("download failed")
+                return "locationContext"
+
+        locationService = FlakyLocationService(warmUp=False, cacheFile=self.cacheFile)
+        locationService.startWarmUp().join()
+        self.assertEqual("failed", locationService.getStatus())
+        # the next attempt is started once the backoff elapsed
+        self.assertFalse(locationService.waitUntilReady(timeout=0.1))
+        self.assertEqual(1, FlakyLocationService.attempts)
+        time.sleep(0.2)
+        self.assertTrue(locationService.waitUntilReady(timeout=5))
+        self.assertEqual(2, FlakyLocationService.attempts)
+        self.assertEqual("ready", locationService.getStatus())
+        self.assertEqual("locationContext", locationService.locationContext)
@@ -0,0 +1,64 @@
+from orapi.metrics import MetricsRegistry
+from tests.basetest import Basetest
+
+
+class TestMetrics(Basetest):
+    """
+    tests the metrics and their exposition
+    """
+
+    def setUp(self,debug=False,profile=True):
+        super().setUp(debug=debug, profile=profile)
+        self.registry = MetricsRegistry()
+
+    def test_counter(self):
+        """
+        tests counting with labels
+        """
+        counter = self.registry.counter("test_requests_total", "test requests", ["wiki", "type"])
+        counter.inc(wiki="orfixed", type="ask")
+        counter.inc(2, wiki="orfixed", type="ask")
+        self.assertEqual(3, counter.getValue(wiki="orfixed", type="ask"))
+        self.assertEqual(0, counter.getValue(wiki="orclone", type="ask"))
+        with self.assertRaises(ValueError):
+            counter.inc(-1, wiki="orfixed", type="ask")
+        with self.assertRaises(ValueError):
+            counter.inc(wiki="orfixed")
+        self.assertIn('test_requests_total{wiki="orfixed",type="ask"} 3.0', self.registry.render())
+
+    def test_gauge(self):
+        """
+        tests tracking values in progress
+        """
+        gauge = self.registry.gauge("test_streams", "test streams")
+        with gauge.trackInProgress():
+            self.assertEqual(1, gauge.getValue())
+        self.assertEqual(0, gauge.getValue())
+        self.assertIn("test_streams 0", self.registry.render())
+
+    def test_histogram(self):
+        """
+        tests the cumulative buckets of the histogram
+        """
+        histogram = self.registry.histogram("test_seconds", "test durations", ["enhancer"], buckets=(0.1, 1))
+        for value in [0.05, 0.5, 5]:
+            histogram.observe(value, enhancer="fetch")
+        with histogram.time(enhancer="fetch"):
+            pass
+        count, total = histogram.getValue(enhancer="fetch")
+        self.assertEqual(4, count)
+        self.assertGreaterEqual(total, 5.55)
+        exposition = self.registry.render()
+        self.assertIn("# TYPE test_seconds histogram", exposition)
+        self.assertIn('test_seconds_bucket{enhancer="fetch",le="0.1"} 2', exposition)
+        self.assertIn('test_seconds_bucket{enhancer="fetch",le="1.0"} 3', exposition)
+        self.assertIn('test_seconds_bucket{enhancer="fetch",le="+Inf"} 4', exposition)
+        self.assertIn('test_seconds_count{enhancer="fetch"} 4', exposition)
+
+    def test_duplicateMetric(self):
+        """
+        tests that a metric name can only be registered once
+        """
+        self.registry.counter("test_total", "test")
+        with self.assertRaises(ValueError):
+            self.registry.gauge("test_total", "test")
@@ -7,9 +7,10 @@ from spreadsheet.tableediting import TableEditing
 from onlinespreadsheet.tablequery import TableQuery
 from wikifile.wikiFileManager import WikiFileManager
 
-from orapi.orapiservice import OrApi, WikiTableEditing
+from orapi.orapiservice import OrApi, WikiTableEditing, OrApiService
 from orapi.utils import WikiUserInfo
 from tests.basetest import Basetest
+from tests.fakeWiki import FakeWiki
 
 
 class TestOrApi(Basetest):
@@ -56,6 +57,38 @@ class TestOrApi(Basetest):
         enhancementGenerator=self.orapi.getSeriesTableEnhanceGenerator(tableEditing)
         self.assertTrue(isinstance(enhancementGenerator, Generator))
 
+    def test_getSeriesRecordGenerator(self):
+        """
+        tests that the records of the series are enhanced and yielded one by one
+        """
+        if self.inCI():
+            return
+        enhancers=["DateFixer", "OrdinalFixer"]
+        tableEditing=self.orapi.getSeriesTableEditing(self.testSeriesAcronym, enhancers)
+        recordGenerator=self.orapi.getSeriesRecordGenerator(tableEditing)
+        self.assertTrue(isinstance(recordGenerator, Generator))
+        entityType, record, error=next(recordGenerator)
+        self.assertEqual(OrApi.SERIES_TEMPLATE_NAME, entityType)
+        self.assertIsNone(error)
+        self.assertEqual(self.testSeriesAcronym, record.get("pageTitle"))
+        eventRecords=[record for entityType, record, error in recordGenerator if entityType==OrApi.EVENT_TEMPLATE_NAME]
+        self.assertEqual(len(tableEditing.lods.get(OrApi.EVENT_TEMPLATE_NAME)), len(eventRecords))
+
+    def test_getSeriesRecordGeneratorWithoutMarkup(self):
+        """
+        tests that the record of a page without the markup of its entity is yielded with an error instead of a blank record
+        """
+        with FakeWiki("orrecordtest") as wiki:
+            wiki.addSeries("RECORD", 2)
+            wiki.setPage("RECORD 3", "The event page has no template")
+            orapi = OrApi(wikiId=wiki.wikiId, targetWikiId=wiki.wikiId, authUpdates=False)
+            tableEditing = orapi.getSeriesTableEditing("RECORD")
+            tableEditing.lods[OrApi.EVENT_TEMPLATE_NAME].append({"pageTitle": "RECORD 3"})
+            results = {record.get("pageTitle"): error for _entityType, record, error in orapi.getSeriesRecordGenerator(tableEditing)}
+        self.assertEqual(["RECORD", "RECORD 1", "RECORD 2", "RECORD 3"], sorted(results.keys()))
+        self.assertIsNone(results["RECORD 1"])
+        self.assertEqual(f"RECORD 3 has no {OrApi.EVENT_TEMPLATE_NAME} markup", results["RECORD 3"])
+
     def test_getListOfDblpEventSeries(self):
         """
         tests the retrieval of the dblp event series list
@@ -171,3 +204,27 @@ class TestOrApi(Basetest):
         self.orapi.completeProperties(tableEditing)
         self.assertIn("Acronym", tableEditing.lods[OREvent.templateName][0])
 
+
+
+class TestOrApiService(Basetest):
+    """
+    tests OrApiService
+    """
+
+    def setUp(self,debug=False,profile=True):
+        super().setUp(debug=debug, profile=profile)
+        self.wikiId = getattr(self.getWikiUser("orfixed"), "wikiId")
+        self.orapiService = OrApiService(wikiIds=[self.wikiId], authUpdates=False)
+
+    def test_getOrApi(self):
+        """
+        tests that the OrApi instances are cached per (wikiId, targetWikiId)
+        """
+        orapi = self.orapiService.getOrApi(self.wikiId)
+        self.assertIs(orapi, self.orapiService.getOrApi(self.wikiId))
+        self.assertIsNot(orapi, self.orapiService.getOrApi(self.wikiId, targetWikiId=self.wikiId))
+        wikiUrl = orapi.wikiUrl
+        self.assertEqual(wikiUrl, orapi._wikiUrl)
+        self.orapiService.invalidateCache(self.wikiId)
+        self.assertIsNone(orapi._wikiUrl)
+        self.assertIsNot(orapi, self.orapiService.getOrApi(self.wikiId))
@@ -0,0 +1,77 @@
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+
+from orapi.preforkServer import SpoolPubSub
+from tests.basetest import Basetest
+
+
+class TestSpoolPubSub(Basetest):
+    """
+    tests SpoolPubSub
+    """
+
+    def setUp(self,debug=False,profile=True):
+        super().setUp(debug=debug, profile=profile)
+        self.tmpDir = tempfile.TemporaryDirectory()
+        self.spool = SpoolPubSub(self.tmpDir.name)
+
+    def tearDown(self):
+        super().tearDown()
+        self.tmpDir.cleanup()
+
+    def test_publishSubscribe(self):
+        """
+        tests that messages published while subscribed are received until the final result
+        """
+        channel = "test-channel"
+        def publish():
+            for i in range(20):
+                self.spool.publish(json.dumps({"data": [i]}), channel)
+            self.spool.publish(json.dumps({"data": None, "result": "done"}), channel)
+        publisher = threading.Thread(target=publish)
+        publisher.start()
+        messages = list(self.spool.subscribe(channel, timeout=5))
+        publisher.join()
+        self.assertEqual(21, len(messages))
+        self.assertEqual("done", json.loads(messages[-1])["result"])
+        # end of channel
+        self.spool.publish(None, "other")
+        self.assertEqual([None], list(self.spool.subscribe("other", timeout=5)))
+        self.assertEqual([], list(self.spool.subscribe("missing", timeout=0.1)))
+
+    def test_retrieveFile(self):
+        """
+        tests that a published file can be retrieved once
+        """
+        file = io.BytesIO(b"test")
+        file.name = "AAAI.xlsx"
+        self.spool.publish(file, "fileChannel")
+        retrieved = self.spool.retrieveFile("fileChannel", timeout=1)
+        self.assertEqual("AAAI.xlsx", retrieved.name)
+        self.assertEqual(b"test", retrieved.getvalue())
+        self.assertIsNone(self.spool.retrieveFile("fileChannel", timeout=0.1))
+
+    def test_purge(self):
+        """
+        tests that channels and files nobody retrieved are removed after the maximum age
+        """
+        self.spool.publish(json.dumps({"data": [1]}), "unsubscribed")
+        file = io.BytesIO(b"test")
+        file.name = "AAAI.xlsx"
+        self.spool.publish(file, "unretrieved")
+        self.spool.purge()
+        self.assertEqual(2, len(os.listdir(self.tmpDir.name)))
+        time.sleep(0.1)
+        self.spool.purge(maxAge=0.05)
+        self.assertEqual([], os.listdir(self.tmpDir.name))
+
+    def test_invalidChannel(self):
+        """
+        tests that channels can not address files outside of the spool
+        """
+        with self.assertRaises(ValueError):
+            self.spool.getChannelPath("../test")
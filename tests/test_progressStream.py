@@ -0,0 +1,76 @@
+import json
+import time
+
+from fb4.sse_bp import DictStreamResult
+
+from orapi.progressStream import ProgressStream
+from tests.basetest import Basetest
+
+
+class PublishRecorder:
+    """
+    records the messages published by a ProgressStream
+    """
+
+    def __init__(self):
+        self.messages = []
+
+    def publish(self, message, channel:str):
+        self.messages.append((time.monotonic(), message))
+
+
+class TestProgressStream(Basetest):
+    """
+    tests ProgressStream
+    """
+
+    def test_coalescing(self):
+        """
+        tests that fast messages are coalesced and that the final result is published last
+        """
+        recorder = PublishRecorder()
+        def generator():
+            for i in range(1000):
+                yield f"page {i}"
+            yield DictStreamResult("done")
+        stream = ProgressStream(generator(), sseBlueprint=recorder, flushInterval=0.1)
+        stream._publishCallback()
+        messages = [json.loads(message) for _, message in recorder.messages]
+        self.assertLess(len(messages), 10)
+        progress = [msg for message in messages[:-1] for msg in message["data"]]
+        self.assertEqual(1000, len(progress))
+        self.assertEqual("done", messages[-1]["result"])
+
+    def test_keepAlive(self):
+        """
+        tests that empty messages are published during a step without messages
+        """
+        recorder = PublishRecorder()
+        def generator():
+            yield "Starting silent step"
+            time.sleep(0.5)
+            yield DictStreamResult("done")
+        stream = ProgressStream(generator(), sseBlueprint=recorder, flushInterval=0.02, keepAliveInterval=0.1)
+        stream._publishCallback()
+        messages = [json.loads(message) for _, message in recorder.messages]
+        self.assertEqual(["Starting silent step"], messages[0]["data"])
+        keepAlives = [message for message in messages[1:-1] if message["data"] == []]
+        self.assertGreaterEqual(len(keepAlives), 3)
+        self.assertEqual("done", messages[-1]["result"])
+
+    def test_flushDuringSlowStep(self):
+        """
+        tests that a message is published before a slow step is completed
+        """
+        recorder = PublishRecorder()
+        def generator():
+            yield "Starting slow step"
+            time.sleep(0.5)
+            yield "✅"
+        stream = ProgressStream(generator(), sseBlueprint=recorder, flushInterval=0.05)
+        start = time.monotonic()
+        stream._publishCallback()
+        firstPublished, firstMessage = recorder.messages[0]
+        self.assertLess(firstPublished - start, 0.3)
+        self.assertEqual(["Starting slow step"], json.loads(firstMessage)["data"])
+        self.assertIsNone(recorder.messages[-1][1])
@@ -0,0 +1,80 @@
+import os
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+
+from orapi.requestProfile import RequestProfile, measure, activated
+from tests.basetest import Basetest
+
+
+class TestRequestProfile(Basetest):
+    """
+    tests RequestProfile
+    """
+
+    def test_measure(self):
+        """
+        tests that only steps in threads with an activated profile are recorded
+        """
+        profile = RequestProfile()
+        with measure("enhancer", "notProfiled"):
+            pass
+        with activated(profile):
+            for _ in range(3):
+                with measure("wiki", "pageFetch"):
+                    pass
+            # other threads are not profiled
+            thread = threading.Thread(target=lambda: measure("wiki", "otherThread").__enter__())
+            thread.start()
+            thread.join()
+        self.assertIsNone(RequestProfile.getActive())
+        breakdown = profile.toDict()
+        self.assertEqual([{"phase": "wiki", "name": "pageFetch", "count": 3, "seconds": breakdown["timings"][0]["seconds"]}], breakdown["timings"])
+        self.assertIn("wiki", breakdown["phases"])
+        serverTiming = profile.toServerTiming()
+        self.assertIn('wiki;desc="pageFetch (3x)";dur=', serverTiming)
+        self.assertIn("total;dur=", serverTiming)
+
+    def test_cProfileDump(self):
+        """
+        tests storing the cProfile dump
+        """
+        with tempfile.TemporaryDirectory() as tmpDir:
+            profile = RequestProfile(withCProfile=True, dumpDir=tmpDir)
+            with activated(profile):
+                sum(range(1000))
+            dumpFile = profile.dumpCProfile()
+            self.assertTrue(os.path.isfile(os.path.join(tmpDir, dumpFile)))
+            self.assertEqual(dumpFile, profile.toDict()["cProfile"])
+
+    def test_fromRequest(self):
+        """
+        tests that cProfile dumps are only stored if they are allowed
+        """
+        request = SimpleNamespace(values={"profile": "cprofile"}, headers={})
+        self.assertIsNone(RequestProfile.fromRequest(request).cProfile)
+        self.assertIsNotNone(RequestProfile.fromRequest(request, allowCProfile=True).cProfile)
+        self.assertIsNone(RequestProfile.fromRequest(SimpleNamespace(values={}, headers={RequestProfile.HEADER: "0"})))
+
+    def test_purgeDumps(self):
+        """
+        tests that old dumps and dumps exceeding the maximum number are removed
+        """
+        with tempfile.TemporaryDirectory() as tmpDir:
+            now = time.time()
+            for i in range(5):
+                path = os.path.join(tmpDir, f"{i}.prof")
+                open(path, "w").close()
+                os.utime(path, (now - i * 10, now - i * 10))
+            RequestProfile.purgeDumps(tmpDir, maxDumps=3, maxAge=25)
+            self.assertEqual(["0.prof", "1.prof", "2.prof"], sorted(os.listdir(tmpDir)))
+            RequestProfile.purgeDumps(tmpDir, maxDumps=3, maxAge=15)
+            self.assertEqual(["0.prof", "1.prof"], sorted(os.listdir(tmpDir)))
+
+    def test_activatedNone(self):
+        """
+        tests that no profile is activated if profiling is not requested
+        """
+        with activated(None):
+            self.assertIsNone(RequestProfile.getActive())
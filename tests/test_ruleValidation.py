@@ -0,0 +1,104 @@
+import datetime
+
+from corpus.datasources.openresearch import OREvent, OREventSeries
+
+from orapi.orapiservice import WikiTableEditing
+from orapi.ruleValidation import INVALID, ComparisonRule, ConversionRule, RuleEngine, RuleTable, RequiredRule, toDate, toYear
+from orapi.validationService import RuleValidator, StrictRuleValidator
+from tests.basetest import Basetest
+
+
+class TestRuleValidation(Basetest):
+    """
+    tests the RuleEngine
+    """
+
+    def test_ruleTable(self):
+        """
+        tests that the columns are normalized and converted once per distinct value
+        """
+        conversions = []
+        def convert(value):
+            conversions.append(value)
+            return toYear(value)
+        table = RuleTable([{"year": "2020"}, {"year": " "}, {"year": "2020"}, {"year": float("nan")}, {"year": "20th"}, {}])
+        self.assertEqual(["2020", None, "2020", None, "20th", None], table.getColumn("year"))
+        self.assertEqual([2020, None, 2020, None, INVALID, None], table.getConverted("year", convert))
+        self.assertIs(table.getConverted("year", convert), table.getConverted("year", convert))
+        self.assertEqual(["2020", "20th"], conversions)
+        self.assertEqual(datetime.date(2020, 6, 1), toDate(datetime.datetime(2020, 6, 1, 12)))
+        self.assertEqual(datetime.date(2020, 6, 1), toDate("June 1, 2020"))
+
+    def test_validate(self):
+        """
+        tests the default rules and the strict rules on events and event series
+        """
+        tableEditing = WikiTableEditing(user=None)
+        tableEditing.lods = {
+            OREvent.templateName: [
+                {"pageTitle": "VAL 2020", "acronym": "VAL 2020", "ordinal": 3, "year": 2020, "startDate": "2020-06-01", "endDate": "2020-06-03"},
+                {"pageTitle": "VAL 2021", "acronym": "VAL 2021", "ordinal": "4th", "year": "2020", "startDate": "2021-06-03", "endDate": datetime.date(2021, 6, 1)},
+                {"pageTitle": "VAL X", "acronym": "VAL", "ordinal": 5, "year": 2022, "startDate": "no date"},
+                {"pageTitle": "VAL 2023", "acronym": "VAL 2023"},
+                {"pageTitle": "WWW2021", "acronym": "WWW2021", "ordinal": 30},
+                {"pageTitle": "SIGMOD '21", "acronym": "SIGMOD '21", "ordinal": 47, "year": 2021}
+            ],
+            OREventSeries.templateName: [{"pageTitle": "VAL"}],
+            "Other": [{"pageTitle": "Other"}]
+        }
+        validationResult = RuleValidator.validate(tableEditing)
+        events = validationResult[OREvent.templateName]
+        self.assertEqual({"result": True, "errors": []}, events["VAL 2020"])
+        self.assertEqual(["Ordinal format invalid", "Start date after end date", "Year differs from start date"], events["VAL 2021"]["errors"])
+        self.assertEqual(["Start date invalid"], events["VAL X"]["errors"])
+        self.assertEqual(["Ordinal missing"], events["VAL 2023"]["errors"])
+        self.assertTrue(events["WWW2021"]["result"])
+        self.assertTrue(events["SIGMOD '21"]["result"])
+        self.assertEqual({}, validationResult[OREventSeries.templateName])
+        self.assertEqual({}, validationResult["Other"])
+        validationResult = StrictRuleValidator.validate(tableEditing)
+        events = validationResult[OREvent.templateName]
+        self.assertEqual({"result": True, "errors": []}, events["VAL 2020"])
+        self.assertEqual(["Ordinal format invalid", "Start date after end date", "Year differs from start date", "Year of acronym differs from year"], events["VAL 2021"]["errors"])
+        self.assertEqual(["Start date invalid", "Acronym does not end with the year"], events["VAL X"]["errors"])
+        self.assertEqual(["Ordinal missing", "Year missing"], events["VAL 2023"]["errors"])
+        self.assertEqual(["Year missing", "Acronym does not end with the year"], events["WWW2021"]["errors"])
+        self.assertEqual(["Acronym missing"], validationResult[OREventSeries.templateName]["VAL"]["errors"])
+
+    def test_largeTable(self):
+        """
+        tests that each column of a large table is extracted once and each conversion is computed once per distinct
+        value no matter how many rules look at the column
+        """
+        class CountingRecord(dict):
+            gets = {}
+
+            def get(self, key, default=None):
+                CountingRecord.gets[key] = CountingRecord.gets.get(key, 0) + 1
+                return super().get(key, default)
+
+        conversions = {}
+        def counting(name:str, converter):
+            def convert(value):
+                conversions[name] = conversions.get(name, 0) + 1
+                return converter(value)
+            return convert
+        toCountedYear = counting("year", toYear)
+        toCountedDate = counting("date", toDate)
+        size = 20000
+        lod = [CountingRecord({"pageTitle": f"VAL {1900 + i % 120}", "ordinal": i, "year": 1900 + i % 120,
+                "startDate": f"{1900 + i % 120}-06-01", "endDate": f"{1900 + i % 120}-06-03"}) for i in range(size)]
+        event = [OREvent.templateName]
+        rules = [
+            RequiredRule("year", entityTypes=event),
+            ConversionRule("year", toCountedYear, "Year format invalid", entityTypes=event),
+            ConversionRule("startDate", toCountedDate, "Start date invalid", entityTypes=event),
+            ConversionRule("endDate", toCountedDate, "End date invalid", entityTypes=event),
+            ComparisonRule("startDate", toCountedDate, "endDate", toCountedDate, lambda start, end: start <= end, "Start date after end date", entityTypes=event),
+            ComparisonRule("year", toCountedYear, "startDate", toCountedDate, lambda year, start: year == start.year, "Year differs from start date", entityTypes=event),
+        ]
+        errors = RuleEngine(rules).validateTable(OREvent.templateName, lod)
+        self.assertTrue(all(not errMsgs for errMsgs in errors))
+        self.assertEqual({"year": size, "startDate": size, "endDate": size}, CountingRecord.gets)
+        # 120 distinct years, start dates and end dates
+        self.assertEqual({"year": 120, "date": 240}, conversions)
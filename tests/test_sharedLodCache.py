@@ -0,0 +1,38 @@
+import datetime
+import os
+import tempfile
+
+from orapi.sharedLodCache import SharedLodCache
+from tests.basetest import Basetest
+
+
+class TestSharedLodCache(Basetest):
+    """
+    tests SharedLodCache
+    """
+
+    def test_sharedCache(self):
+        """
+        tests that a lod cached by one worker is loaded by another worker instead of being loaded again
+        """
+        with tempfile.TemporaryDirectory() as tmpDir:
+            dbFile = os.path.join(tmpDir, "enhancedSeries.db")
+            worker = SharedLodCache(dbFile, maxSize=2, ttl=600)
+            otherWorker = SharedLodCache(dbFile, maxSize=2, ttl=600)
+            lods = {"Event": [{"pageTitle": "AAAI 2020", "startDate": datetime.date(2020, 2, 7)}]}
+            worker.put(("orfixed", "AAAI", ()), lods)
+            loads = []
+            def load():
+                loads.append(1)
+                return {}
+            self.assertEqual(lods, otherWorker.getOrLoad(("orfixed", "AAAI", ()), load))
+            self.assertEqual([], loads)
+            # the least recently used entries are removed
+            otherWorker.put(("orfixed", "IJCAI", ()), {})
+            otherWorker.put(("orfixed", "ECAI", ()), {})
+            self.assertIsNone(otherWorker.store.get(("orfixed", "AAAI", ())))
+            expiring = SharedLodCache(dbFile, ttl=-1)
+            expiring.put(("orfixed", "KI", ()), {})
+            self.assertIsNone(worker.get(("orfixed", "KI", ())))
+            for cache in [worker, otherWorker, expiring]:
+                cache.store.close()
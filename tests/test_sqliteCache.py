@@ -0,0 +1,37 @@
+import os
+import tempfile
+import time
+
+from orapi.sqliteCache import SqliteCache
+from tests.basetest import Basetest
+
+
+class TestSqliteCache(Basetest):
+    """
+    tests SqliteCache
+    """
+
+    def test_sqliteCache(self):
+        """
+        tests purging the expired entries of all tables and opening a connection per process
+        """
+        class TwoTableCache(SqliteCache):
+            TABLES = ["first", "second"]
+
+        with tempfile.TemporaryDirectory() as tmpDir:
+            cache = TwoTableCache(os.path.join(tmpDir, "cache", "test.db"))
+            connection = cache.getConnection()
+            self.assertIs(connection, cache.getConnection())
+            self.assertEqual("wal", connection.execute("PRAGMA journal_mode").fetchone()[0])
+            now = time.time()
+            for table in cache.TABLES:
+                connection.execute(f"CREATE TABLE {table}(key TEXT PRIMARY KEY, expires REAL NOT NULL)")
+                connection.executemany(f"INSERT INTO {table}(key, expires) VALUES (?,?)", [("expired", now - 1), ("valid", now + 60)])
+            cache.purge()
+            for table in cache.TABLES:
+                self.assertEqual([("valid",)], connection.execute(f"SELECT key FROM {table}").fetchall())
+            # a forked worker process opens its own connection
+            cache._pid = -1
+            self.assertIsNot(connection, cache.getConnection())
+            cache.close()
+            connection.close()
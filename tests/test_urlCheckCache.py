@@ -0,0 +1,72 @@
+import os
+import tempfile
+import time
+
+from orapi.urlCheckCache import UrlCheckCache
+from orapi.validationService import UrlChecker
+from tests.basetest import Basetest
+from tests.fakeWiki import FakeWiki
+
+
+class TestUrlCheckCache(Basetest):
+    """
+    tests UrlCheckCache
+    """
+
+    def setUp(self, debug=False, profile=True):
+        super().setUp(debug=debug, profile=profile)
+        self.tmpDir = tempfile.TemporaryDirectory()
+        self.dbFile = os.path.join(self.tmpDir.name, "urlChecks.db")
+
+    def tearDown(self):
+        super().tearDown()
+        self.tmpDir.cleanup()
+
+    def test_cache(self):
+        """
+        tests storing url checks and Wayback lookups with separate ttls for positive and negative results and without transient failures
+        """
+        cache = UrlCheckCache(self.dbFile, positiveTtl=60, negativeTtl=0.1)
+        cache.putCheck("http://example.org", statusCode=200, finalUrl="https://example.org/", contains={"EX": True})
+        cache.putCheck("http://example.org", statusCode=200, finalUrl="https://example.org/", contains={"OTHER": False})
+        cache.putCheck("http://gone.example.org", statusCode=404, finalUrl="http://gone.example.org")
+        # transient failures are not cached
+        cache.putCheck("http://dead.example.org", error="connection refused")
+        cache.putCheck("http://busy.example.org", statusCode=503, finalUrl="http://busy.example.org")
+        cached = cache.getCheck("http://example.org", ["EX", "OTHER"])
+        self.assertEqual({"statusCode": 200, "finalUrl": "https://example.org/", "error": None, "contains": {"EX": True, "OTHER": False}}, cached)
+        # content checks that were not performed are a cache miss
+        self.assertIsNone(cache.getCheck("http://example.org", ["MISSING"]))
+        self.assertEqual(404, cache.getCheck("http://gone.example.org", ["EX"])["statusCode"])
+        self.assertIsNone(cache.getCheck("http://dead.example.org"))
+        self.assertIsNone(cache.getCheck("http://busy.example.org"))
+        cache.putArchive("http://dead.example.org", None)
+        cache.putArchive("http://old.example.org", "http://web.archive.org/web/2020/http://old.example.org")
+        self.assertEqual((True, None), cache.getArchive("http://dead.example.org"))
+        self.assertEqual((False, None), cache.getArchive("http://unknown.example.org"))
+        time.sleep(0.2)
+        self.assertIsNone(cache.getCheck("http://gone.example.org"))
+        self.assertEqual((False, None), cache.getArchive("http://dead.example.org"))
+        cache.close()
+        # the cache is persistent
+        cache = UrlCheckCache(self.dbFile)
+        self.assertIsNotNone(cache.getCheck("http://example.org", ["EX"]))
+        self.assertEqual((True, "http://web.archive.org/web/2020/http://old.example.org"), cache.getArchive("http://old.example.org"))
+
+    def test_urlChecker(self):
+        """
+        tests that repeated validations are answered from the cache
+        """
+        with FakeWiki("orurlchecktest") as wiki:
+            urlChecker = UrlChecker(maxWorkers=4, cache=UrlCheckCache(self.dbFile))
+            url = wiki.getHomepage("CACHE 1")
+            for _ in range(2):
+                urlChecks, archivedUrls = urlChecker.checkAll({url: {"CACHE", "MISSING"}})
+                self.assertTrue(urlChecks[url].containsText("CACHE"))
+                self.assertFalse(urlChecks[url].containsText("MISSING"))
+                self.assertEqual({}, archivedUrls)
+            self.assertEqual(1, wiki.homepageRequestCount)
+            # a new expected text requires a new request
+            urlChecks, _archivedUrls = urlChecker.checkAll({url: {"1"}})
+            self.assertTrue(urlChecks[url].containsText("1"))
+            self.assertEqual(2, wiki.homepageRequestCount)
@@ -1,6 +1,6 @@
 import uuid
 
-from orapi.utils import PageHistory
+from orapi.utils import PageHistory, PageRevision
 from tests.basetest import Basetest
 
 
@@ -32,4 +32,24 @@ class TestPageHistory(Basetest):
         """
         pageHistory = PageHistory(pageTitle=str(uuid.uuid1()), wikiUrl=self.wikiUrl)
         self.assertIsNone(pageHistory.getPageOwner())
-        self.assertFalse(pageHistory.exists())
\ No newline at end of file
+        self.assertFalse(pageHistory.exists())
+
+class TestPageRevision(Basetest):
+    """
+    Tests the PageRevision class
+    """
+
+    def setUp(self,debug=False,profile=True):
+        super(TestPageRevision, self).setUp(debug, profile)
+        self.wikiUrl="https://www.openresearch.org/mediawiki"
+
+    def test_getLatestRevisions(self):
+        """
+        tests the batched retrieval of the latest revisions
+        """
+        pageTitles = ["AAAI", "AAAI 2020", str(uuid.uuid1())]
+        latestRevisions = PageRevision.getLatestRevisions(pageTitles, self.wikiUrl, batchSize=2)
+        self.assertEqual({"AAAI", "AAAI 2020"}, set(latestRevisions.keys()))
+        for pageTitle, revision in latestRevisions.items():
+            pageHistory = PageHistory(pageTitle=pageTitle, wikiUrl=self.wikiUrl)
+            self.assertEqual(max(rev.revid for rev in pageHistory.revisions), revision.revid)
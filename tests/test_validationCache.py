@@ -0,0 +1,118 @@
+import os
+import tempfile
+import time
+
+from spreadsheet.tableediting import TableEditing
+
+from orapi.validationCache import ValidationCache
+from orapi.validationService import OrdinalValidator, RuleValidator, StrictRuleValidator, ValidatorRegistry, Validator
+from tests.basetest import Basetest
+
+
+class CountingValidator(Validator):
+    """
+    validator that records the validated records and looks at the ordinal only
+    """
+    validated = []
+
+    @classmethod
+    def validate(cls, tableEditing:TableEditing) -> dict:
+        return cls.validateRecordBased(tableEditing)
+
+    @classmethod
+    def getValidatedFields(cls, entityType:str) -> list:
+        return ["ordinal"]
+
+    @classmethod
+    def validateRecord(cls, entityName:str, entityType:str, entityRecord:dict) -> (bool, list):
+        cls.validated.append(entityName)
+        return OrdinalValidator.validateRecord(entityName, entityType, entityRecord)
+
+
+class TestValidationCache(Basetest):
+    """
+    tests ValidationCache
+    """
+
+    def setUp(self, debug=False, profile=True):
+        super().setUp(debug=debug, profile=profile)
+        self.tmpDir = tempfile.TemporaryDirectory()
+        self.dbFile = os.path.join(self.tmpDir.name, "validationResults.db")
+
+    def tearDown(self):
+        super().tearDown()
+        self.tmpDir.cleanup()
+
+    def test_cache(self):
+        """
+        tests the keys of the records and the ttls of valid and invalid results
+        """
+        cache = ValidationCache(self.dbFile, ttl=60, invalidTtl=0.1)
+        record = {"pageTitle": "VAL 1", "ordinal": 1, "city": "Berlin"}
+        key = cache.getKey("ordinal", "Event", record, ["ordinal"])
+        self.assertEqual(key, cache.getKey("ordinal", "Event", {**record, "city": "Paris"}, ["ordinal"]))
+        self.assertNotEqual(key, cache.getKey("ordinal", "Event", {**record, "ordinal": 2}, ["ordinal"]))
+        self.assertNotEqual(key, cache.getKey("ordinal", "Event", {**record, "city": "Paris"}))
+        self.assertNotEqual(key, cache.getKey("homepage", "Event", record, ["ordinal"]))
+        self.assertNotEqual(key, cache.getKey("ordinal", "Event", record, ["ordinal"], version="OrdinalValidator:2"))
+        invalidKey = cache.getKey("ordinal", "Event", {"ordinal": "1st"}, ["ordinal"])
+        cache.putResult(key, {"result": True, "errors": []})
+        cache.putResult(invalidKey, {"result": False, "errors": ["Ordinal format invalid"]})
+        self.assertEqual({key, invalidKey}, set(cache.getResults([key, invalidKey, "unknown"]).keys()))
+        time.sleep(0.2)
+        self.assertEqual({key: {"result": True, "errors": []}}, cache.getResults([key, invalidKey]))
+        cache.close()
+
+    def test_incrementalValidation(self):
+        """
+        tests that only records with changed validated fields are validated again
+        """
+        registry = ValidatorRegistry({"counting": CountingValidator}, cache=ValidationCache(self.dbFile))
+        tableEditing = TableEditing()
+        tableEditing.lods = {"Event": [{"pageTitle": f"VAL {i}", "ordinal": i, "city": "Berlin"} for i in range(1, 5)]}
+        CountingValidator.validated = []
+        results = {entityName: evr for _entityType, entityName, evr in registry.validateRecords("counting", tableEditing)}
+        self.assertEqual(4, len(CountingValidator.validated))
+        tableEditing.lods["Event"][0]["city"] = "Paris"
+        tableEditing.lods["Event"][1]["ordinal"] = "2nd"
+        CountingValidator.validated = []
+        changedResults = {entityName: evr for _entityType, entityName, evr in registry.validateRecords("counting", tableEditing)}
+        self.assertEqual(["VAL 2"], CountingValidator.validated)
+        self.assertEqual(results["VAL 1"], changedResults["VAL 1"])
+        self.assertEqual(["Ordinal format invalid"], changedResults["VAL 2"]["errors"])
+        self.assertEqual(set(results.keys()), set(changedResults.keys()))
+
+    def test_version(self):
+        """
+        tests that cached results are not reused once the validation logic of a validator changed
+        """
+        class ChangedValidator(CountingValidator):
+            VERSION = 2
+
+        self.assertNotEqual(CountingValidator.getVersion(), ChangedValidator.getVersion())
+        self.assertEqual(RuleValidator.getVersion(), RuleValidator.getVersion())
+        self.assertNotEqual(RuleValidator.getVersion(), StrictRuleValidator.getVersion())
+        cache = ValidationCache(self.dbFile)
+        tableEditing = TableEditing()
+        tableEditing.lods = {"Event": [{"pageTitle": "VAL 1", "ordinal": 1}]}
+        CountingValidator.validated = []
+        for validator in [CountingValidator, CountingValidator, ChangedValidator]:
+            registry = ValidatorRegistry({"counting": validator}, cache=cache)
+            list(registry.validateRecords("counting", tableEditing))
+        self.assertEqual(["VAL 1", "VAL 1"], CountingValidator.validated)
+
+    def test_repeatedPageTitles(self):
+        """
+        tests that records with the same or without a pageTitle do not share cached results
+        """
+        cache = ValidationCache(self.dbFile)
+        registry = ValidatorRegistry({"counting": CountingValidator}, cache=cache)
+        tableEditing = TableEditing()
+        tableEditing.lods = {"Event": [{"pageTitle": "VAL 1", "ordinal": 1}, {"pageTitle": "VAL 1", "ordinal": "1st"},
+                                       {"ordinal": 2}, {"ordinal": "2nd"}]}
+        for _ in range(2):
+            CountingValidator.validated = []
+            results = [evr["result"] for _entityType, _entityName, evr in registry.validateRecords("counting", tableEditing)]
+            self.assertEqual([True, False, True, False], results)
+            self.assertEqual(4, len(CountingValidator.validated))
+        self.assertEqual({}, cache.getResults([cache.getKey("counting", "Event", record, ["ordinal"], version=CountingValidator.getVersion()) for record in tableEditing.lods["Event"]]))
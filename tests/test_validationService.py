@@ -1,11 +1,38 @@
+import io
+import json
+import time
+
+import requests
+from flask import request
+
 from corpus.datasources.openresearch import OREvent
 from spreadsheet.tableediting import TableEditing
 
-from orapi.orapiservice import OrApi
-from orapi.validationService import HomepageValidator, OrdinalValidator
+from orapi.metrics import VALIDATION_SERVICE_SECONDS
+from orapi.orapiservice import OrApi, OrApiService, WikiTableEditing
+from orapi.validationService import ArchivedUrl, HomepageValidator, OrdinalValidator, ValidatorRegistry, UrlChecker, UrlCheck, Validator
+from orapi.webserver import WebServer
+from tests.fakeWiki import FakeWiki
 from tests.basetest import Basetest
 
 
+class SlowValidator(Validator):
+    """
+    validator that needs some time per record
+    """
+    validated = []
+
+    @classmethod
+    def validate(cls, tableEditing:TableEditing) -> dict:
+        return cls.validateRecordBased(tableEditing)
+
+    @classmethod
+    def validateRecord(cls, entityName:str, entityType:str, entityRecord:dict) -> (bool, list):
+        time.sleep(0.1)
+        cls.validated.append(entityName)
+        return True, []
+
+
 class TestValidationService(Basetest):
     """
     tests ValidationService
@@ -105,4 +132,228 @@ class TestValidationService(Basetest):
         if self.inCI():
             return
         url = "www.aaai.org/Conferences/AAAI-22/"
-        self.assertTrue(HomepageValidator.isArchivedUrl(url))
\ No newline at end of file
+        self.assertTrue(HomepageValidator.isArchivedUrl(url))
+    def test_validatorRegistry(self):
+        """
+        tests validating in-process with the validators of the registry
+        """
+        tableEditing = WikiTableEditing(user=None)
+        tableEditing.lods = {
+            "Event": [
+                {"pageTitle": "VAL 1", "Ordinal": 1},
+                {"pageTitle": "VAL 2", "Ordinal": "2nd"}
+            ]
+        }
+        isValid, validationResult = self.orapi.validate(tableEditing, {"ordinal": OrdinalValidator})
+        self.assertFalse(isValid)
+        self.assertTrue(validationResult["Event"]["VAL 1"]["ordinal"]["result"])
+        self.assertEqual(["Ordinal format invalid"], validationResult["Event"]["VAL 2"]["ordinal"]["errors"])
+        registry = ValidatorRegistry.getDefault()
+        self.assertEqual(["homepage", "rules"], [name for name, _validator in registry.items()])
+        registry.register("ordinal", "http://localhost:8558/validate/ordinalFormat")
+        self.assertTrue(registry.isRemote("ordinal"))
+        with self.assertRaises(TypeError):
+            registry.register("invalid", OrApi)
+
+    def test_parseServiceUrls(self):
+        """
+        tests parsing remote validation services given as NAME=URL
+        """
+        serviceUrls = ValidatorRegistry.parseServiceUrls(["homepage=http://localhost:8558/validate/homepage", " rules = https://example.org/validate/rules?strict=true"])
+        self.assertEqual({"homepage": "http://localhost:8558/validate/homepage", "rules": "https://example.org/validate/rules?strict=true"}, serviceUrls)
+        self.assertEqual({}, ValidatorRegistry.parseServiceUrls(None))
+        for spec in ["http://localhost:8558/validate/homepage", "=http://localhost:8558", "homepage", "homepage=localhost:8558", "homepage=ftp://example.org"]:
+            with self.assertRaises(ValueError, msg=spec) as context:
+                ValidatorRegistry.parseServiceUrl(spec)
+            self.assertIn("expected NAME=URL", str(context.exception))
+
+    def test_validationBlueprint(self):
+        """
+        tests that the validation services accept the lods as json and as json encoded string
+        """
+        web = WebServer()
+        web.init(OrApiService(wikiIds=[self.wikiId], defaultSourceWiki=self.wikiId, authUpdates=False))
+        web.app.config['TESTING'] = True
+        client = web.app.test_client()
+        lods = {"Event": [{"pageTitle": "VAL 1", "ordinal": 1}]}
+        for payload in [lods, json.dumps(lods)]:
+            response = client.post("/validate/ordinalFormat", json=payload)
+            self.assertEqual(200, response.status_code)
+            self.assertTrue(response.json["Event"]["VAL 1"]["result"])
+        response = client.post("/validate/rules", json=lods)
+        self.assertEqual(200, response.status_code)
+        self.assertTrue(response.json["Event"]["VAL 1"]["result"])
+        response = client.post("/validate/rules?strict=true", json=lods)
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(["Acronym missing", "Year missing"], response.json["Event"]["VAL 1"]["errors"])
+
+    def test_validateHomepagesConcurrently(self):
+        """
+        tests that each distinct homepage is requested once and that the homepages are checked concurrently
+        """
+        with FakeWiki("orvalidationtest", latency=0.2) as wiki:
+            events = [{"pageTitle": f"VAL {i}", "homepage": wiki.getHomepage(f"VAL {i % 5}"), "eventInSeries": "VAL"} for i in range(20)]
+            events.append({"pageTitle": "VAL dead", "homepage": "http://127.0.0.1:1/dead", "eventInSeries": "VAL"})
+            tableEditing = TableEditing()
+            tableEditing.lods = {
+                "Event series": [{"pageTitle": "VAL", "homepage": wiki.getHomepage("VAL 0"), "acronym": "VAL"}],
+                "Event": events
+            }
+            start = time.perf_counter()
+            validationResult = HomepageValidator.validate(tableEditing)
+            seconds = time.perf_counter() - start
+            self.assertEqual(5, wiki.homepageRequestCount)
+            # the five homepages are requested concurrently
+            self.assertLess(seconds, 5 * wiki.latency)
+            self.assertTrue(validationResult["Event series"]["VAL"]["result"])
+            self.assertTrue(validationResult["Event"]["VAL 7"]["result"])
+            self.assertFalse(validationResult["Event"]["VAL dead"]["result"])
+            self.assertIn("Site not available", validationResult["Event"]["VAL dead"]["errors"][0])
+
+    def test_urlCheckerSingleFlight(self):
+        """
+        tests that concurrent checks of the same url share the request
+        """
+        with FakeWiki("orvalidationtest", latency=0.2) as wiki:
+            urlChecker = UrlChecker(maxWorkers=4)
+            url = wiki.getHomepage("VAL")
+            futures = [urlChecker.check(url) for _ in range(3)]
+            self.assertTrue(all(future is futures[0] for future in futures))
+            self.assertTrue(futures[0].result().isAvailable)
+            self.assertEqual(1, wiki.homepageRequestCount)
+
+    def test_searchBody(self):
+        """
+        tests that the streamed body is only read until the expected texts are found or the byte limit is reached
+        """
+        def getResponse(body:bytes) -> requests.Response:
+            resp = requests.Response()
+            resp.raw = io.BytesIO(body)
+            resp.encoding = "utf-8"
+            return resp
+        body = b"x" * (UrlCheck.CHUNK_SIZE - 2) + "AAAI ü".encode() + b"y" * 10 * UrlCheck.CHUNK_SIZE
+        resp = getResponse(body)
+        # the expected text spans two chunks
+        self.assertEqual({"AAAI ü": True}, UrlCheck.searchBody(resp, ["AAAI ü"], maxBytes=len(body)))
+        self.assertLess(resp.raw.tell(), len(body))
+        resp = getResponse(body)
+        self.assertEqual({"AAAI": True, "3DUI": False}, UrlCheck.searchBody(resp, ["AAAI", "3DUI"], maxBytes=3 * UrlCheck.CHUNK_SIZE))
+        self.assertEqual(3 * UrlCheck.CHUNK_SIZE, resp.raw.tell())
+
+    def test_fetchHead(self):
+        """
+        tests that only the headers are requested if no content is expected
+        """
+        with FakeWiki("orvalidationtest") as wiki:
+            url = wiki.getHomepage("VAL 1")
+            self.assertTrue(UrlCheck.fetch(url, timeout=2).isAvailable)
+            urlCheck = UrlCheck.fetch(url, timeout=2, mustContains=["VAL 1", "3DUI"])
+            self.assertEqual({"VAL 1": True, "3DUI": False}, urlCheck.contains)
+            self.assertEqual(["HEAD", "GET"], wiki.homepageMethods)
+            isValid, errors = HomepageValidator.validateUrl(url, checkAvailability=True, mustContain="3DUI")
+            self.assertFalse(isValid)
+            self.assertEqual(["Expected content not found"], errors)
+
+    def test_urlCheckerPerHost(self):
+        """
+        tests that the concurrent requests per host are limited and that the hosts are checked in parallel
+        """
+        with FakeWiki("orvalidationtest", latency=0.2) as wikiA, FakeWiki("orvalidationtest2", latency=0.2) as wikiB:
+            urls = {wikiA.getHomepage(f"VAL {i}"): set() for i in range(6)}
+            # same server under another host name
+            urls.update({wikiB.getHomepage(f"VAL {i}").replace("127.0.0.1", "localhost"): set() for i in range(6)})
+            urlChecker = UrlChecker(maxWorkers=8, maxPerHost=2)
+            start = time.perf_counter()
+            urlChecks, _archivedUrls = urlChecker.checkAll(urls)
+            seconds = time.perf_counter() - start
+            self.assertTrue(all(urlCheck.isAvailable for urlCheck in urlChecks.values()))
+            self.assertEqual(2, wikiA.maxActiveHomepageRequests)
+            self.assertEqual(2, wikiB.maxActiveHomepageRequests)
+            # three rounds of two requests per host with both hosts served at the same time
+            self.assertLess(seconds, 6 * wikiA.latency)
+            self.assertEqual({"127.0.0.1", "localhost"}, set(urlChecker._sessions.keys()))
+
+    def test_batchedArchiveLookups(self):
+        """
+        tests that the Wayback lookups of the unavailable homepages are resolved with batched requests
+        """
+        with FakeWiki("orvalidationtest") as wiki:
+            goneUrls = [wiki.getHomepage(f"gone/VAL {i}") for i in range(5)]
+            for url in goneUrls[:3]:
+                wiki.archivedUrls[url] = "20200101000000"
+            urls = {url: set() for url in goneUrls}
+            urls[wiki.getHomepage("VAL 1")] = set()
+            urlChecker = UrlChecker(archiveApiUrl=wiki.getWaybackApiUrl())
+            urlChecks, archivedUrls = urlChecker.checkAll(urls)
+            self.assertEqual(["POST"], wiki.waybackMethods)
+            self.assertEqual(set(goneUrls), set(archivedUrls.keys()))
+            self.assertEqual([True, True, True, False, False], [archivedUrls[url].isArchived() for url in goneUrls])
+            isValid, errors = HomepageValidator.validateUrl(goneUrls[0], checkAvailability=True, urlCheck=urlChecks[goneUrls[0]], archivedUrl=archivedUrls[goneUrls[0]])
+            self.assertFalse(isValid)
+            self.assertIn("(but archived)", errors[0])
+            self.assertIn(f"web/20200101000000/{goneUrls[0]}", errors[0])
+            # without batch support the urls are looked up one by one
+            wiki.waybackMethods.clear()
+            wiki.waybackBatchSupported = False
+            archivedUrls = ArchivedUrl.lookupAll(goneUrls[2:], apiUrl=wiki.getWaybackApiUrl())
+            self.assertEqual(["POST", "GET", "GET", "GET"], wiki.waybackMethods)
+            self.assertEqual([True, False, False], [archivedUrls[url].isArchived() for url in goneUrls[2:]])
+
+    def test_validateHomepagesArchived(self):
+        """
+        tests that the validation of a table links the snapshots of the unavailable homepages found by batched lookups
+        """
+        with FakeWiki("orvalidationtest") as wiki:
+            tableEditing = WikiTableEditing(user=None)
+            tableEditing.lods = {"Event": [{"pageTitle": f"VAL {i}", "homepage": wiki.getHomepage(f"gone/VAL {i}")} for i in range(4)]}
+            wiki.archivedUrls[wiki.getHomepage("gone/VAL 1")] = "20210101000000"
+            urlChecker = UrlChecker.getInstance()
+            archiveApiUrl = urlChecker.archiveApiUrl
+            urlChecker.archiveApiUrl = wiki.getWaybackApiUrl()
+            try:
+                validationResult = HomepageValidator.validate(tableEditing)
+            finally:
+                urlChecker.archiveApiUrl = archiveApiUrl
+            self.assertEqual(["POST"], wiki.waybackMethods)
+            self.assertTrue(all(not evr["result"] for evr in validationResult["Event"].values()))
+            self.assertIn("(but archived)", validationResult["Event"]["VAL 1"]["errors"][0])
+            self.assertEqual(["Site not available"], validationResult["Event"]["VAL 2"]["errors"])
+
+    def test_validateGenerator(self):
+        """
+        tests that the results of the validators are streamed as soon as they are available and that closing the
+        generator stops the validators
+        """
+        tableEditing = WikiTableEditing(user=None)
+        tableEditing.lods = {"Event": [{"pageTitle": f"VAL {i}", "Ordinal": "1st" if i == 3 else i} for i in range(10)]}
+        SlowValidator.validated = []
+        validationGenerator = self.orapi.validateGenerator(tableEditing, {"slow": SlowValidator, "ordinal": OrdinalValidator})
+        firstInvalid = None
+        for entityType, entityName, validationService, evr in validationGenerator:
+            if not evr["result"]:
+                firstInvalid = (entityName, validationService, evr["errors"])
+                validationGenerator.close()
+                break
+        self.assertEqual(("VAL 3", "ordinal", ["Ordinal format invalid"]), firstInvalid)
+        time.sleep(0.3)
+        # the slow validator was stopped
+        self.assertLess(len(SlowValidator.validated), 10)
+        isValid, validationResult = self.orapi.validate(tableEditing, {"slow": SlowValidator, "ordinal": OrdinalValidator})
+        self.assertFalse(isValid)
+        self.assertEqual(10, len(validationResult["Event"]))
+        self.assertEqual({"slow", "ordinal"}, set(validationResult["Event"]["VAL 3"].keys()))
+
+    def test_remoteValidationTiming(self):
+        """
+        tests that each call of a remote validation service is timed once
+        """
+        with FakeWiki("orvalidationtest") as wiki:
+            wiki.app.add_url_rule("/validate/ordinalFormat", "ordinalFormat",
+                                  lambda: OrdinalValidator.validate(TableEditing(lods=request.get_json())), methods=["POST"])
+            registry = ValidatorRegistry({"remoteOrdinal": f"{wiki.url}/validate/ordinalFormat"})
+            tableEditing = TableEditing()
+            tableEditing.lods = {"Event": [{"pageTitle": "VAL 1", "ordinal": 1}]}
+            calls, _duration = VALIDATION_SERVICE_SECONDS.getValue(service="remoteOrdinal")
+            results = list(registry.validateUncachedRecords("remoteOrdinal", tableEditing))
+            self.assertEqual([("Event", "VAL 1", {"result": True, "errors": []})], results)
+            self.assertEqual(calls + 1, VALIDATION_SERVICE_SECONDS.getValue(service="remoteOrdinal")[0])
@@ -6,6 +6,7 @@ from flask import url_for
 
 from orapi.orapiservice import OrApiService
 from tests.basetest import Basetest
+from tests.fakeWiki import FakeWiki
 from orapi.webserver import WebServer
 
 
@@ -107,6 +108,23 @@ class TestWebServer(Basetest):
         ws, app, client = TestWebServer.getApp(self.testWikiIds, auth=True, baseUrl=baseUrl)
         self.assertEqual(ws.sseBluePrint.baseUrl, baseUrl)
 
+    def test_getSeriesTableData(self):
+        """
+        tests that the table data of a series ignores unknown enhancers
+        """
+        with FakeWiki("ortabledatatest") as wiki:
+            wiki.addSeries("TABLEDATA", 3)
+            ws = WebServer()
+            ws.init(OrApiService(wikiIds=[wiki.wikiId], defaultSourceWiki=wiki.wikiId, authUpdates=False))
+            ws.app.config['TESTING'] = True
+            client = ws.app.test_client()
+            for enhancer in ["unknownEnhancer", "otherEnhancer"]:
+                response = client.get(f"/api/series/TABLEDATA/table/Event?source={wiki.wikiId}&enhancer={enhancer}&draw=1&start=0&length=10")
+                self.assertEqual(200, response.status_code)
+                self.assertEqual(3, response.json["recordsTotal"])
+            self.assertIsNotNone(ws.orapiService.enhancedSeries.get((wiki.wikiId, "TABLEDATA", ())))
+            self.assertEqual(1, len(ws.orapiService.enhancedSeries._entries))
+
     def test_getFileName(self):
         """
         tests getFileName